@@ -117,6 +117,34 @@ async def schedule_bus_scraper():
             logger.error("每周巴士时刻表更新出错: %s", e)
 
 
+async def schedule_ical_pregeneration():
+    """每天凌晨 (JST, SCHEDULE_ICAL_PREGEN_HOUR 点) 预生成订阅者的 iCal"""
+    from tutnext.config import SCHEDULE_ICAL_PREGEN_HOUR
+    from tutnext.services.schedule_ical import pregenerate_ical_feeds
+
+    while True:
+        now = datetime.now(JAPAN_TZ)
+        target_time = now.replace(
+            hour=SCHEDULE_ICAL_PREGEN_HOUR, minute=0, second=0, microsecond=0
+        )
+
+        if now >= target_time:
+            target_time = target_time + timedelta(days=1)
+
+        wait_seconds = (target_time - now).total_seconds()
+        logger.info(
+            f"计划在 {target_time.strftime('%Y-%m-%d %H:%M:%S')} (JST) 预生成 iCal，等待 {wait_seconds:.1f} 秒"
+        )
+        await asyncio.sleep(wait_seconds)
+
+        logger.info("开始预生成 iCal...")
+        try:
+            generated = await pregenerate_ical_feeds()
+            logger.info(f"iCal 预生成完成: {generated} 个")
+        except Exception as e:
+            logger.error(f"iCal 预生成出错: {e}")
+
+
 async def schedule_live_activity_dispatcher():
     """每10秒检查一次 Live Activity 过渡事件并推送"""
     from tutnext.services.push.live_activity import dispatch_live_activity_pushes
@@ -199,6 +227,11 @@ async def run_all():
                 logger.info("课题监测推送已禁用 (ENABLE_MONITOR_PUSH=false)")
             # 巴士时刻表自动更新 (启动时 + 每周一 3:00 JST)
             scheduler_tasks.append(tg.create_task(schedule_bus_scraper()))
+            # iCal 订阅预生成 (每天凌晨，需要 SCHEDULE_ICAL_SECRET)
+            if settings.schedule_ical_secret:
+                scheduler_tasks.append(tg.create_task(schedule_ical_pregeneration()))
+            else:
+                logger.info("iCal 预生成已禁用 (未设置 SCHEDULE_ICAL_SECRET)")
             # Live Activity 推送调度 (每30秒)
             scheduler_tasks.append(tg.create_task(schedule_live_activity_dispatcher()))
     except* (KeyboardInterrupt, asyncio.CancelledError):
@@ -209,6 +242,11 @@ async def run_all():
     finally:
         await push_manager.stop()
         logger.info("推送池管理器已关闭")
+        from tutnext.core.executor import shutdown_parse_executor
+        from tutnext.services.gakuen.http import close_shared_connector
+
+        await close_shared_connector()
+        shutdown_parse_executor()
 
 
 def main():
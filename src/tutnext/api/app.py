@@ -5,9 +5,11 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.responses import FileResponse
-from tutnext.api.routes import oauth, schedule, bus, kadai, push, tmail, live_activity
+from tutnext.api.routes import oauth, schedule, bus, kadai, push, tmail, live_activity, metrics
 from tutnext.services.gakuen.client import GakuenAPI, GakuenAPIError
 from tutnext.core.database import db_manager
+from tutnext.core.executor import shutdown_parse_executor
+from tutnext.services.gakuen.http import close_shared_connector
 from tutnext.config import HTTP_PROXY
 from tutnext.services.gakuen.session_manager import get_session_manager
 
@@ -22,8 +24,10 @@ async def lifespan(app: FastAPI):
     # 启动时初始化数据库
     await db_manager.init_db()
     yield
-    # 关闭时关闭数据库连接池
+    # 关闭时关闭数据库连接池、T-NEXT 共享连接和解析进程池
     await db_manager.close()
+    await close_shared_connector()
+    shutdown_parse_executor()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -36,6 +40,7 @@ app.include_router(push.router, prefix="/push", tags=["Push"])
 app.include_router(tmail.router, prefix="/tmail", tags=["Tmail"])
 app.include_router(oauth.router, prefix="/oauth", tags=["OAuth"])
 app.include_router(live_activity.router, prefix="/live-activity", tags=["LiveActivity"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
 
 
 # Home page
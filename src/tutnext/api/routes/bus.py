@@ -17,6 +17,7 @@ from bs4 import BeautifulSoup, Tag
 from fastapi import APIRouter
 
 from tutnext.config import redis
+from tutnext.core.executor import run_parse
 from tutnext.services.bus_parser import parse_temp_pdf
 
 logger = logging.getLogger(__name__)
@@ -306,7 +307,8 @@ async def app_schedule():
         if pin_messages:
             try:
                 pdf_bytes = await _download_pdf_bytes(pin_messages["url"], session)
-                pin_data = parse_temp_pdf(pdf_bytes)
+                # PDF 解析是 CPU 密集操作，交给解析执行器，不阻塞事件循环
+                pin_data = await run_parse(parse_temp_pdf, pdf_bytes)
             except Exception as e:
                 logger.warning("临时 PDF 解析失败：%s", e)
             else:
@@ -1,17 +1,27 @@
 # tutnext/api/routes/kadai.py
-import json
 import logging
 import traceback
 import asyncio
-from typing import List, Dict, Any
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Response, status
 from pydantic import BaseModel
 from tutnext.services.gakuen.client import GakuenAPI, GakuenAPIError
+from tutnext.services.gakuen.errors import GakuenBusyError
 
-from tutnext.config import redis, HTTP_PROXY
+from tutnext.config import (
+    HTTP_PROXY,
+    GAKUEN_INTERACTIVE_DEADLINE,
+    GAKUEN_KADAI_DETAIL_CONCURRENCY,
+    KADAI_SNAPSHOT_FRESH_TTL,
+    KADAI_SNAPSHOT_MAX_STALE,
+)
 from tutnext.core.database import db_manager
+from tutnext.core.single_flight import single_flight
 from tutnext.services.google_classroom import classroom_api
+from tutnext.services.gakuen.governor import Priority, request_priority
+from tutnext.services.gakuen.retry import INTERACTIVE_POLICY, is_concurrent_login
 from tutnext.services.gakuen.session_manager import get_session_manager
+from tutnext.services.kadai_snapshot import load_kadai_snapshot, store_kadai_snapshot
 
 router = APIRouter()
 
@@ -21,63 +31,129 @@ class KadaiRequest(BaseModel):
     encryptedPassword: str
 
 
+async def _fetch_kadai(username: str, encryptedPassword: str) -> List[Dict[str, Any]]:
+    """从学校系统（和 Google Classroom）获取课题并写入快照。
+
+    Google Classroom 不使用 T-NEXT 的会话，在会话锁之外与学校系统并行获取
+    （Google API 较慢时不延长会话锁的持有时间），获取完成后再合并。
+    """
+    classroom_task: Optional[asyncio.Future] = None
+    if await db_manager.get_user_tokens(username):
+        classroom_task = asyncio.ensure_future(
+            classroom_api.get_cached_user_assignments(username)
+        )
+    try:
+        async with get_session_manager().acquire(username, encryptedPassword) as gakuen:
+            try:
+                gakuen_result: Any = await gakuen.get_user_kadai(
+                    skip_login=True,
+                    detail_concurrency=GAKUEN_KADAI_DETAIL_CONCURRENCY,
+                )
+            except GakuenBusyError:
+                raise  # 混雑時は空の一覧ではなく 503 を返す
+            except Exception as e:
+                gakuen_result = e
+        classroom_result = await classroom_task if classroom_task is not None else []
+    finally:
+        if classroom_task is not None and not classroom_task.done():
+            classroom_task.cancel()
+
+    kadai_list: List[Dict[str, Any]] = []
+    complete = True  # 所有来源都获取成功时才写入快照
+    # 学校系统课题
+    if isinstance(gakuen_result, Exception):
+        logging.error(f"获取学校系统课题失败: {gakuen_result}")
+        complete = False
+    elif isinstance(gakuen_result, list):
+        kadai_list.extend(gakuen_result)
+    # Google Classroom 课题
+    if classroom_result is None:
+        logging.error(f"获取Google Classroom课题失败: {username}")
+        complete = False
+    else:
+        kadai_list.extend(classroom_result)
+    if complete:
+        await store_kadai_snapshot(username, kadai_list, "api", encryptedPassword)
+    return kadai_list
+
+
+async def _shared_fetch_kadai(username: str, encryptedPassword: str) -> List[Dict[str, Any]]:
+    # 同一用户的并发请求（App、小组件、后台刷新）共享同一次获取
+    return await single_flight.do(
+        single_flight.make_key("kadai", username, encryptedPassword),
+        lambda: _fetch_kadai(username, encryptedPassword),
+    )
+
+
+# 后台刷新中的任务（用户名 → 任务），同时保持任务引用直到完成
+_kadai_refresh_tasks: dict[str, asyncio.Task] = {}
+
+
+async def _refresh_kadai(username: str, encryptedPassword: str) -> None:
+    try:
+        # 没有用户在等待结果，以最低优先级访问 T-NEXT
+        with request_priority(Priority.MONITOR):
+            await _shared_fetch_kadai(username, encryptedPassword)
+        logging.info(f"[{username}] 课题快照后台刷新完成")
+    except GakuenAPIError as e:
+        logging.warning(f"[{username}] 课题快照后台刷新失败: {e}")
+    except Exception as e:
+        logging.error(f"[{username}] 课题快照后台刷新失败: {e}")
+        logging.error(f"Traceback: {traceback.format_exc()}")
+
+
+def _schedule_kadai_refresh(username: str, encryptedPassword: str) -> None:
+    if username in _kadai_refresh_tasks:
+        return
+    task = asyncio.create_task(_refresh_kadai(username, encryptedPassword))
+    _kadai_refresh_tasks[username] = task
+    task.add_done_callback(lambda _: _kadai_refresh_tasks.pop(username, None))
+
+
 @router.post("")
 async def get_kadai(data: KadaiRequest, response: Response):
     username = data.username
     encryptedPassword = data.encryptedPassword
-    # 如果缓存中存在数据，则直接返回
-    if await redis.exists(f"{username}:kadai"):
-        redis_kadai_list = await redis.get(f"{username}:kadai")
-        kadai_list = json.loads(redis_kadai_list)
+    # 课题快照（课题监测或之前的请求写入）足够新时直接返回；
+    # 稍旧时先返回快照，同时在后台重新获取（见 tutnext.services.kadai_snapshot）。
+    # 凭据与写入快照时不一致的请求不使用快照，也不触发后台刷新
+    snapshot = await load_kadai_snapshot(username)
+    if (
+        snapshot is not None
+        and snapshot.matches(encryptedPassword)
+        and snapshot.age <= KADAI_SNAPSHOT_MAX_STALE
+    ):
+        if snapshot.age > KADAI_SNAPSHOT_FRESH_TTL:
+            logging.info(
+                f"[{username}] 课题快照已过 {snapshot.age:.0f} 秒（{snapshot.source}），后台刷新"
+            )
+            _schedule_kadai_refresh(username, encryptedPassword)
         response.status_code = status.HTTP_200_OK
-        return {"status": True, "data": kadai_list}
+        return {"status": True, "data": snapshot.data}
+
+    async def on_retry(e: BaseException, attempt: int):
+        logging.warning(f"[{username}] get_kadai: 並行ログイン競合検出、リトライします")
+        await get_session_manager().invalidate(username)
 
-    for attempt in range(2):
-        try:
-            if attempt > 0:
-                await get_session_manager().invalidate(username)
-                await asyncio.sleep(2)
-                logging.info(f"[{username}] get_kadai: 並行ログイン競合のためリトライ中...")
-            async with get_session_manager().acquire(username, encryptedPassword) as gakuen:
-                tasks = []
-                tasks.append(gakuen.get_user_kadai(skip_login=True))
-
-                # 检查是否有Google Classroom令牌，如果有则添加获取任务
-                has_classroom_tokens = await db_manager.get_user_tokens(username)
-                if has_classroom_tokens:
-                    tasks.append(classroom_api.get_user_assignments(username))
-                # 并行执行所有任务
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                # 处理结果
-                kadai_list: List[Dict[str, Any]] = []
-                # 处理学校系统课题结果（第一个任务）
-                if len(results) > 0:
-                    gakuen_result = results[0]
-                    if isinstance(gakuen_result, Exception):
-                        logging.error(f"获取学校系统课题失败: {gakuen_result}")
-                    elif isinstance(gakuen_result, list):
-                        kadai_list.extend(gakuen_result)
-
-                # 处理Google Classroom课题结果（第二个任务，如果存在）
-                if len(results) > 1:
-                    classroom_result = results[1]
-                    if isinstance(classroom_result, Exception):
-                        logging.error(f"获取Google Classroom课题失败: {classroom_result}")
-                    elif isinstance(classroom_result, list):
-                        kadai_list.extend(classroom_result)
-                if kadai_list:
-                    await redis.set(f"{username}:kadai", json.dumps(kadai_list), ex=120)
-            response.status_code = status.HTTP_200_OK
-            return {"status": True, "data": kadai_list}
-        except GakuenAPIError as e:
-            if "他端末で同時に実行" in str(e) and attempt == 0:
-                logging.warning(f"[{username}] get_kadai: 並行ログイン競合検出、2秒後にリトライ")
-                continue
-            logging.warning(f"[{username}] error: {e}")
-            response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-            return {"status": False, "message": str(e)}
-        except Exception as e:
-            logging.error(f"[{username}] error: {e}")
-            logging.error(f"Traceback: {traceback.format_exc()}")
-            response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-            return {"status": False, "message": str(e)}
+    try:
+        kadai_list = await INTERACTIVE_POLICY.run(
+            lambda: _shared_fetch_kadai(username, encryptedPassword),
+            on_retry=on_retry,
+            retryable=is_concurrent_login,
+        )
+        response.status_code = status.HTTP_200_OK
+        return {"status": True, "data": kadai_list}
+    except GakuenBusyError as e:
+        logging.warning(f"[{username}] busy: {e}")
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        response.headers["Retry-After"] = str(int(GAKUEN_INTERACTIVE_DEADLINE))
+        return {"status": False, "message": str(e)}
+    except GakuenAPIError as e:
+        logging.warning(f"[{username}] error: {e}")
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return {"status": False, "message": str(e)}
+    except Exception as e:
+        logging.error(f"[{username}] error: {e}")
+        logging.error(f"Traceback: {traceback.format_exc()}")
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return {"status": False, "message": str(e)}
@@ -0,0 +1,36 @@
+# tutnext/api/routes/metrics.py
+# T-NEXT 请求指标（Prometheus 文本格式，按 worker 进程统计）
+# 仅在设置了 METRICS_TOKEN 时提供，请求需携带 Authorization: Bearer <METRICS_TOKEN>
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from tutnext.config import METRICS_TOKEN
+from tutnext.services.gakuen.metrics import gakuen_metrics
+
+router = APIRouter()
+
+
+def _authorized(authorization: Optional[str]) -> bool:
+    scheme, _, token = (authorization or "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(
+        token.strip().encode("utf-8"), METRICS_TOKEN.encode("utf-8")
+    )
+
+
+@router.get("", response_class=PlainTextResponse)
+async def metrics(authorization: Optional[str] = Header(None)):
+    if not METRICS_TOKEN:
+        # 未设置令牌时不公开该接口
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not _authorized(authorization):
+        raise HTTPException(
+            status_code=401,
+            detail="Unauthorized",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return PlainTextResponse(
+        gakuen_metrics.render(), media_type="text/plain; version=0.0.4"
+    )
@@ -2,8 +2,8 @@
 from fastapi import APIRouter, Response, status
 from pydantic import BaseModel
 from tutnext.core.database import db_manager
-from tutnext.config import redis
 from tutnext.services.google_classroom import classroom_api
+from tutnext.services.kadai_snapshot import invalidate_kadai_snapshot
 
 router = APIRouter()
 
@@ -28,8 +28,9 @@ async def receive_tokens(data: OAuthTokens, response: Response):
     try:
         success = await db_manager.upsert_user_tokens(data.username, data.access_token, data.refresh_token)
         if success:
-            # 清除 f"{username}:kadai" 的缓存
-            await redis.delete(f"{data.username}:kadai")
+            # 课题来源变化，清除该用户的课题快照和 Classroom 课题缓存
+            await invalidate_kadai_snapshot(data.username)
+            await classroom_api.invalidate_assignments_cache(data.username)
             response.status_code = status.HTTP_200_OK
             return {"status": True, "message": "User tokens stored successfully"}
         else:
@@ -45,8 +46,9 @@ async def revoke_tokens(data: OAuthRevoke, response: Response):
     try:
         success = await classroom_api.revoke_user_authorization(data.username)
         if success["success"]:
-            # 清除 f"{username}:kadai" 的缓存
-            await redis.delete(f"{data.username}:kadai")
+            # 课题来源变化，清除该用户的课题快照和 Classroom 课题缓存
+            await invalidate_kadai_snapshot(data.username)
+            await classroom_api.invalidate_assignments_cache(data.username)
             response.status_code = status.HTTP_200_OK
             return {"status": True, "message": "User tokens revoked successfully"}
         else:
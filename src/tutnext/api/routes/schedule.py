@@ -3,16 +3,30 @@ import asyncio
 import logging
 import traceback
 
-from icalendar import Alarm, Calendar, Event
-from fastapi import APIRouter, HTTPException, Response, status as http_status
-from datetime import date, datetime, timedelta, timezone
+from fastapi import APIRouter, Header, HTTPException, Response, status as http_status
+from datetime import date
 from typing import Literal, Optional
 
 from pydantic import BaseModel
 
 from tutnext.services.gakuen.client import GakuenAPI, GakuenAPIError
-from tutnext.config import HTTP_PROXY, redis
+from tutnext.services.gakuen.errors import GakuenBusyError
+from tutnext.config import (
+    GAKUEN_INTERACTIVE_DEADLINE,
+    HTTP_PROXY,
+)
+from tutnext.core.single_flight import single_flight
+from tutnext.services.gakuen.retry import INTERACTIVE_POLICY, is_concurrent_login
+from tutnext.services.gakuen.rooms import room_cache
 from tutnext.services.gakuen.session_manager import get_session_manager
+from tutnext.services.schedule_ical import (
+    generate_ical,
+    ical_etag,
+    load_ical,
+    refresh_ical,
+    register_subscriber,
+    touch_subscriber,
+)
 
 router = APIRouter()
 
@@ -38,89 +52,108 @@ class ClassBulletinRequest(BaseModel):
     data: ClassBulletinData = ClassBulletinData()
 
 
+# 后台刷新中的任务（用户名 → 任务），同时保持任务引用直到完成
+_ical_refresh_tasks: dict[str, asyncio.Task] = {}
+
+
+async def _refresh_ical(username: str, password: str) -> None:
+    try:
+        if await refresh_ical(username, password):
+            logging.info(f"[{username}] iCal 后台刷新完成")
+            await register_subscriber(username, password)
+    except GakuenAPIError as e:
+        logging.warning(f"[{username}] iCal 后台刷新失败: {e}")
+    except Exception as e:
+        logging.error(f"[{username}] iCal 后台刷新失败: {e}")
+        logging.error(f"Traceback: {traceback.format_exc()}")
+
+
+def _schedule_ical_refresh(username: str, password: str) -> None:
+    if username in _ical_refresh_tasks:
+        return
+    task = asyncio.create_task(_refresh_ical(username, password))
+    _ical_refresh_tasks[username] = task
+    task.add_done_callback(lambda _: _ical_refresh_tasks.pop(username, None))
+
+
+def _ical_response(content: bytes, if_none_match: Optional[str]) -> Response:
+    etag = ical_etag(content)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=http_status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type="text/calendar", headers=headers)
+
+
 @router.get("")
-async def send_schedule(username=None, password=None):
+async def send_schedule(
+    username=None, password=None, if_none_match: Optional[str] = Header(None)
+):
     if not username or not password:
         raise HTTPException(
             status_code=400, detail="学籍番号またはパスワードを入力してください"
         )
 
-    # 缓存策略：优先从 Redis 读取已生成的 iCal 内容，命中时直接返回，
-    # 避免每次请求都重复登录大学系统并拉取两个月的课程数据（TTL 300秒）
-    cache_key = f"schedule:ical:{username}"
-    cached = await redis.get(cache_key)
+    # 缓存策略（stale-while-revalidate）：优先从 Redis 读取已生成的 iCal 内容，
+    # 300 秒内直接返回；超过 300 秒仍先返回旧内容，同时在后台重新生成，
+    # 日历客户端的轮询不必等待登录大学系统和拉取课程数据。
+    # 没有缓存时才同步生成：month_range 只重新拉取当月，其余月份使用按月缓存；
+    # VEVENT 按月份和课题分块缓存，只重新生成数据有变化的块后拼接。
+    # 内容未变化时 ETag 不变，携带 If-None-Match 的请求返回 304。
+    # 缓存只提供给与生成时密码一致的请求（包括 304 和后台刷新），
+    # 不一致时按没有缓存处理，登录 T-NEXT 重新生成。
+    # 生成成功的用户登记为订阅者，凌晨由定时任务预先生成（见 schedule_ical）。
+    try:
+        cached, fresh = await load_ical(username, password)
+    except Exception:
+        cached, fresh = None, False  # Redis 障害時は同期生成
     if cached:
-        logging.info(f"cache hit: 学籍番号: {username}")
-        return Response(content=cached, media_type="text/calendar")
+        if fresh:
+            logging.info(f"cache hit: 学籍番号: {username}")
+            await touch_subscriber(username)
+        else:
+            logging.info(f"stale cache hit: 学籍番号: {username}")
+            _schedule_ical_refresh(username, password)
+        return _ical_response(cached, if_none_match)
 
-    async with get_session_manager().lock_only(username):
-        gakuen = GakuenAPI(username, password, "https://next.tama.ac.jp", http_proxy=HTTP_PROXY)
-        logging.info(f"login: 学籍番号: {username}")
-        try:
-            await gakuen.login()
-            cal = Calendar()
-            cal.add("prodid", "-//Ukenn//TamaSchedule//")
-            cal.add("version", "2.0")
-            cal.add("name", "多摩大スケジュール")
-            cal.add("x-wr-calname", "多摩大スケジュール")
-            cal.add("x-wr-timezone", "Etc/GMT")
-            now_year = datetime.now().year
-            now_month = datetime.now().month
-            for month in range(now_month, now_month + 2):
-                if month > 12:
-                    now_year += 1
-                    month -= 12
-                course_list = await gakuen.month_data(now_year, month)
-                for course in course_list:
-                    event = Event()
-                    if not course["title"]:
-                        continue
-                    event.add("summary", course["title"])
-                    event.add("dtstart", course["start"])
-                    event.add("dtend", course["end"])
-                    event.add("dtstamp", datetime.now())
-                    alarm1 = Alarm()
-                    alarm1.add("action", "DISPLAY")
-                    t = course["start"] - timedelta(days=1)
-                    alarm1.add(
-                        "trigger",
-                        datetime(t.year, t.month, t.day, 12, 0, 0, tzinfo=timezone.utc),
-                    )
-                    event.add_component(alarm1)
-                    if not course["allDay"] and "room" in course:
-                        event.add("location", course["room"])
-                        event.add("description", course["teacher"])
-                        alarm2 = Alarm()
-                        alarm2.add("action", "AUDIO")
-                        alarm2.add("trigger", timedelta(minutes=-10))
-                        event.add_component(alarm2)
-                    cal.add_component(event)
-            katai_list = await gakuen.kadai_data()
-            for katai in katai_list:
-                event = Event()
-                event.add("summary", "未完成の課題!!!" + katai["title"])
-                event.add("dtstart", katai["deadline"] - timedelta(minutes=30))
-                event.add("dtend", katai["deadline"])
-                event.add("dtstamp", datetime.now())
-                event.add("location", katai["from"])
-                event.add("description", katai["date"] + " からの課題")
-                alarm = Alarm()
-                alarm.add("action", "AUDIO")
-                alarm.add("trigger", timedelta(minutes=-20))
-                event.add_component(alarm)
-                cal.add_component(event)
-            ical_content = cal.to_ical()
-            await redis.set(cache_key, ical_content, ex=300)
-            return Response(content=ical_content, media_type="text/calendar")
-        except GakuenAPIError as e:
-            logging.warning(f"[{username}] error: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
-        except Exception as e:
-            logging.error(f"[{username}] error: {e}")
-            logging.error(f"Traceback: {traceback.format_exc()}")
-            raise HTTPException(status_code=400, detail=str(e))
-        finally:
-            await gakuen.close()
+    try:
+        ical_content = await generate_ical(username, password)
+        await register_subscriber(username, password)
+        return _ical_response(ical_content, if_none_match)
+    except GakuenBusyError as e:
+        logging.warning(f"[{username}] busy: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(int(GAKUEN_INTERACTIVE_DEADLINE))},
+        )
+    except GakuenAPIError as e:
+        logging.warning(f"[{username}] error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logging.error(f"[{username}] error: {e}")
+        logging.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _fetch_later_schedule(
+    username: str, encryptedPassword: str, target_date: Optional[date]
+) -> dict:
+    async with get_session_manager().acquire(username, encryptedPassword) as gakuen:
+        result = await gakuen.get_later_user_schedule(
+            user_id=username,
+            encrypted_login_password=encryptedPassword,
+            target_date=target_date,
+            skip_login=True,
+        )
+    # 時間表記を "10:40-12:10" → "10:40 - 12:10" に変換
+    # （結果は single-flight で共有されるため、変換はここで 1 回だけ行う）
+    for entry in result.get("time_table", []):
+        if "time" in entry:
+            entry["time"] = entry["time"].strip().replace("-", " - ")
+    return result
 
 
 @router.post("/later")
@@ -181,37 +214,52 @@ async def get_later_schedule(data: LaterScheduleRequest, response: Response):
             response.status_code = http_status.HTTP_400_BAD_REQUEST
             return {"status": False, "message": "targetDate の形式が無効です。YYYY-MM-DD 形式で指定してください。"}
 
-    for attempt in range(2):
-        try:
-            if attempt > 0:
-                await get_session_manager().invalidate(username)
-                await asyncio.sleep(2)
-                logging.info(f"[{username}] get_later_schedule: 並行ログイン競合のためリトライ中...")
-            async with get_session_manager().acquire(username, encryptedPassword) as gakuen:
-                result = await gakuen.get_later_user_schedule(
-                    user_id=username,
-                    encrypted_login_password=encryptedPassword,
-                    target_date=target_date,
-                    skip_login=True,
-                )
-            # 時間表記を "10:40-12:10" → "10:40 - 12:10" に変換
-            for entry in result.get("time_table", []):
-                if "time" in entry:
-                    entry["time"] = entry["time"].strip().replace("-", " - ")
-            response.status_code = http_status.HTTP_200_OK
-            return {"status": True, "data": result}
-        except GakuenAPIError as e:
-            if "他端末で同時に実行" in str(e) and attempt == 0:
-                logging.warning(f"[{username}] get_later_schedule: 並行ログイン競合検出、2秒後にリトライ")
-                continue
-            logging.warning(f"[{username}] get_later_schedule error: {e}")
-            response.status_code = http_status.HTTP_500_INTERNAL_SERVER_ERROR
-            return {"status": False, "message": str(e)}
-        except Exception as e:
-            logging.error(f"[{username}] get_later_schedule error: {e}")
-            logging.error(f"Traceback: {traceback.format_exc()}")
-            response.status_code = http_status.HTTP_500_INTERNAL_SERVER_ERROR
-            return {"status": False, "message": str(e)}
+    async def on_retry(e: BaseException, attempt: int):
+        logging.warning(f"[{username}] get_later_schedule: 並行ログイン競合検出、リトライします")
+        await get_session_manager().invalidate(username)
+
+    try:
+        # 同一用户、同一日期的并发请求共享同一次获取
+        result = await INTERACTIVE_POLICY.run(
+            lambda: single_flight.do(
+                single_flight.make_key(
+                    "schedule_later", username, encryptedPassword, data.targetDate
+                ),
+                lambda: _fetch_later_schedule(username, encryptedPassword, target_date),
+            ),
+            on_retry=on_retry,
+            retryable=is_concurrent_login,
+        )
+        response.status_code = http_status.HTTP_200_OK
+        return {"status": True, "data": result}
+    except GakuenBusyError as e:
+        logging.warning(f"[{username}] get_later_schedule busy: {e}")
+        response.status_code = http_status.HTTP_503_SERVICE_UNAVAILABLE
+        response.headers["Retry-After"] = str(int(GAKUEN_INTERACTIVE_DEADLINE))
+        return {"status": False, "message": str(e)}
+    except GakuenAPIError as e:
+        logging.warning(f"[{username}] get_later_schedule error: {e}")
+        response.status_code = http_status.HTTP_500_INTERNAL_SERVER_ERROR
+        return {"status": False, "message": str(e)}
+    except Exception as e:
+        logging.error(f"[{username}] get_later_schedule error: {e}")
+        logging.error(f"Traceback: {traceback.format_exc()}")
+        response.status_code = http_status.HTTP_500_INTERNAL_SERVER_ERROR
+        return {"status": False, "message": str(e)}
+
+
+def _fill_rooms(jgkm_list: list[dict], rooms: dict[str, str]) -> list[str]:
+    """教室が空の授業に rooms の教室を設定し、まだ空の授業名を返す"""
+    missing = []
+    for item in jgkm_list:
+        jugyo_name = item.get("jugyoName", "")
+        if item.get("kyostName") or not jugyo_name:
+            continue
+        if room := rooms.get(jugyo_name):
+            item["kyostName"] = room
+        else:
+            missing.append(jugyo_name)
+    return missing
 
 
 @router.post("/class_bulletin")
@@ -235,6 +283,13 @@ async def get_class_bulletin_with_room(data: ClassBulletinRequest, response: Res
     try:
         gakuen._state.api_is_logged_in = True
         result = await gakuen.class_bulletin(data.data.kaikoNendo, data.data.gakkiNo)
+    except GakuenBusyError as e:
+        logging.warning(f"[{username}] class_bulletin busy: {e}")
+        response.status_code = http_status.HTTP_503_SERVICE_UNAVAILABLE
+        response.headers["Retry-After"] = str(int(GAKUEN_INTERACTIVE_DEADLINE))
+        error_response["responseCode"] = 503
+        error_response["statusDto"]["messageList"] = [str(e)]
+        return error_response
     except GakuenAPIError as e:
         logging.warning(f"[{username}] class_bulletin error: {e}")
         response.status_code = http_status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -249,34 +304,25 @@ async def get_class_bulletin_with_room(data: ClassBulletinRequest, response: Res
     finally:
         await gakuen.close()
 
-    # 2. Redis から教室情報を補完
+    # 2. 教室キャッシュから補完（まとめて 1 回で読み込む）
     jgkm_list = result.get("jgkmDtoList", [])
-    missing_rooms: list[str] = []
-    for item in jgkm_list:
-        jugyo_name = item.get("jugyoName", "")
-        if not item.get("kyostName") and jugyo_name:
-            cached = await redis.get(f"room:{jugyo_name}")
-            if cached:
-                item["kyostName"] = cached if isinstance(cached, str) else cached.decode()
-            else:
-                missing_rooms.append(jugyo_name)
+    missing_rooms = _fill_rooms(
+        jgkm_list,
+        await room_cache.lookup(
+            item.get("jugyoName", "") for item in jgkm_list if not item.get("kyostName")
+        ),
+    )
 
     # 3. キャッシュミスがある場合、1週間分のスケジュールを取得して Redis を埋める
+    #    （日別キャッシュにある日はリクエストしない）
     if missing_rooms:
         try:
             async with get_session_manager().acquire(username, encrypted_password) as gakuen_mobile:
-                today = date.today()
-                for offset in range(7):
-                    target = today + timedelta(days=offset)
-                    await gakuen_mobile.get_later_user_schedule(
-                        target_date=target, skip_login=True,
-                    )
-            # 再度 Redis から補完
-            for item in jgkm_list:
-                if not item.get("kyostName"):
-                    cached = await redis.get(f"room:{item.get('jugyoName', '')}")
-                    if cached:
-                        item["kyostName"] = cached if isinstance(cached, str) else cached.decode()
+                await gakuen_mobile.get_user_schedule_range(
+                    date.today(), 7, skip_login=True
+                )
+            # 再度キャッシュから補完
+            _fill_rooms(jgkm_list, await room_cache.lookup(missing_rooms))
         except Exception as e:
             logging.warning(f"[{username}] room cache population failed: {e}")
 
@@ -3,7 +3,7 @@
 # All module-level variables remain importable for backward compatibility.
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
 import pytz
 from pydantic import field_validator
@@ -38,6 +38,7 @@ class Settings(BaseSettings):
 
     # --- Google OAuth ---
     client_id: Optional[str] = None
+    classroom_cache_ttl: int = 300
 
     # --- HTTP / Notifications ---
     http_proxy: Optional[str] = None
@@ -53,6 +54,31 @@ class Settings(BaseSettings):
 
     # --- Gakuen ---
     gakuen_base_url: str = "https://next.tama.ac.jp"
+    gakuen_html_parser: Literal["lxml", "html.parser"] = "lxml"
+    gakuen_kadai_detail_concurrency: int = 1
+    gakuen_max_connections: int = 20
+    gakuen_rate_limit: float = 10.0
+    gakuen_rate_burst: int = 20
+    gakuen_interactive_deadline: float = 5.0
+
+    # --- Parsing ---
+    parse_executor: Literal["process", "thread", "inline"] = "process"
+    parse_workers: int = 2
+
+    # --- Kadai snapshot ---
+    kadai_snapshot_fresh_ttl: int = 120
+    kadai_snapshot_max_stale: int = 3600
+
+    # --- Schedule (iCal) ---
+    schedule_ical_months: int = 2
+    schedule_ical_secret: Optional[str] = None  # Fernet key; unset disables pre-generation
+    schedule_ical_subscriber_days: int = 7
+    schedule_ical_pregen_hour: int = 4  # JST
+    schedule_ical_pregen_interval: float = 3.0
+    schedule_ical_pregen_fresh_ttl: int = 21600
+
+    # --- Metrics ---
+    metrics_token: Optional[str] = None  # unset disables GET /metrics
 
     @field_validator("log_level")
     @classmethod
@@ -114,6 +140,30 @@ APNS_CONFIG: dict = {
 
 HTTP_PROXY: Optional[str] = settings.http_proxy
 
+GAKUEN_HTML_PARSER: str = settings.gakuen_html_parser
+GAKUEN_KADAI_DETAIL_CONCURRENCY: int = settings.gakuen_kadai_detail_concurrency
+GAKUEN_MAX_CONNECTIONS: int = settings.gakuen_max_connections
+GAKUEN_RATE_LIMIT: float = settings.gakuen_rate_limit
+GAKUEN_RATE_BURST: int = settings.gakuen_rate_burst
+GAKUEN_INTERACTIVE_DEADLINE: float = settings.gakuen_interactive_deadline
+
+PARSE_EXECUTOR: str = settings.parse_executor
+PARSE_WORKERS: int = settings.parse_workers
+
+KADAI_SNAPSHOT_FRESH_TTL: int = settings.kadai_snapshot_fresh_ttl
+KADAI_SNAPSHOT_MAX_STALE: int = settings.kadai_snapshot_max_stale
+
+SCHEDULE_ICAL_MONTHS: int = settings.schedule_ical_months
+SCHEDULE_ICAL_SECRET: Optional[str] = settings.schedule_ical_secret
+SCHEDULE_ICAL_SUBSCRIBER_DAYS: int = settings.schedule_ical_subscriber_days
+SCHEDULE_ICAL_PREGEN_HOUR: int = settings.schedule_ical_pregen_hour
+SCHEDULE_ICAL_PREGEN_INTERVAL: float = settings.schedule_ical_pregen_interval
+SCHEDULE_ICAL_PREGEN_FRESH_TTL: int = settings.schedule_ical_pregen_fresh_ttl
+
+CLASSROOM_CACHE_TTL: int = settings.classroom_cache_ttl
+
+METRICS_TOKEN: Optional[str] = settings.metrics_token
+
 NOTIFICATION_API_URL: Optional[str] = settings.notification_api_url
 
 LOG_LEVEL: str = settings.log_level
@@ -0,0 +1,85 @@
+# core/executor.py
+# Run CPU-bound parsing off the event loop.
+"""
+解析执行器
+==========
+HTML（BeautifulSoup）和 PDF（pdfplumber）解析是 CPU 密集操作，在事件循环中执行时
+会阻塞同一进程内的 uvicorn、推送调度和 Live Activity 调度。
+``run_parse`` 把这些解析交给可配置的执行器：
+
+- ``process``（默认）— 进程池，解析不占用本进程的 GIL
+- ``thread`` — 线程池（仍受 GIL 限制，只避免长时间独占事件循环）
+- ``inline`` — 在事件循环中直接执行（调试用，与以前的行为相同）
+
+提交给进程池的函数必须是模块级函数，参数和返回值必须可 pickle
+（字符串、bytes、dict、list 等），不能传入或返回 BeautifulSoup 对象。
+
+用法::
+
+    from tutnext.core.executor import run_parse
+
+    detail = await run_parse(parse_kadai_detail, html, kaidai_id, "lxml")
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+
+
+def get_parse_executor() -> Optional[Executor]:
+    """按配置创建（首次调用时）并返回解析执行器；inline 模式返回 None。"""
+    global _executor
+    from tutnext.config import PARSE_EXECUTOR, PARSE_WORKERS
+
+    if PARSE_EXECUTOR == "inline":
+        return None
+    if _executor is None:
+        if PARSE_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(
+                max_workers=PARSE_WORKERS, thread_name_prefix="parse"
+            )
+        else:
+            # 事件循环进程中已有其他线程，fork 不安全；forkserver 启动更快于 spawn
+            _executor = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+    return _executor
+
+
+async def run_parse(fn: Callable[..., T], *args: Any) -> T:
+    """在解析执行器中执行 fn(*args) 并等待结果。
+
+    进程池因子进程异常退出而不可用时，重建进程池，本次在事件循环中直接执行。
+    """
+    global _executor
+    executor = get_parse_executor()
+    if executor is None:
+        return fn(*args)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, functools.partial(fn, *args))
+    except BrokenProcessPool:
+        logger.warning(f"[ParseExecutor] 进程池不可用，重建并在事件循环中执行: {fn.__name__}")
+        if _executor is executor:
+            _executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+        return fn(*args)
+
+
+def shutdown_parse_executor() -> None:
+    """关闭解析执行器（程序退出时调用，可重复调用）。"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
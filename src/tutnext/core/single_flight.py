@@ -0,0 +1,154 @@
+# core/single_flight.py
+# Share one in-flight call between concurrent identical requests.
+"""
+Single-flight
+=============
+同一用户的相同读取（例如 iOS App、小组件和后台刷新同时请求 /kadai）
+只向 T-NEXT 发起一次，其余调用等待并共享同一个结果。
+
+两层合并：
+
+1. **进程内** — 相同 key 的并发调用 await 同一个 asyncio.Task。
+2. **跨进程** — 领头进程持有 Redis 锁执行调用，并把结果写入短 TTL 的
+   结果键（键名带锁的 token，旧结果不会被误用）；其他进程轮询结果键，
+   锁释放后仍无结果（领头失败）则自行执行。
+
+结果需可 JSON 序列化才能跨进程共享；否则只在进程内共享。
+Redis 不可用时退化为仅进程内合并。
+
+用法::
+
+    from tutnext.core.single_flight import single_flight
+
+    key = single_flight.make_key("kadai", username, encrypted_password)
+    kadai_list = await single_flight.do(key, lambda: fetch_kadai(username))
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """进程内 + Redis 的 single-flight 调用合并器。"""
+
+    def __init__(
+        self,
+        namespace: str = "singleflight",
+        lock_timeout: float = 120,
+        wait_timeout: float = 120,
+        result_ttl: int = 10,
+        poll_interval: float = 0.2,
+    ) -> None:
+        self.namespace = namespace
+        self.lock_timeout = lock_timeout  # 领头进程异常退出时锁的最长保留时间
+        self.wait_timeout = wait_timeout  # 跟随进程等待结果的最长时间
+        self.result_ttl = result_ttl  # 结果键只用于本次合并，很快过期
+        self.poll_interval = poll_interval
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def make_key(operation: str, username: str, *args: Any) -> str:
+        """由 (操作, 用户, 参数) 生成 key。参数只以哈希形式出现（可包含凭据）。"""
+        digest = hashlib.sha256(
+            json.dumps(args, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:32]
+        return f"{operation}:{username}:{digest}"
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """执行 fn，或等待正在执行的相同 key 的调用并返回其结果。
+
+        fn 抛出的异常会传递给所有进程内的等待者。
+        某个等待者被取消时，不影响正在执行的调用和其他等待者。
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run_shared(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            logger.debug(f"[SingleFlight] 合并到进行中的调用: {key}")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 所有等待者都已取消时，避免 "exception was never retrieved"
+
+    async def _run_shared(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """跨进程合并：持锁则执行并发布结果，否则等待其他进程的结果。"""
+        from tutnext.config import redis
+
+        lock_key = f"{self.namespace}:{key}:lock"
+        result_key = f"{self.namespace}:{key}:result"
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            lock = redis.lock(lock_key, timeout=self.lock_timeout)
+            try:
+                acquired = await lock.acquire(blocking=False)
+            except Exception as e:
+                logger.warning(f"[SingleFlight] Redis 不可用，仅进程内合并: {key}: {e}")
+                return await fn()
+
+            if acquired:
+                try:
+                    result = await fn()
+                    await self._publish(
+                        f"{result_key}:{_as_str(lock.local.token)}", result
+                    )
+                    return result
+                finally:
+                    try:
+                        await lock.release()
+                    except Exception:
+                        pass  # 锁已超时释放
+
+            # 其他进程正在执行，等待其结果
+            try:
+                token = None
+                while time.monotonic() < deadline:
+                    current = await redis.get(lock_key)
+                    if current is not None:
+                        token = _as_str(current)
+                    if token is not None and (
+                        raw := await redis.get(f"{result_key}:{token}")
+                    ) is not None:
+                        logger.debug(f"[SingleFlight] 使用其他进程的结果: {key}")
+                        return json.loads(raw)
+                    if current is None:
+                        break  # 领头进程结束但没有结果（失败），重新竞争
+                    await asyncio.sleep(self.poll_interval)
+                else:
+                    logger.warning(f"[SingleFlight] 等待其他进程超时，自行执行: {key}")
+                    return await fn()
+            except Exception as e:
+                logger.warning(f"[SingleFlight] 等待结果失败，自行执行: {key}: {e}")
+                return await fn()
+
+    async def _publish(self, result_key: str, result: Any) -> None:
+        from tutnext.config import redis
+
+        try:
+            payload = json.dumps(result)
+        except (TypeError, ValueError):
+            return  # 不可序列化的结果只在进程内共享
+        try:
+            await redis.set(result_key, payload, ex=self.result_ttl)
+        except Exception:
+            pass
+
+
+def _as_str(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+# 模块级单例
+single_flight = SingleFlight()
@@ -6,6 +6,7 @@ bus_scraper.py — 巴士时刻表自动更新服务
   2. 用 aiohttp 异步下载 PDF bytes
   3. 调用 scripts/parse_bus_data.py 的解析逻辑（移植到本文件中的异步版本）
   4. 与现有 bus_data.json 比较；若有变更则写入文件并刷新内存缓存
+  PDF 解析经 tutnext.core.executor.run_parse 执行（默认进程池）。
 
 调用方式：
     async def update_bus_schedule() -> bool
@@ -23,6 +24,8 @@ from pathlib import Path
 import aiohttp
 import pdfplumber
 
+from tutnext.core.executor import run_parse
+
 logger = logging.getLogger(__name__)
 
 # ── 常量 ──────────────────────────────────────────────────────────────────────
@@ -255,12 +258,12 @@ async def update_bus_schedule() -> bool:
                 _get_bytes(session, url_wed),
             )
 
-        # 步骤 4：解析 PDF（CPU 密集，在事件循环中同步执行；PDF 解析耗时通常 <1s）
+        # 步骤 4：解析 PDF（CPU 密集，交给解析执行器，不阻塞事件循环）
         logger.info("解析平日时刻表 PDF")
-        weekday, saturday = _parse_pdf_bytes(weekday_bytes)
+        weekday, saturday = await run_parse(_parse_pdf_bytes, weekday_bytes)
 
         logger.info("解析水曜日时刻表 PDF")
-        wednesday, _ = _parse_pdf_bytes(wed_bytes)
+        wednesday, _ = await run_parse(_parse_pdf_bytes, wed_bytes)
 
         # 读取当前 bus_data.json 以获取 title / notes 字段
         if _BUS_DATA_PATH.exists():
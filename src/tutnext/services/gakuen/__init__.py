@@ -1,6 +1,8 @@
 # Re-export public API for convenience
 from tutnext.services.gakuen.errors import (
     GakuenAPIError,
+    GakuenBusyError,
+    GakuenCircuitOpenError,
     GakuenDataError,
     GakuenLoginError,
     GakuenNetworkError,
@@ -11,6 +13,8 @@ from tutnext.services.gakuen.client import GakuenAPI
 __all__ = [
     "GakuenAPI",
     "GakuenAPIError",
+    "GakuenBusyError",
+    "GakuenCircuitOpenError",
     "GakuenDataError",
     "GakuenLoginError",
     "GakuenNetworkError",
@@ -11,7 +11,8 @@ T-NEXT (多摩大学キャンパスシステム) 的异步爬虫客户端。
 认证流程:
 1. api_login() → 获取 encryptedPassword（用于移动端登录）
 2. _mobile_login() → 使用 encryptedPassword 登录移动端页面
-3. 登录后可以访问: 课题列表(get_user_kadai)、次日日程(get_later_user_schedule)
+3. 登录后可以访问: 课题列表(get_user_kadai)、次日日程(get_later_user_schedule)、
+   多日日程(get_user_schedule_range，按日缓存)
 
 注意: 会话令牌在每次请求后都会更新，必须保持 _SessionState 同步。
 
@@ -20,8 +21,13 @@ Helper classes live in their own modules:
   session.py – _SessionState (token/view-state container)
   http.py    – _HttpClient (aiohttp transport)
   ids.py     – _MobilePageIds (PrimeFaces component ID registry)
+  partial.py – streaming reader for JSF partial-response XML
+  parsers.py – pure HTML → dict page parsers (run in the parse executor)
+  rooms.py   – course → classroom cache (in-process LRU + Redis)
 """
 # tutnext/services/gakuen/client.py
+import asyncio
+import hashlib
 import re
 import logging
 import json
@@ -31,6 +37,7 @@ from typing import Any, Optional, Union, Literal
 from bs4 import BeautifulSoup, Tag
 from datetime import date, datetime, timedelta
 
+from tutnext.core.executor import run_parse
 from tutnext.services.gakuen.errors import (
     GakuenAPIError,
     GakuenLoginError,
@@ -38,13 +45,101 @@ from tutnext.services.gakuen.errors import (
     GakuenDataError,
     GakuenPermissionError,
 )
+from tutnext.services.gakuen.fingerprint import PageFingerprint
 from tutnext.services.gakuen.session import _SessionState
-from tutnext.services.gakuen.http import _HttpClient
-from tutnext.services.gakuen.ids import _MobilePageIds
+from tutnext.services.gakuen.http import DEFAULT_HTML_PARSER, _HttpClient, _PageStrainer
+from tutnext.services.gakuen.ids import _MobilePageIds, mobile_id_registry
+from tutnext.services.gakuen.metrics import gakuen_metrics
+from tutnext.services.gakuen.parsers import parse_kadai_detail, parse_schedule_content
+from tutnext.services.gakuen.partial import read_content_and_tokens
+from tutnext.services.gakuen.retry import RELOGIN_POLICY
+from tutnext.services.gakuen.rooms import room_cache
 
 import aiohttp
 
-_ROOM_CACHE_TTL = 604800  # 1 week
+# 一覧の行に現れない詳細の変更（課題内容の修正など）も 1 日以内には反映させる
+_KADAI_DETAIL_CACHE_TTL = 86400  # 1 day
+_ELEMENT_ID_RE = re.compile(r'\sid="[^"]*"')
+# 当月以外の月間スケジュールはほとんど変わらないため長めに保持する
+_MONTH_CACHE_TTL = 86400  # 1 day
+# 日別スケジュールのキャッシュ（変更の起こりやすさで TTL を変える）
+_SCHEDULE_DAY_TTL_VOLATILE = 900  # 前回から変わった日・休講 / 教室変更のある日
+_SCHEDULE_DAY_TTL_NEAR = 1800  # 今日・明日
+_SCHEDULE_DAY_TTL_FAR = 21600  # 明後日以降
+_SCHEDULE_DAY_TTL_PAST = 86400  # 過去の日付
+
+
+def _dump_month_events(events: list[dict]) -> str:
+    """month_data の結果を JSON 化する（datetime / date はタグ付きで保存）"""
+    def default(value: Any) -> dict:
+        if isinstance(value, datetime):
+            return {"__datetime__": value.isoformat()}
+        if isinstance(value, date):
+            return {"__date__": value.isoformat()}
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    return json.dumps(events, ensure_ascii=False, default=default)
+
+
+def _schedule_day_cache_key(user_id: str, target_date: date) -> str:
+    return f"schedule:day:{user_id}:{target_date.isoformat()}"
+
+
+def _schedule_day_ttl(target_date: date, day: dict, changed: bool) -> int:
+    """日別スケジュールのキャッシュ TTL（秒）"""
+    today = date.today()
+    if target_date < today:
+        return _SCHEDULE_DAY_TTL_PAST
+    if changed or any(
+        "special_tags" in entry or "previous_room" in entry
+        for entry in day.get("time_table", [])
+    ):
+        return _SCHEDULE_DAY_TTL_VOLATILE
+    if target_date <= today + timedelta(days=1):
+        return _SCHEDULE_DAY_TTL_NEAR
+    return _SCHEDULE_DAY_TTL_FAR
+
+
+async def load_cached_schedule_days(
+    user_id: str, dates: list[date]
+) -> dict[date, dict]:
+    """キャッシュ済みの日別スケジュール（get_later_user_schedule の結果）を読み込む
+
+    ログインせずに読めるため、セッションを取得する前に呼び出せる。
+    Redis 障害時・キャッシュなしの日付は結果に含まれない。
+    """
+    if not dates:
+        return {}
+    try:
+        from tutnext.config import redis
+        raw_values = await redis.mget(
+            [_schedule_day_cache_key(user_id, target) for target in dates]
+        )
+    except Exception:
+        return {}  # Redis 障害時はキャッシュをスキップ
+    return {
+        target: json.loads(raw)
+        for target, raw in zip(dates, raw_values)
+        if raw is not None
+    }
+
+
+def _load_month_events(raw: Union[str, bytes]) -> list[dict]:
+    """_dump_month_events の逆変換"""
+    def object_hook(value: dict) -> Any:
+        if "__datetime__" in value:
+            return datetime.fromisoformat(value["__datetime__"])
+        if "__date__" in value:
+            return date.fromisoformat(value["__date__"])
+        return value
+
+    return json.loads(raw, object_hook=object_hook)
+
+# 部分解析: 各ページで実際に参照するサブツリーだけを構築する
+# （セッショントークンは fetch(state=...) が本文から直接抽出するため <input> は不要）
+_KADAI_LIST_PAGE = _PageStrainer(("div", "mainContent"))
+# ホーム画面の mainContent の ID（課題一覧の mainContent には ID がない）
+_MOBILE_HOME_CONTENT_ID = "pmPage:funcForm:mainContent"
 
 
 class GakuenAPI:
@@ -59,6 +154,7 @@ class GakuenAPI:
         session: Optional[aiohttp.ClientSession] = None,
         timeout: int = 20,
         http_proxy: Optional[str] = None,
+        html_parser: Optional[str] = None,
     ) -> None:
         """GakuenAPIクライアントを初期化
 
@@ -70,14 +166,18 @@ class GakuenAPI:
             session: 既存のaiohttpセッション（省略可）
             timeout: リクエストタイムアウト（秒）
             http_proxy: HTTPプロキシURL（例: http://127.0.0.1:8888）。利用しない場合は None。
+            html_parser: HTML パーサー（"lxml" / "html.parser"）。省略時は lxml。
         """
         self.user_id = user_id
         self.password = password
         self.base_url = base_url.rstrip("/")
         self.encrypted_login_password = encrypted_login_password
         self.http_proxy = http_proxy
+        self.timeout = timeout
 
-        self._http = _HttpClient(session, timeout, http_proxy)
+        self._http = _HttpClient(
+            session, timeout, http_proxy, html_parser or DEFAULT_HTML_PARSER
+        )
         self._state = _SessionState()
         self._ids = _MobilePageIds()
 
@@ -123,6 +223,24 @@ class GakuenAPI:
         """セッションを閉じる"""
         await self._http.close()
 
+    def export_session(self) -> dict:
+        """モバイルログイン済みセッションのスナップショットを作成
+
+        cookie・rx-token・ViewState・コンポーネント ID を含み、JSON 化して
+        別プロセスの restore_session で復元できる。
+        """
+        return {
+            "cookies": self._http.export_cookies(),
+            "state": self._state.to_dict(),
+            "ids": self._ids.to_dict(),
+        }
+
+    def restore_session(self, snapshot: dict) -> None:
+        """export_session のスナップショットを復元する（ログイン不要になる）"""
+        self._http.import_cookies(snapshot.get("cookies") or [])
+        self._state.load_dict(snapshot.get("state") or {})
+        self._ids.load_dict(snapshot.get("ids") or {})
+
     async def __aenter__(self):
         """非同期コンテキストマネージャー（入口）"""
         return self
@@ -150,7 +268,9 @@ class GakuenAPI:
             "javax.faces.ViewState": "stateless",
         }
         try:
-            soup = await self._http.fetch(login_url, method="POST", data=data)
+            soup = await self._http.fetch(
+                login_url, method="POST", data=data, state=self._state
+            )
             if not isinstance(soup, BeautifulSoup):
                 raise GakuenLoginError(
                     "ログインに失敗しました。サーバーからの応答がありません。",
@@ -160,10 +280,8 @@ class GakuenAPI:
                 raise GakuenLoginError(
                     f"ログインエラー: {error_msg.text}", error_code="LOGIN_FAILED"
                 )
-            self._state.update_from_soup(soup)
             if soup.find("dt", class_="msgArea"):  # 重要アンケートがある場合
                 soup = await self._to_home_page()
-                self._state.update_from_soup(soup)
             self._ids.extract_desktop_ids(soup)
             await self._fetch_class_list(soup)
             if not self._state.class_list:
@@ -224,24 +342,19 @@ class GakuenAPI:
         }
         try:
             processed_events = []
-            soup = await self._http.fetch(
-                month_url, method="POST", data=data, features="xml"
+            body = await self._http.fetch(
+                month_url, method="POST", data=data, response_type="text"
             )
-            if (
-                isinstance(soup, BeautifulSoup)
-                and isinstance(
-                    update_tag := soup.find("update", text=re.compile("rx-token")), Tag
-                )
-                and isinstance(
-                    course_soup := soup.find(
-                        "update", {"id": f"funcForm:{j_idt}:content"}
-                    ),
-                    Tag,
+            # partial-response をストリーム解析し、DOM は構築しない（本体は JSON）
+            with gakuen_metrics.time_parse("Bsa00101"):
+                course_json, token_payload = (
+                    read_content_and_tokens(body, f"funcForm:{j_idt}:content")
+                    if isinstance(body, str)
+                    else (None, None)
                 )
-            ):
-                course_dict = json.loads(course_soup.text.strip())
-                inner_soup = BeautifulSoup(update_tag.text, "html.parser")
-                self._state.update_from_soup(inner_soup)
+            if course_json is not None and token_payload is not None:
+                course_dict = json.loads(course_json.strip())
+                self._state.update_from_html(token_payload)
                 for event in course_dict["events"]:
                     event["title"] = event["title"].replace("\u3000", " ").strip()
                     if not event["title"]:
@@ -282,6 +395,67 @@ class GakuenAPI:
                 error_code="MONTH_DATA_ERROR",
             )
 
+    async def month_range(
+        self, year: int, month: int, months: int = 2, use_cache: bool = True
+    ) -> list[dict]:
+        """指定月から months か月分の授業スケジュールを取得
+
+        Returns:
+            list: 授業イベントデータ（月順に連結、形式は month_data と同じ）
+        """
+        by_month = await self.month_range_by_month(year, month, months, use_cache)
+        return [event for events in by_month.values() for event in events]
+
+    async def month_range_by_month(
+        self, year: int, month: int, months: int = 2, use_cache: bool = True
+    ) -> dict[str, list[dict]]:
+        """指定月から months か月分の授業スケジュールを月ごとに取得
+
+        月ごとの結果を Redis（schedule:month:{user}:{yyyy-mm}）にキャッシュし、
+        当月とキャッシュがない月だけを T-NEXT から取得する。
+        1 つの JSF セッションではトークンがリクエストごとに更新されるため、
+        取得が必要な月は順番に取得する。
+
+        Args:
+            year: 開始年
+            month: 開始月
+            months: 取得する月数
+            use_cache: False の場合はすべての月を取得し直す
+
+        Raises:
+            GakuenNetworkError: ネットワークエラー
+            GakuenDataError: データ解析エラー
+
+        Returns:
+            dict: "yyyy-mm" → 授業イベントデータ（月順、形式は month_data と同じ）
+        """
+        today = date.today()
+        by_month: dict[str, list[dict]] = {}
+        for offset in range(months):
+            y, m = divmod(year * 12 + (month - 1) + offset, 12)
+            m += 1
+            month_key = f"{y:04d}-{m:02d}"
+            cache_key = f"schedule:month:{self.user_id}:{month_key}"
+            is_current_month = (y, m) == (today.year, today.month)
+            if use_cache and not is_current_month:
+                try:
+                    from tutnext.config import redis
+                    if raw := await redis.get(cache_key):
+                        by_month[month_key] = _load_month_events(raw)
+                        continue
+                except Exception:
+                    pass  # Redis 障害時はキャッシュをスキップ
+            month_events = await self.month_data(y, m)
+            try:
+                from tutnext.config import redis
+                await redis.set(
+                    cache_key, _dump_month_events(month_events), ex=_MONTH_CACHE_TTL
+                )
+            except Exception:
+                pass  # Redis 障害時はキャッシュをスキップ
+            by_month[month_key] = month_events
+        return by_month
+
     async def kadai_data(self) -> list[dict]:
         """課題データを取得 (Web)
 
@@ -303,7 +477,6 @@ class GakuenAPI:
 
         try:
             soup = await self._to_home_page()
-            self._state.update_from_soup(soup)
             kadai_tab = soup.find("div", id=f"funcForm:{self._ids.kadai_tab_id}")
             if not isinstance(kadai_tab, Tag):
                 raise GakuenDataError(
@@ -415,6 +588,8 @@ class GakuenAPI:
                 )
             return data
         except Exception as e:
+            if isinstance(e, GakuenAPIError):
+                raise
             raise GakuenAPIError(
                 f"APIログアウト処理中に予想外エラーが発生しました: {str(e)}",
                 error_code="UNEXPECTED_API_LOGOUT_ERROR",
@@ -466,6 +641,8 @@ class GakuenAPI:
                 )
             return data["data"]
         except Exception as e:
+            if isinstance(e, GakuenAPIError):
+                raise
             raise GakuenAPIError(
                 f"クラスデータ取得中に予想外エラーが発生しました: {str(e)}",
                 error_code="UNEXPECTED_CLASS_DATA_ERROR",
@@ -511,6 +688,8 @@ class GakuenAPI:
                 )
             return data["data"]
         except Exception as e:
+            if isinstance(e, GakuenAPIError):
+                raise
             raise GakuenAPIError(
                 f"クラス掲示データ情報取得中に予想外エラーが発生しました: {str(e)}",
                 error_code="UNEXPECTED_CLASS_DATA_INFO_ERROR",
@@ -522,13 +701,17 @@ class GakuenAPI:
         encrypted_login_password: Optional[str] = None,
         target_date: Optional[date] = None,
         skip_login: bool = False,
+        use_cache: bool = False,
     ) -> dict:
         """後日ユーザースケジュール取得 (encrypted_login_passwordが必要) Student Only
 
+        取得した結果は日別キャッシュ（load_cached_schedule_days）にも保存する。
+
         Args:
             user_id: ユーザーID（学籍番号）
             encrypted_login_password: 暗号化されたログインパスワード
             target_date: 取得する日付（省略時は翌日）
+            use_cache: 日別キャッシュがあればリクエストせずにそれを返す
 
         Raises:
             GakuenPermissionError: ユーザーIDと暗号化されたパスワードが必要な場合
@@ -565,203 +748,189 @@ class GakuenAPI:
         if target_date is None:
             target_date = date.today() + timedelta(days=1)
         target_date_str = target_date.strftime("%Y/%m/%d")
+        if use_cache:
+            cached = await load_cached_schedule_days(self.user_id, [target_date])
+            if target_date in cached:
+                return cached[target_date]
         try:
             if not skip_login:
                 await self._mobile_login()
-            schedule_url = f"{self.base_url}/uprx/up/bs/bsa501/Bsa50101.xhtml"
-            cal = self._ids.calendar_id or "pmPage:funcForm:j_idt104"
-            acc_active = self._ids.accordion_active_id or "pmPage:funcForm:j_idt107_active"
-            data = {
-                "javax.faces.partial.ajax": "true",
-                "javax.faces.source": cal,
-                "javax.faces.partial.execute": cal,
-                "javax.faces.partial.render": "pmPage:funcForm:mainContent",
-                "javax.faces.behavior.event": "dateSelect",
-                "javax.faces.partial.event": "dateSelect",
-                "pmPage:funcForm": "pmPage:funcForm",
-                "rx-token": self._state.rx_tokens["token"],
-                "rx-loginKey": self._state.rx_tokens["loginKey"],
-                "rx-deviceKbn": self._state.rx_tokens["deviceKbn"],
-                "rx-loginType": self._state.rx_tokens["loginType"],
-                f"{cal}_input": target_date_str,
-                acc_active: "0,1",
-                "javax.faces.ViewState": self._state.view_state,
-                "javax.faces.RenderKitId": "PRIMEFACES_MOBILE",
-            }
-            soup = await self._http.fetch(
-                schedule_url, method="POST", data=data, features="xml"
-            )
-            if (
-                isinstance(soup, BeautifulSoup)
-                and isinstance(
-                    update_tag := soup.find("update", text=re.compile("rx-token")), Tag
+            main_content, token_payload = await self._fetch_schedule_day(target_date_str)
+            if main_content is None and self._ids.from_registry:
+                # 共有 ID が古いと mainContent が返らない
+                await self._rediscover_mobile_ids()
+                main_content, token_payload = await self._fetch_schedule_day(
+                    target_date_str
                 )
-                and isinstance(
-                    main_content := soup.find(
-                        "update", {"id": "pmPage:funcForm:mainContent"}
-                    ),
-                    Tag,
-                )
-            ):
-                inner_soup = BeautifulSoup(update_tag.text, "html.parser")
-                self._state.update_from_soup(inner_soup)
-                content_soup = BeautifulSoup(main_content.text, "html.parser")
-
-                # 1. 日期信息
-                date_display = content_soup.find("span", class_="dateDisp")
-                if date_display:
-                    raw_date = date_display.text.strip()
-                    out_data["date_info"] = {
-                        "date": raw_date.split("(")[0],
-                        "day_of_week": raw_date.split("(")[1].rstrip(")"),
-                    }
+            if main_content is not None and token_payload is not None:
+                self._state.update_from_html(token_payload)
+                out_data.update(await self._parse_schedule_day(main_content))
+                await self._store_schedule_days({target_date: out_data})
 
-                # 2. 終日活動 (全天事件)
-                all_day_panel = content_soup.find("div", class_="syujitsuPanel")
-                if isinstance(all_day_panel, Tag):
-                    all_day_events = all_day_panel.find_all("a", recursive=True)
-                    for event in all_day_events:
-                        if isinstance(event, Tag):
-                            out_data["all_day_events"].append(
-                                {
-                                    "title": event.text.strip().replace("\u3000", " "),
-                                    "id": event.get("id", ""),
-                                    "is_important": "重要" in event.text
-                                    or "【重要】" in event.text,
-                                }
-                            )
+            await self._cache_rooms([out_data])
+            return out_data
+        except Exception as e:
+            if isinstance(e, GakuenAPIError):
+                raise
+            raise GakuenAPIError(
+                f"ユーザーのスケジュール取得中に予想外エラーが発生しました: {str(e)}",
+                error_code="UNEXPECTED_USER_SCHEDULE_ERROR",
+            )
 
-                # 3. 課程情報 (時間表)
-                time_panel = None
-                for panel in content_soup.find_all("div", class_="ui-panel-m"):
-                    header = panel.find("h3")
-                    if header and "時間別" in header.text:
-                        time_panel = panel.find("div", class_="ui-datalist")
-                        break
-                if not isinstance(time_panel, Tag):  # fallback for layout/id changes
-                    time_panel = content_soup.find("div", class_="ui-datalist")
-                if isinstance(time_panel, Tag):
-                    class_items = time_panel.select("li")
-                    for item in class_items:
-                        class_data = {}
-
-                        # 時間
-                        time_header = item.find("div", class_="jugyoInfoArea")
-                        if isinstance(time_header, Tag):
-                            # 時間情報中の span[@floatRight] タグを除去
-                            if _fr := time_header.find("span", class_="floatRight"):
-                                _fr.extract()
-                            class_data["time"] = time_header.text.strip()
-                            # 教室変更マークを確認
-                            if change_room_tag := time_header.find_all(
-                                "span", class_="signLesson"
-                            ):
-                                class_data["special_tags"] = []
-                                for tag in change_room_tag:
-                                    class_data["special_tags"].append(tag.text.strip())
-                                    class_data["time"] = class_data["time"].replace(
-                                        tag.text.strip(), ""
-                                    )
-                            if "09:00" in class_data["time"]:
-                                class_data["lesson_num"] = 1
-                            elif "10:40" in class_data["time"]:
-                                class_data["lesson_num"] = 2
-                            elif "13:00" in class_data["time"]:
-                                class_data["lesson_num"] = 3
-                            elif "14:40" in class_data["time"]:
-                                class_data["lesson_num"] = 4
-                            elif "16:20" in class_data["time"]:
-                                class_data["lesson_num"] = 5
-                            elif "18:00" in class_data["time"]:
-                                class_data["lesson_num"] = 6
-                            elif "19:40" in class_data["time"]:
-                                class_data["lesson_num"] = 7
-
-                        # 課程名称
-                        class_name = item.find("span", class_="jugyoName")
-                        if class_name:
-                            class_data["name"] = class_name.text.strip().replace(
-                                "\u3000", " "
-                            )
+    async def get_user_schedule_range(
+        self,
+        start_date: date,
+        days: int,
+        skip_login: bool = False,
+        use_cache: bool = True,
+    ) -> dict[date, dict]:
+        """start_date から days 日分のスケジュールを取得する (encrypted_login_passwordが必要) Student Only
 
-                        # 教師
-                        teachers = []
-                        teacher_tags = item.find_all("a", class_="tantoKyoin")
-                        if teacher_tags:
-                            for teacher in teacher_tags:
-                                teachers.append(
-                                    teacher.text.strip().replace("\u3000", " ")
-                                )
-                            class_data["teachers"] = teachers
-
-                        # 教室
-                        if isinstance(
-                            class_details := item.find("div", class_="jknbtDtl"), Tag
-                        ):
-                            # 通常教室情報を取得
-                            # 教室は教員リンク(a.tantoKyoin)を含むdivの次の兄弟divにある
-                            teacher_parent = None
-                            for div in class_details.find_all("div", recursive=False):
-                                if isinstance(div, Tag) and div.find("a", class_="tantoKyoin"):
-                                    teacher_parent = div
-                                    break
-                            if teacher_parent:
-                                next_div = teacher_parent.find_next_sibling("div")
-                                if (
-                                    isinstance(next_div, Tag)
-                                    and not next_div.get("id")
-                                    and not next_div.get("class")
-                                ):
-                                    room_text = next_div.get_text(strip=True)
-                                    if room_text:
-                                        class_data["room"] = room_text
-
-                            # 変更前教室を取得
-                            if isinstance(
-                                change_room_div := class_details.find(
-                                    "div",
-                                    {"id": lambda x: x is not None and "j_idt248" in x},
-                                ),
-                                Tag,
-                            ) and isinstance(
-                                previous_room := change_room_div.find("div"), Tag
-                            ):
-                                class_data["previous_room"] = previous_room.text.strip()
-
-                        if class_data:
-                            out_data["time_table"].append(class_data)
-
-            # 教室情報を Redis にキャッシュ
-            try:
-                from tutnext.config import redis
-                for entry in out_data["time_table"]:
-                    if entry.get("name") and entry.get("room"):
-                        await redis.set(
-                            f"room:{entry['name']}", entry["room"], ex=_ROOM_CACHE_TTL
-                        )
-            except Exception:
-                pass  # Redis 障害時はキャッシュをスキップ
+        キャッシュにない日付だけを 1 つのセッションで順に取得する（ViewState を
+        引き継ぐため日付の選択は逐次）。各日の解析は executor で進め、その間に
+        次の日付を取得する。取得した日は日別キャッシュと教室キャッシュに保存する。
 
-            return out_data
+        Args:
+            start_date: 最初の日付
+            days: 日数
+            use_cache: 日別キャッシュにある日付はリクエストしない
+
+        Raises:
+            GakuenAPIError: スケジュールの取得に失敗した場合
+
+        Returns:
+            dict: 日付 → get_later_user_schedule と同じ形式の辞書（日付順）
+        """
+        dates = [start_date + timedelta(days=offset) for offset in range(days)]
+        cached = await load_cached_schedule_days(self.user_id, dates) if use_cache else {}
+        pending = [target for target in dates if target not in cached]
+        parsing: dict[date, asyncio.Future] = {}
+        try:
+            if pending and not skip_login:
+                await self._mobile_login()
+            for target in pending:
+                target_date_str = target.strftime("%Y/%m/%d")
+                main_content, token_payload = await self._fetch_schedule_day(target_date_str)
+                if main_content is None and self._ids.from_registry:
+                    # 共有 ID が古いと mainContent が返らない
+                    await self._rediscover_mobile_ids()
+                    main_content, token_payload = await self._fetch_schedule_day(
+                        target_date_str
+                    )
+                if main_content is None or token_payload is None:
+                    raise GakuenAPIError(
+                        f"{target_date_str} のスケジュールの取得に失敗しました",
+                        error_code="USER_SCHEDULE_FETCH_ERROR",
+                    )
+                # 次の日付のリクエストに必要なトークンだけ先に反映し、解析は並行して進める
+                self._state.update_from_html(token_payload)
+                parsing[target] = asyncio.ensure_future(
+                    self._parse_schedule_day(main_content)
+                )
+            fetched = {target: await future for target, future in parsing.items()}
         except Exception as e:
+            for future in parsing.values():
+                future.cancel()
             if isinstance(e, GakuenAPIError):
                 raise
             raise GakuenAPIError(
                 f"ユーザーのスケジュール取得中に予想外エラーが発生しました: {str(e)}",
                 error_code="UNEXPECTED_USER_SCHEDULE_ERROR",
             )
+        await self._store_schedule_days(fetched)
+        result = {target: cached[target] if target in cached else fetched[target] for target in dates}
+        await self._cache_rooms(list(result.values()))
+        return result
+
+    async def _parse_schedule_day(self, main_content: str) -> dict:
+        """スケジュール画面の mainContent を executor で解析する"""
+        with gakuen_metrics.time_parse("Bsa50101"):
+            return await run_parse(
+                parse_schedule_content, main_content, self._http.html_parser
+            )
+
+    async def _store_schedule_days(self, days: dict[date, dict]) -> None:
+        """日別スケジュールをキャッシュする（前回から変わった日は TTL を短くする）"""
+        if not days:
+            return
+        keys = [_schedule_day_cache_key(self.user_id, target) for target in days]
+        try:
+            from tutnext.config import redis
+            previous = await redis.mget(keys)
+            async with redis.pipeline(transaction=False) as pipe:
+                for (target, day), key, raw in zip(days.items(), keys, previous):
+                    changed = raw is not None and json.loads(raw) != day
+                    pipe.set(
+                        key,
+                        json.dumps(day, ensure_ascii=False),
+                        ex=_schedule_day_ttl(target, day, changed),
+                    )
+                await pipe.execute()
+        except Exception:
+            pass  # Redis 障害時はキャッシュをスキップ
+
+    async def _cache_rooms(self, days: list[dict]) -> None:
+        """スケジュールの教室情報をキャッシュ（class_bulletin の補完用）"""
+        await room_cache.store(
+            {
+                entry.get("name", ""): entry.get("room", "")
+                for day in days
+                for entry in day["time_table"]
+            }
+        )
+
+    async def _fetch_schedule_day(
+        self, target_date_str: str
+    ) -> tuple[Optional[str], Optional[str]]:
+        """スケジュール画面で日付を選択し、(mainContent, トークン) の payload を返す"""
+        schedule_url = f"{self.base_url}/uprx/up/bs/bsa501/Bsa50101.xhtml"
+        cal = self._ids.calendar_id or "pmPage:funcForm:j_idt104"
+        acc_active = self._ids.accordion_active_id or "pmPage:funcForm:j_idt107_active"
+        data = {
+            "javax.faces.partial.ajax": "true",
+            "javax.faces.source": cal,
+            "javax.faces.partial.execute": cal,
+            "javax.faces.partial.render": "pmPage:funcForm:mainContent",
+            "javax.faces.behavior.event": "dateSelect",
+            "javax.faces.partial.event": "dateSelect",
+            "pmPage:funcForm": "pmPage:funcForm",
+            "rx-token": self._state.rx_tokens["token"],
+            "rx-loginKey": self._state.rx_tokens["loginKey"],
+            "rx-deviceKbn": self._state.rx_tokens["deviceKbn"],
+            "rx-loginType": self._state.rx_tokens["loginType"],
+            f"{cal}_input": target_date_str,
+            acc_active: "0,1",
+            "javax.faces.ViewState": self._state.view_state,
+            "javax.faces.RenderKitId": "PRIMEFACES_MOBILE",
+        }
+        body = await self._http.fetch(
+            schedule_url, method="POST", data=data, response_type="text"
+        )
+        # partial-response をストリーム解析し、mainContent だけを DOM にする
+        with gakuen_metrics.time_parse("Bsa50101"):
+            return (
+                read_content_and_tokens(body, "pmPage:funcForm:mainContent")
+                if isinstance(body, str)
+                else (None, None)
+            )
 
     async def get_user_kadai(
         self,
         user_id: Optional[str] = None,
         encrypted_login_password: Optional[str] = None,
         skip_login: bool = False,
+        detail_concurrency: int = 1,
+        use_detail_cache: bool = True,
     ) -> list[dict]:
         """ユーザーの課題データを取得 (Mobile loginが必要) Student Only
 
         Args:
             user_id: ユーザーID（学籍番号）。省略時はインスタンスのuser_idを使用します。
             encrypted_login_password: 暗号化されたログインパスワード。省略時はインスタンスの encrypted_login_password を使用します。
+            detail_concurrency: 課題詳細を並行取得するセッション数。2 以上の場合、
+                同じユーザーで追加ログインしたセッションに課題を分担させる（既定 1 = 逐次）。
+            use_detail_cache: 一覧の行が前回から変わっていない課題は詳細ページを開かず、
+                Redis にキャッシュした解析結果を使う。
 
         Raises:
             GakuenAPIError: ユーザーの課題データの取得に失敗した場合
@@ -793,311 +962,440 @@ class GakuenAPI:
         try:
             if not skip_login:
                 await self._mobile_login()
-            kadai_url = f"{self.base_url}/uprx/up/bs/bsa501/Bsa50101.xhtml"
-            # Fix 2: use dynamically discovered IDs with fallbacks
-            acc_active = self._ids.accordion_active_id or "pmPage:funcForm:j_idt107_active"
-            kadai_link = self._ids.kadai_tab_link_id or "pmPage:funcForm:j_idt107:j_idt125"
+            main_content = await self._open_kadai_main_content()
+            if main_content is None:
+                # fingerprint を渡していないので通常は起こらない
+                raise GakuenDataError(
+                    "課題一覧ページが取得できませんでした",
+                    error_code="NO_KADAI_LIST",
+                )
+            targets = self._collect_kadai_targets(main_content)
+            cached: dict[int, dict] = {}
+            if use_detail_cache:
+                cached, targets = await self._load_cached_kadai_details(targets)
+            if detail_concurrency > 1 and len(targets) > 1:
+                details = await self._fetch_kadai_details_parallel(
+                    targets, detail_concurrency
+                )
+            else:
+                details = await self._fetch_kadai_details(targets)
+            if use_detail_cache:
+                await self._store_kadai_details(targets, details)
+            details.update(cached)
+            return [details[index] for index in sorted(details)]
+        except Exception as e:
+            if isinstance(e, GakuenAPIError):
+                raise
+            raise GakuenAPIError(
+                f"ユーザーの課題取得中に予想外エラーが発生しました: {str(e)}",
+                error_code="UNEXPECTED_USER_KADAI_ERROR",
+            )
+
+    async def get_user_kadai_summary(
+        self,
+        user_id: Optional[str] = None,
+        encrypted_login_password: Optional[str] = None,
+        skip_login: bool = False,
+        fingerprint: Optional[PageFingerprint] = None,
+    ) -> Optional[list[dict]]:
+        """課題一覧ページだけを解析した課題の概要を取得 (Mobile loginが必要) Student Only
+
+        詳細ページを開かないため 1 リクエストで済む。変化の検知に使い、
+        詳細が必要になった時だけ get_user_kadai を呼ぶ。
+
+        Args:
+            user_id: ユーザーID（学籍番号）。省略時はインスタンスのuser_idを使用します。
+            encrypted_login_password: 暗号化されたログインパスワード。省略時はインスタンスの encrypted_login_password を使用します。
+            fingerprint: 前回の指紋（load_page_fingerprint）。一覧ページが前回から
+                変わっていなければ解析せずに None を返す。今回の指紋は current に入る。
+
+        Raises:
+            GakuenAPIError: ユーザーの課題データの取得に失敗した場合
+
+        Returns:
+            list[dict]: 課題概要のリスト（一覧の表示順）
+            各課題は辞書形式で、以下のキーを含む:
+                - "id": 課題ID（一覧内の位置で決まるため、課題の増減でずれる）
+                - "kind": 課題の種類（`レポート`、`テスト` など）
+                - "courseId": コースID
+                - "courseName": コース名
+                - "title": 課題タイトル
+                - "period": 課題の期間（`2025/07/08(火) 10:40 ～ 2025/07/22(火) 23:59`形式の文字列）
+        """
+        if user_id:
+            self.user_id = user_id
+        if encrypted_login_password:
+            self.encrypted_login_password = encrypted_login_password
+        try:
+            if not skip_login:
+                await self._mobile_login()
+            main_content = await self._open_kadai_main_content(fingerprint)
+            if main_content is None:
+                return None  # 前回から変わっていない
+            return [
+                self._parse_kadai_row(link)
+                for _, _, link in self._collect_kadai_targets(main_content)
+            ]
+        except Exception as e:
+            if isinstance(e, GakuenAPIError):
+                raise
+            raise GakuenAPIError(
+                f"ユーザーの課題取得中に予想外エラーが発生しました: {str(e)}",
+                error_code="UNEXPECTED_USER_KADAI_ERROR",
+            )
+
+    async def _open_kadai_list(
+        self,
+        parse_only: Optional[_PageStrainer] = None,
+        fingerprint: Optional[PageFingerprint] = None,
+    ) -> Optional[BeautifulSoup]:
+        """課題一覧（期限あり）ページを開き、セッショントークンを更新する
+
+        parse_only を省略するとページを解析せず（トークンの更新のみ）None を返す。
+        fingerprint が前回と一致した場合も None を返す。
+        """
+        kadai_url = f"{self.base_url}/uprx/up/bs/bsa501/Bsa50101.xhtml"
+        # Fix 2: use dynamically discovered IDs with fallbacks
+        acc_active = self._ids.accordion_active_id or "pmPage:funcForm:j_idt107_active"
+        kadai_link = self._ids.kadai_tab_link_id or "pmPage:funcForm:j_idt107:j_idt125"
+        data = {
+            "pmPage:funcForm": "pmPage:funcForm",
+            "rx-token": self._state.rx_tokens["token"],
+            "rx-loginKey": self._state.rx_tokens["loginKey"],
+            "rx-deviceKbn": self._state.rx_tokens["deviceKbn"],
+            "rx-loginType": self._state.rx_tokens["loginType"],
+            acc_active: "0,1",
+            "javax.faces.ViewState": self._state.view_state,
+            "javax.faces.RenderKitId": "PRIMEFACES_MOBILE",
+            "rx.sync.source": kadai_link,
+            kadai_link: kadai_link,
+        }
+        page = await self._http.fetch(
+            kadai_url,
+            method="POST",
+            data=data,
+            response_type="soup" if parse_only is not None else "text",
+            parse_only=parse_only,
+            state=self._state,
+            fingerprint=fingerprint,
+        )
+        if fingerprint is not None and fingerprint.unchanged:
+            return None
+        if parse_only is None:
+            if not isinstance(page, str):
+                raise GakuenAPIError(
+                    "ユーザーの課題データの取得に失敗しました",
+                    error_code="USER_KADAI_FETCH_ERROR",
+                )
+            return None
+        if not isinstance(page, BeautifulSoup):
+            raise GakuenAPIError(
+                "ユーザーの課題データの取得に失敗しました",
+                error_code="USER_KADAI_FETCH_ERROR",
+            )
+        return page
+
+    async def _open_kadai_main_content(
+        self, fingerprint: Optional[PageFingerprint] = None
+    ) -> Optional[Tag]:
+        """課題一覧ページを開き、一覧部分（div.mainContent）を返す
+
+        共有レジストリの ID が古いとタブ遷移が効かずホーム画面のままになるため、
+        その場合は ID を再抽出してもう一度開く。
+        fingerprint が前回と一致した場合は解析せずに None を返す。
+        """
+        soup = await self._open_kadai_list(_KADAI_LIST_PAGE, fingerprint)
+        if soup is None:
+            return None
+        main_content = soup.find("div", class_="mainContent")
+        if self._ids.from_registry and (
+            not isinstance(main_content, Tag)
+            or main_content.get("id") == _MOBILE_HOME_CONTENT_ID
+        ):
+            await self._rediscover_mobile_ids()
+            soup = await self._open_kadai_list(_KADAI_LIST_PAGE, fingerprint)
+            if soup is None:
+                return None
+            main_content = soup.find("div", class_="mainContent")
+        if not isinstance(main_content, Tag):
+            raise GakuenAPIError(
+                "ユーザーの課題データの取得に失敗しました",
+                error_code="USER_KADAI_FETCH_ERROR",
+            )
+        return main_content
+
+    @staticmethod
+    def _collect_kadai_targets(main_content: Tag) -> list[tuple[int, str, Tag]]:
+        """課題一覧から詳細ページへのリンクを (一覧内の位置, j_idt81 ID, リンク要素) で列挙"""
+        targets = []
+        for item_index, item in enumerate(main_content.find_all("li")):
+            if not isinstance(item, Tag):
+                continue
+            link = item.find("a")
+            if not isinstance(link, Tag):
+                continue
+            kaidai_id = link.get("id")
+            if not isinstance(kaidai_id, str) or "j_idt81" not in kaidai_id:
+                continue
+            targets.append((item_index, kaidai_id, link))
+        return targets
+
+    @staticmethod
+    def _parse_kadai_row(link: Tag) -> dict:
+        """課題一覧の 1 行（詳細ページへのリンク要素）を解析する"""
+        def text_of(tag_name: str, class_name: str) -> str:
+            tag = link.find(tag_name, class_=class_name)
+            return tag.text.strip() if isinstance(tag, Tag) else ""
+
+        jugyo = text_of("span", "kadaiJugyo")
+        course = re.match(r"\[(.*?)\](.*)", jugyo)
+        return {
+            "id": link.get("id"),
+            "kind": text_of("span", "signKadai"),
+            "courseId": course.group(1) if course else "",
+            "courseName": course.group(2).strip() if course else jugyo,
+            "title": text_of("div", "kadaiTitle"),
+            "period": text_of("div", "kadaiKikan"),
+        }
+
+    def _kadai_detail_cache_keys(self, link: Tag) -> tuple[str, str]:
+        """課題一覧の行から (キャッシュキー, 行ハッシュ) を計算する
+
+        キーは授業 ID・課題名・期間から作る安定した識別子。j_idt81 の ID は一覧内の
+        位置で決まり課題の増減でずれるため、識別子にも行ハッシュにも含めない。
+        """
+        row = self._parse_kadai_row(link)
+        identity = "|".join([row["courseId"], row["title"], row["period"]])
+        key_hash = hashlib.sha1(identity.encode("utf-8")).hexdigest()
+        row_hash = hashlib.sha1(
+            _ELEMENT_ID_RE.sub("", str(link)).encode("utf-8")
+        ).hexdigest()
+        return f"kadai:detail:{self.user_id}:{key_hash}", row_hash
+
+    async def _load_cached_kadai_details(
+        self, targets: list[tuple[int, str, Tag]]
+    ) -> tuple[dict[int, dict], list[tuple[int, str, Tag]]]:
+        """行ハッシュが一致するキャッシュ済み課題詳細を読み込む
+
+        Returns:
+            (一覧内の位置 → 課題データ, 詳細ページの取得が必要な課題)
+        """
+        if not targets:
+            return {}, targets
+        keys = [self._kadai_detail_cache_keys(link) for _, _, link in targets]
+        try:
+            from tutnext.config import redis
+            raw_values = await redis.mget([key for key, _ in keys])
+        except Exception:
+            return {}, targets  # Redis 障害時はキャッシュをスキップ
+        cached: dict[int, dict] = {}
+        pending = []
+        for target, (_, row_hash), raw in zip(targets, keys, raw_values):
+            entry = json.loads(raw) if raw else None
+            if entry is None or entry.get("rowHash") != row_hash:
+                pending.append(target)
+                continue
+            item_index, kaidai_id, _ = target
+            # url には暗号化パスワードが含まれるためキャッシュせず、毎回組み立てる
+            cached[item_index] = {
+                "id": kaidai_id,
+                **entry["detail"],
+                "url": self._build_mobile_login_url(),
+            }
+        return cached, pending
+
+    async def _store_kadai_details(
+        self, targets: list[tuple[int, str, Tag]], details: dict[int, dict]
+    ) -> None:
+        """取得した課題詳細を行ハッシュと一緒にキャッシュする"""
+        if not details:
+            return
+        try:
+            from tutnext.config import redis
+            async with redis.pipeline(transaction=False) as pipe:
+                for item_index, _, link in targets:
+                    if (kadai_data := details.get(item_index)) is None:
+                        continue
+                    key, row_hash = self._kadai_detail_cache_keys(link)
+                    detail = {k: v for k, v in kadai_data.items() if k not in ("id", "url")}
+                    pipe.set(
+                        key,
+                        json.dumps({"rowHash": row_hash, "detail": detail}, ensure_ascii=False),
+                        ex=_KADAI_DETAIL_CACHE_TTL,
+                    )
+                await pipe.execute()
+        except Exception:
+            pass  # Redis 障害時はキャッシュをスキップ
+
+    async def _fetch_kadai_details(
+        self, targets: list[tuple[int, str, Tag]]
+    ) -> dict[int, dict]:
+        """課題詳細を 1 件ずつ取得する（詳細ページ → 一覧へ戻る を繰り返す）
+
+        課題一覧ページを開いた状態で呼び出すこと。
+
+        Returns:
+            dict[int, dict]: 一覧内の位置 → 課題データ
+        """
+        details: dict[int, dict] = {}
+        total_items = len(targets)
+        retry_count = 0  # 再試行カウンター
+        max_retries = RELOGIN_POLICY.max_attempts  # 最大再試行回数
+        for position, (item_index, kaidai_id, link) in enumerate(targets):
+            kadai_info_url = f"{self.base_url}/uprx/up/bs/bsa501/Bsa50102.xhtml"
             data = {
                 "pmPage:funcForm": "pmPage:funcForm",
                 "rx-token": self._state.rx_tokens["token"],
                 "rx-loginKey": self._state.rx_tokens["loginKey"],
                 "rx-deviceKbn": self._state.rx_tokens["deviceKbn"],
-                "rx-loginType": self._state.rx_tokens["loginType"],
-                acc_active: "0,1",
                 "javax.faces.ViewState": self._state.view_state,
                 "javax.faces.RenderKitId": "PRIMEFACES_MOBILE",
-                "rx.sync.source": kadai_link,
-                kadai_link: kadai_link,
+                "rx.sync.source": kaidai_id,
+                kaidai_id: kaidai_id,
             }
-            soup = await self._http.fetch(kadai_url, method="POST", data=data)
-            if not isinstance(soup, BeautifulSoup):
-                raise GakuenAPIError(
-                    "ユーザーの課題データの取得に失敗しました",
-                    error_code="USER_KADAI_FETCH_ERROR",
+            page = await self._http.fetch(
+                kadai_info_url,
+                method="POST",
+                data=data,
+                response_type="text",
+                state=self._state,
+            )
+            if not isinstance(page, str):
+                logging.warning(
+                    f"ユーザー: {self.user_id} の課題データの取得に失敗しました (ID: {kaidai_id} - {link.text}) (スキップします)"
                 )
-            self._state.update_from_soup(soup)
-            kadai_list = []
-            main_content = soup.find("div", class_="mainContent")
-            if not isinstance(main_content, Tag):
-                raise GakuenAPIError(
-                    "ユーザーの課題データの取得に失敗しました",
-                    error_code="USER_KADAI_FETCH_ERROR",
+                continue
+            with gakuen_metrics.time_parse("Bsa50102"):
+                kadai_data = await run_parse(
+                    parse_kadai_detail, page, kaidai_id, self._http.html_parser
                 )
-            all_items = main_content.find_all("li")
-            total_items = len(all_items)
-            retry_count = 0  # 再試行カウンター
-            max_retries = 5  # 最大再試行回数
-            for item_index, item in enumerate(all_items):
-                if not isinstance(item, Tag):
-                    continue
-                link = item.find("a")
-                if not isinstance(link, Tag):
-                    continue
-                kaidai_id = link.get("id")
-                if not isinstance(kaidai_id, str) or "j_idt81" not in kaidai_id:
-                    continue
-                kadai_info_url = f"{self.base_url}/uprx/up/bs/bsa501/Bsa50102.xhtml"
-                data = {
-                    "pmPage:funcForm": "pmPage:funcForm",
-                    "rx-token": self._state.rx_tokens["token"],
-                    "rx-loginKey": self._state.rx_tokens["loginKey"],
-                    "rx-deviceKbn": self._state.rx_tokens["deviceKbn"],
-                    "javax.faces.ViewState": self._state.view_state,
-                    "javax.faces.RenderKitId": "PRIMEFACES_MOBILE",
-                    "rx.sync.source": kaidai_id,
-                    kaidai_id: kaidai_id,
-                }
-                soup = await self._http.fetch(kadai_info_url, method="POST", data=data)
-                if not isinstance(soup, BeautifulSoup):
-                    logging.warning(
-                        f"ユーザー: {self.user_id} の課題データの取得に失敗しました (ID: {kaidai_id} - {link.text}) (スキップします)"
-                    )
-                    continue
-                self._state.update_from_soup(soup)
-                # 授業インフォ
-                kadai_data = {}
-                kadai_data["id"] = kaidai_id
-                if isinstance(class_info := soup.find("div", class_="jugyoInfo"), Tag):
-                    lesson_title_detail = class_info.find_all(
-                        "span", class_="nendoGakkiDisp"
-                    )
-                    kadai_data["courseSemesterName"] = lesson_title_detail[0].text
-                    kadai_data["courseName"] = lesson_title_detail[1].text
-                    course_id = re.search(r"\[(.*?)\]", class_info.text)
-                    kadai_data["courseId"] = course_id.group(1) if course_id else ""
-                # 課題インフォ
-                if isinstance(kadai_info := soup.find("ul", class_="tableData"), Tag):
-                    if (
-                        isinstance(
-                            kadai_group := kadai_info.find(  # type: ignore[call-overload]
-                                "label",
-                                string=re.compile(r"グループ"),  # type: ignore[arg-type]
-                            ),
-                            Tag,
-                        )
-                        and isinstance(
-                            kadai_group_parent := kadai_group.parent,
-                            Tag,
-                        )
-                        and isinstance(
-                            kadai_group_li := kadai_group_parent.find_next_sibling(
-                                "li"
-                            ),
-                            Tag,
-                        )
-                    ):
-                        kadai_data["group"] = kadai_group_li.text.strip()
-                    if (
-                        isinstance(
-                            kadai_title := kadai_info.find(  # type: ignore[call-overload]
-                                "label",
-                                string=re.compile(r"^(課題名|テスト名)$"),  # type: ignore[arg-type]
-                            ),
-                            Tag,
-                        )
-                        and isinstance(kadai_title_parent := kadai_title.parent, Tag)
-                        and isinstance(
-                            kadai_title_li := kadai_title_parent.find_next_sibling(
-                                "li"
-                            ),
-                            Tag,
-                        )
-                    ):
-                        kadai_data["title"] = kadai_title_li.text.strip()
-                    if (
-                        isinstance(
-                            kadai_public_period := kadai_info.find(  # type: ignore[call-overload]
-                                "label",
-                                string=re.compile(r"課題公開期間"),  # type: ignore[arg-type]
-                            ),
-                            Tag,
-                        )
-                        and isinstance(
-                            kadai_public_period_parent := kadai_public_period.parent,
-                            Tag,
-                        )
-                        and isinstance(
-                            kadai_public_period_li := kadai_public_period_parent.find_next_sibling(
-                                "li"
-                            ),
-                            Tag,
-                        )
-                    ):
-                        spans = kadai_public_period_li.find_all("span")
-                        if len(spans) >= 3:
-                            kadai_data["publishStart"] = spans[0].text.strip()
-                            kadai_data["publishEnd"] = spans[2].text.strip()
-                    if (
-                        isinstance(
-                            kadai_submit_period := kadai_info.find(  # type: ignore[call-overload]
-                                "label",
-                                string=re.compile(r"^(課題提出期間|テスト期間)$"),  # type: ignore[arg-type]
-                            ),
-                            Tag,
-                        )
-                        and isinstance(
-                            kadai_submit_period_parent := kadai_submit_period.parent,
-                            Tag,
-                        )
-                        and isinstance(
-                            kadai_submit_period_li := kadai_submit_period_parent.find_next_sibling(
-                                "li"
-                            ),
-                            Tag,
-                        )
-                    ):
-                        spans = kadai_submit_period_li.find_all("span")
-                        if len(spans) >= 3:
-                            kadai_data["submitStart"] = spans[0].text.strip()
-                            kadai_data["submitEnd"] = spans[2].text.strip()
-                            if due_date := re.search(
-                                r"(\d{4}/\d{2}/\d{2})", spans[2].text
-                            ):
-                                kadai_data["dueDate"] = due_date.group(1).replace(
-                                    "/", "-"
-                                )
-                            if due_time := re.search(r"(\d{2}:\d{2})", spans[2].text):
-                                kadai_data["dueTime"] = due_time.group(1)
-                        elif len(spans) == 2:
-                            kadai_data["submitStart"] = spans[0].text.strip()
-                            kadai_data["submitEnd"] = spans[1].text.strip()
-                            if due_date := re.search(
-                                r"(\d{4}/\d{2}/\d{2})", spans[1].text
-                            ):
-                                kadai_data["dueDate"] = due_date.group(1).replace(
-                                    "/", "-"
-                                )
-                            if due_time := re.search(r"(\d{2}:\d{2})", spans[1].text):
-                                kadai_data["dueTime"] = due_time.group(1)
-                    if (
-                        isinstance(
-                            kadai_content := kadai_info.find(  # type: ignore[call-overload]
-                                "label",
-                                string=re.compile(r"^(課題内容|テスト説明)$"),  # type: ignore[arg-type]
-                            ),
-                            Tag,
-                        )
-                        and isinstance(
-                            kadai_content_parent := kadai_content.parent,
-                            Tag,
-                        )
-                        and isinstance(
-                            kadai_content_li := kadai_content_parent.find_next_sibling(
-                                "li"
-                            ),
-                            Tag,
-                        )
-                    ):
-                        kadai_data["description"] = (
-                            kadai_content_li.text.strip().replace("\u3000", "")
-                        )
-                    if isinstance(
-                        kadai_proposed_method := kadai_info.find(  # type: ignore[call-overload]
-                            "li",
-                            string=re.compile(r"課題提出方法"),  # type: ignore[arg-type]
-                        ),
-                        Tag,
-                    ) and isinstance(
-                        kadai_proposed_method_li := kadai_proposed_method.find_next_sibling(
-                            "li"
-                        ),
-                        Tag,
-                    ):
-                        kadai_data["proposedMethod"] = (
-                            kadai_proposed_method_li.text.strip()
-                        )
-                        if min_length := kadai_proposed_method_li.find_all(
-                            "span", class_="smallInput"
-                        ):
-                            kadai_data["minLength"] = min_length[0].text.strip()
-                            kadai_data["maxLength"] = min_length[1].text.strip()
-                    kadai_data["url"] = self._build_mobile_login_url()
-                    kadai_list.append(kadai_data)
-                back_kadai_list_url = (
-                    f"{self.base_url}/uprx/up/jg/jga505/Jga50503.xhtml"
+            if kadai_data is not None:
+                kadai_data["url"] = self._build_mobile_login_url()
+                details[item_index] = kadai_data
+            back_kadai_list_url = (
+                f"{self.base_url}/uprx/up/jg/jga505/Jga50503.xhtml"
+            )
+            data = {
+                "pmPage:funcForm": "pmPage:funcForm",
+                "rx-token": self._state.rx_tokens["token"],
+                "rx-loginKey": self._state.rx_tokens["loginKey"],
+                "rx-deviceKbn": self._state.rx_tokens["deviceKbn"],
+                "javax.faces.ViewState": self._state.view_state,
+                "pmPage:funcForm:tstContent": "",
+                "pmPage:funcForm:tstComment": "",
+                "pmPage:funcForm:j_idt278:j_idt281": "",
+                "javax.faces.RenderKitId": "PRIMEFACES_MOBILE",
+                "rx.sync.source": "pmPage:funcForm:j_idt278:j_idt281",
+            }
+            try:
+                body = await self._http.fetch(
+                    back_kadai_list_url,
+                    method="POST",
+                    data=data,
+                    response_type="text",
+                    state=self._state,
                 )
-                data = {
-                    "pmPage:funcForm": "pmPage:funcForm",
-                    "rx-token": self._state.rx_tokens["token"],
-                    "rx-loginKey": self._state.rx_tokens["loginKey"],
-                    "rx-deviceKbn": self._state.rx_tokens["deviceKbn"],
-                    "javax.faces.ViewState": self._state.view_state,
-                    "pmPage:funcForm:tstContent": "",
-                    "pmPage:funcForm:tstComment": "",
-                    "pmPage:funcForm:j_idt278:j_idt281": "",
-                    "javax.faces.RenderKitId": "PRIMEFACES_MOBILE",
-                    "rx.sync.source": "pmPage:funcForm:j_idt278:j_idt281",
-                }
-                try:
-                    soup = await self._http.fetch(
-                        back_kadai_list_url, method="POST", data=data
-                    )
-                except GakuenAPIError as e:
-                    if e.error_code == "HTTP_ERROR":
-                        # HTTPエラーが発生した場合、最後の課題かどうかをチェック
-                        is_last_item = item_index >= total_items - 1
-                        if is_last_item:
-                            # 最後の課題の場合は正常終了
-                            logging.info(f"ユーザー: {self.user_id} の課題一覧の最後に到達しました")
-                            break
-                        else:
-                            # 最後ではない場合、再試行回数をチェック
-                            retry_count += 1
-                            if retry_count > max_retries:
-                                raise GakuenAPIError(
-                                    f"ユーザー: {self.user_id} の課題取得中にHTTPエラーが発生しました。最大再試行回数({max_retries}回)を超えました (位置: {item_index + 1}/{total_items}, ID: {kaidai_id})",
-                                    error_code="MAX_RETRIES_EXCEEDED",
-                                )
-                            # 現在位置を記録して再ログインして再試行
-                            logging.warning(
-                                f"ユーザー: {self.user_id} の課題取得中にHTTPエラーが発生しました (位置: {item_index + 1}/{total_items}, ID: {kaidai_id}, 再試行: {retry_count}/{max_retries})"
-                            )
-                            logging.warning("再ログインして続行します...")
-                            # 再ログインを実行
-                            await self._mobile_login()
-                            # 課題一覧ページに戻る
-                            kadai_url = f"{self.base_url}/uprx/up/bs/bsa501/Bsa50101.xhtml"
-                            acc_active = self._ids.accordion_active_id or "pmPage:funcForm:j_idt107_active"
-                            kadai_link = self._ids.kadai_tab_link_id or "pmPage:funcForm:j_idt107:j_idt125"
-                            data_relogin = {
-                                "pmPage:funcForm": "pmPage:funcForm",
-                                "rx-token": self._state.rx_tokens["token"],
-                                "rx-loginKey": self._state.rx_tokens["loginKey"],
-                                "rx-deviceKbn": self._state.rx_tokens["deviceKbn"],
-                                "rx-loginType": self._state.rx_tokens["loginType"],
-                                acc_active: "0,1",
-                                "javax.faces.ViewState": self._state.view_state,
-                                "javax.faces.RenderKitId": "PRIMEFACES_MOBILE",
-                                "rx.sync.source": kadai_link,
-                                kadai_link: kadai_link,
-                            }
-                            soup_relogin = await self._http.fetch(kadai_url, method="POST", data=data_relogin)
-                            if not isinstance(soup_relogin, BeautifulSoup):
-                                raise GakuenAPIError(
-                                    "再ログイン後の課題データの取得に失敗しました",
-                                    error_code="USER_KADAI_FETCH_ERROR",
-                                )
-                            self._state.update_from_soup(soup_relogin)
-                            # 次の課題に進む
-                            continue
+            except GakuenAPIError as e:
+                if e.error_code == "HTTP_ERROR":
+                    # HTTPエラーが発生した場合、最後の課題かどうかをチェック
+                    is_last_item = position >= total_items - 1
+                    if is_last_item:
+                        # 最後の課題の場合は正常終了
+                        logging.info(f"ユーザー: {self.user_id} の課題一覧の最後に到達しました")
+                        break
                     else:
-                        raise
-                # 正常に処理できた場合、再試行カウンターをリセット
-                retry_count = 0
-                if not isinstance(soup, BeautifulSoup):
-                    raise GakuenAPIError(
-                        "ユーザーの課題一覧ページの取得に失敗しました",
-                        error_code="USER_KADAI_LIST_FETCH_ERROR",
-                    )
-                self._state.update_from_soup(soup)
-            return kadai_list
-        except Exception as e:
-            if isinstance(e, GakuenAPIError):
-                raise
-            raise GakuenAPIError(
-                f"ユーザーの課題取得中に予想外エラーが発生しました: {str(e)}",
-                error_code="UNEXPECTED_USER_KADAI_ERROR",
-            )
+                        # 最後ではない場合、再試行回数をチェック
+                        retry_count += 1
+                        if retry_count > max_retries:
+                            raise GakuenAPIError(
+                                f"ユーザー: {self.user_id} の課題取得中にHTTPエラーが発生しました。最大再試行回数({max_retries}回)を超えました (位置: {position + 1}/{total_items}, ID: {kaidai_id})",
+                                error_code="MAX_RETRIES_EXCEEDED",
+                            )
+                        # 現在位置を記録して再ログインして再試行
+                        logging.warning(
+                            f"ユーザー: {self.user_id} の課題取得中にHTTPエラーが発生しました (位置: {position + 1}/{total_items}, ID: {kaidai_id}, 再試行: {retry_count}/{max_retries})"
+                        )
+                        logging.warning("再ログインして続行します...")
+                        # 連続失敗時にサーバーへ負荷をかけ続けないよう待機してから再ログイン
+                        await asyncio.sleep(RELOGIN_POLICY.delay(retry_count))
+                        # 再ログインを実行
+                        await self._mobile_login()
+                        # 課題一覧ページに戻る
+                        await self._open_kadai_list()
+                        # 次の課題に進む
+                        continue
+                else:
+                    raise
+            # 正常に処理できた場合、再試行カウンターをリセット
+            retry_count = 0
+            if not isinstance(body, str):
+                raise GakuenAPIError(
+                    "ユーザーの課題一覧ページの取得に失敗しました",
+                    error_code="USER_KADAI_LIST_FETCH_ERROR",
+                )
+        return details
+
+    async def _fetch_kadai_details_parallel(
+        self, targets: list[tuple[int, str, Tag]], concurrency: int
+    ) -> dict[int, dict]:
+        """課題詳細を複数セッションで分担して取得する
+
+        JSF の ViewState / rx-token はリクエストごとに更新されるため、1 つのセッションで
+        詳細ページを同時に開くことはできない。そこで同じユーザーで追加ログインした
+        セッション（フォーク）を用意し、課題一覧を連続したチャンクに分けて
+        各セッションが逐次ナビゲーションで処理する。先頭のチャンクは自分自身が担当する。
+
+        フォークのログインや取得に失敗した場合、そのチャンクは自分自身のセッションで
+        逐次取得し直す（結果は逐次モードと同じになる）。
+        """
+        workers = min(concurrency, len(targets))
+        size = -(-len(targets) // workers)
+        chunks = [targets[i : i + size] for i in range(0, len(targets), size)]
+
+        async def run_fork(chunk: list[tuple[int, str, Tag]]) -> dict[int, dict]:
+            fork = self._fork()
+            try:
+                await fork._mobile_login()
+                await fork._open_kadai_list()
+                return await fork._fetch_kadai_details(chunk)
+            finally:
+                await fork.close()
+
+        results = await asyncio.gather(
+            self._fetch_kadai_details(chunks[0]),
+            *(run_fork(chunk) for chunk in chunks[1:]),
+            return_exceptions=True,
+        )
+        own = results[0]
+        if isinstance(own, BaseException):
+            raise own
+        details = dict(own)
+        leftovers: list[tuple[int, str, Tag]] = []
+        for chunk, result in zip(chunks[1:], results[1:]):
+            if isinstance(result, BaseException):
+                logging.warning(
+                    f"ユーザー: {self.user_id} の課題詳細の並行取得に失敗しました ({len(chunk)} 件を逐次取得に切り替えます): {result}"
+                )
+                leftovers.extend(chunk)
+            else:
+                details.update(result)
+        if leftovers:
+            # 自分のチャンクの最後で一覧に戻れていない場合があるため開き直す
+            await self._open_kadai_list()
+            details.update(await self._fetch_kadai_details(leftovers))
+        return details
+
+    def _fork(self) -> "GakuenAPI":
+        """同じ認証情報・設定で独立したセッションを持つクライアントを作成（未ログイン）"""
+        return GakuenAPI(
+            self.user_id,
+            self.password,
+            self.base_url,
+            self.encrypted_login_password,
+            timeout=self.timeout,
+            http_proxy=self.http_proxy,
+            html_parser=self._http.html_parser,
+        )
 
     def _build_mobile_login_url(self) -> str:
         """モバイルログイン URL を構築する
@@ -1148,19 +1446,17 @@ class GakuenAPI:
         }
         try:
             # Reset mobile IDs for fresh extraction on each login
-            self._ids.calendar_id = None
-            self._ids.accordion_id = None
-            self._ids.kadai_tab_link_id = None
-            self._ids.menu_button_id = None
+            self._ids.reset_mobile_ids()
 
             await self._http.fetch(login_url, method="GET", params=params)
-            soup = await self._http.fetch(to_index_url, method="POST", data=data)
+            soup = await self._http.fetch(
+                to_index_url, method="POST", data=data, state=self._state
+            )
             if not isinstance(soup, BeautifulSoup):
                 raise GakuenAPIError(
                     "システムのホームページの取得に失敗しました",
                     error_code="HOME_PAGE_FETCH_ERROR",
                 )
-            self._state.update_from_soup(soup)
             if not self._state.rx_tokens:
                 error_span = soup.find("span", class_="ui-messages-error-detail")
                 page_title = getattr(soup.find("title"), "text", "unknown")
@@ -1188,9 +1484,14 @@ class GakuenAPI:
                             self._ids.menu_button_id = name
                             break
                 soup = await self._to_mobile_home_page()
-                self._state.update_from_soup(soup)
-            # Fix 2: dynamically extract mobile component IDs from login response
-            self._ids.extract_mobile_ids(soup)
+            # 同じ画面バージョンの ID が共有レジストリにあれば抽出を省略する
+            fingerprint = _MobilePageIds.page_fingerprint(soup)
+            if shared_ids := await mobile_id_registry.lookup(fingerprint):
+                self._ids.apply_mobile_ids(shared_ids)
+            else:
+                # Fix 2: dynamically extract mobile component IDs from login response
+                self._ids.extract_mobile_ids(soup)
+                await mobile_id_registry.publish(fingerprint, self._ids.mobile_ids())
             return soup
         except Exception as e:
             if isinstance(e, GakuenAPIError):
@@ -1200,8 +1501,16 @@ class GakuenAPI:
                 error_code="UNEXPECTED_MOBILE_LOGIN_ERROR",
             )
 
+    async def _rediscover_mobile_ids(self) -> None:
+        """共有レジストリの ID が古い場合に破棄し、再ログインして抽出し直す"""
+        logging.warning(
+            f"ユーザー: {self.user_id} のコンポーネント ID が古いため再抽出します"
+        )
+        await mobile_id_registry.invalidate()
+        await self._mobile_login()
+
     async def _to_home_page(self) -> BeautifulSoup:
-        """ホームページに移動"""
+        """ホームページに移動（セッショントークンも更新する）"""
         home_url = f"{self.base_url}/uprx/up/bs/bsa001/Bsa00101.xhtml"
         data = {
             "headerForm": "headerForm",
@@ -1214,7 +1523,9 @@ class GakuenAPI:
             "rx.sync.source": "headerForm:logo",
         }
         try:
-            soup = await self._http.fetch(home_url, method="POST", data=data)
+            soup = await self._http.fetch(
+                home_url, method="POST", data=data, state=self._state
+            )
             if not isinstance(soup, BeautifulSoup):
                 raise GakuenAPIError(
                     "ホームページの取得に失敗しました",
@@ -1222,13 +1533,15 @@ class GakuenAPI:
                 )
             return soup
         except Exception as e:
+            if isinstance(e, GakuenAPIError):
+                raise
             raise GakuenAPIError(
                 f"ホームページ移動中に予想外エラーが発生しました: {str(e)}",
                 error_code="HOME_PAGE_NAVIGATION_ERROR",
             )
 
     async def _to_mobile_home_page(self) -> BeautifulSoup:
-        """モバイルホームページに移動"""
+        """モバイルホームページに移動（セッショントークンも更新する）"""
         mobile_home_url = f"{self.base_url}/uprx/up/bs/bsc505/Bsc50501.xhtml"
         btn = self._ids.menu_button_id or "pmPage:menuForm:j_idt36:0:menuBtnF"
         data = {
@@ -1243,7 +1556,9 @@ class GakuenAPI:
             "rx.sync.source": btn,
         }
         try:
-            soup = await self._http.fetch(mobile_home_url, method="POST", data=data)
+            soup = await self._http.fetch(
+                mobile_home_url, method="POST", data=data, state=self._state
+            )
             if not isinstance(soup, BeautifulSoup):
                 raise GakuenAPIError(
                     "モバイルホームページの取得に失敗しました",
@@ -1251,6 +1566,8 @@ class GakuenAPI:
                 )
             return soup
         except Exception as e:
+            if isinstance(e, GakuenAPIError):
+                raise
             raise GakuenAPIError(
                 f"モバイルホームページ移動中に予想外エラーが発生しました: {str(e)}",
                 error_code="MOBILE_HOME_PAGE_NAVIGATION_ERROR",
@@ -1370,16 +1687,13 @@ class GakuenAPI:
         # タグ情報をクラスデータに追加
         __attach_tags_to_classes(class_tags)
 
-        # 教室情報を Redis にキャッシュ
-        try:
-            from tutnext.config import redis
-            for course_name, info in self._state.class_list.items():
-                if info.get("lessonClass"):
-                    await redis.set(
-                        f"room:{course_name}", info["lessonClass"], ex=_ROOM_CACHE_TTL
-                    )
-        except Exception:
-            pass  # Redis 障害時はキャッシュをスキップ
+        # 教室情報をキャッシュ
+        await room_cache.store(
+            {
+                course_name: info.get("lessonClass") or ""
+                for course_name, info in self._state.class_list.items()
+            }
+        )
 
     async def _call_first_setting(self) -> dict:
         """firstSetting API を呼び出す (api_login 後に必須)
@@ -45,6 +45,18 @@ class GakuenNetworkError(GakuenAPIError):
     pass
 
 
+class GakuenCircuitOpenError(GakuenNetworkError):
+    """T-NEXT 障害中のため即時失敗したエラー（サーキットブレーカー）"""
+
+    pass
+
+
+class GakuenBusyError(GakuenAPIError):
+    """T-NEXT へのリクエストが混雑しており、待ち時間の上限内に送信できないエラー"""
+
+    pass
+
+
 class GakuenDataError(GakuenAPIError):
     """データ解析関連エラー"""
 
@@ -0,0 +1,95 @@
+# tutnext/services/gakuen/fingerprint.py
+# Token-masked body fingerprints for detecting unchanged T-NEXT pages.
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Optional, Union
+
+_PAGE_FINGERPRINT_TTL = 86400
+
+# リクエストごとに変わるセッショントークン（rx-* の <input> と ViewState）
+_TOKEN_INPUT_PATTERN = (
+    r"""<input\b[^>]*?\bname\s*=\s*["']"""
+    r"""(rx-token|rx-loginKey|rx-deviceKbn|rx-loginType|javax\.faces\.ViewState)["'][^>]*>"""
+)
+# partial-response では ViewState が <update> の CDATA として返る
+_VIEW_STATE_UPDATE_PATTERN = (
+    r"""(<update id="[^"]*javax\.faces\.ViewState[^"]*"><!\[CDATA\[).*?(\]\]>)"""
+)
+_TOKEN_INPUT_RE = re.compile(_TOKEN_INPUT_PATTERN, re.IGNORECASE)
+_TOKEN_INPUT_RE_BYTES = re.compile(_TOKEN_INPUT_PATTERN.encode(), re.IGNORECASE)
+_VIEW_STATE_UPDATE_RE = re.compile(_VIEW_STATE_UPDATE_PATTERN, re.DOTALL)
+_VIEW_STATE_UPDATE_RE_BYTES = re.compile(_VIEW_STATE_UPDATE_PATTERN.encode(), re.DOTALL)
+
+
+def body_fingerprint(markup: Union[str, bytes]) -> str:
+    """セッショントークンを伏せたレスポンス本文のハッシュ
+
+    トークン以外が同じページ（前回から内容が変わっていないページ）は同じ値になる。
+    """
+    if isinstance(markup, str):
+        masked = _VIEW_STATE_UPDATE_RE.sub(
+            r"\1\2", _TOKEN_INPUT_RE.sub(r'<input name="\1">', markup)
+        ).encode("utf-8")
+    else:
+        masked = _VIEW_STATE_UPDATE_RE_BYTES.sub(
+            rb"\1\2", _TOKEN_INPUT_RE_BYTES.sub(rb'<input name="\1">', markup)
+        )
+    return hashlib.sha1(masked).hexdigest()
+
+
+@dataclass
+class PageFingerprint:
+    """_HttpClient.fetch の指紋モード用の入出力
+
+    previous に前回の指紋を渡すと、fetch が current に今回の指紋を設定する。
+    両者が一致した場合（unchanged）、fetch は本文を解析せずに None を返す。
+    """
+
+    previous: Optional[str] = None
+    current: Optional[str] = None
+
+    @property
+    def unchanged(self) -> bool:
+        return self.previous is not None and self.previous == self.current
+
+
+def _page_fingerprint_key(user_id: str, page: str) -> str:
+    return f"gakuen:page_fp:{user_id}:{page}"
+
+
+async def load_page_fingerprint(user_id: str, page: str) -> PageFingerprint:
+    """Redis に保存した (ユーザー, ページ) の前回の指紋を読み込む
+
+    page は繰り返し取得される同じページを表すこと（日付などを含めると毎回
+    前回の指紋がなく、Redis の読み書きが増えるだけになる）。
+    """
+    try:
+        from tutnext.config import redis
+
+        raw = await redis.get(_page_fingerprint_key(user_id, page))
+        if raw is not None:
+            return PageFingerprint(
+                previous=raw.decode() if isinstance(raw, bytes) else str(raw)
+            )
+    except Exception:
+        pass  # Redis 障害時は毎回解析する
+    return PageFingerprint()
+
+
+async def store_page_fingerprint(
+    user_id: str, page: str, fingerprint: PageFingerprint
+) -> None:
+    """今回の指紋を保存する（呼び出し側の処理が完了してから呼ぶこと）"""
+    if fingerprint.current is None:
+        return
+    try:
+        from tutnext.config import redis
+
+        await redis.set(
+            _page_fingerprint_key(user_id, page),
+            fingerprint.current,
+            ex=_PAGE_FINGERPRINT_TTL,
+        )
+    except Exception:
+        pass  # Redis 障害時は保存をスキップ
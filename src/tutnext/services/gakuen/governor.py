@@ -0,0 +1,234 @@
+# tutnext/services/gakuen/governor.py
+# Process-wide, Redis-coordinated rate governor for T-NEXT requests.
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Iterator, Optional
+
+from tutnext.services.gakuen.errors import GakuenBusyError
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """T-NEXT リクエストの優先度（値が小さいほど先に処理される）"""
+
+    INTERACTIVE = 0  # API ルート（利用者が待っている）
+    LIVE_ACTIVITY = 1  # Live Activity 登録
+    PUSH = 2  # 定時プッシュ（20:30 など）
+    MONITOR = 3  # 課題監視
+
+
+# 現在の処理の優先度。未設定の場合は API ルートからの呼び出しとみなす
+_current_priority: ContextVar[Priority] = ContextVar(
+    "gakuen_request_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """ブロック内（およびそこから作成したタスク）の T-NEXT リクエストの優先度を設定する
+
+    使用例::
+
+        with request_priority(Priority.MONITOR):
+            await monitor.check_single_user(...)
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+# トークンバケット（全プロセス共通）。残りトークンが 1 未満なら消費せず、
+# 次のトークンまでの待ち秒数を返す。時刻は Redis サーバーの時計を使う
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+
+class _LocalBucket:
+    """Redis 障害時に使うプロセス内のトークンバケット"""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future = field(compare=False)
+
+
+class RequestGovernor:
+    """T-NEXT へのリクエスト流量を全プロセスで制御する
+
+    - 流量は Redis 上のトークンバケット（rate 件/秒、最大 burst 件）で共有する。
+    - プロセス内では待ち行列を優先度順に並べ、トークンが得られるたびに
+      最も優先度の高いリクエストから送信を許可する。監視や定時プッシュが
+      集中しても、API ルートのリクエストが先に処理される。
+    - INTERACTIVE のリクエストは待ち時間に上限（interactive_deadline 秒）があり、
+      待ち行列から上限内に送信できない見込みなら即座に GakuenBusyError を送出する
+      （API は 503 を返す）。その他の優先度は順番が来るまで待つ。
+    - rate が 0 以下なら制御しない。
+
+    プロセス内の全 GakuenAPI インスタンスで共有する（get_governor）。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        interactive_deadline: float,
+        max_interactive_queue: int = 50,
+        key: str = "gakuen:governor:bucket",
+    ) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.interactive_deadline = interactive_deadline
+        self.max_interactive_queue = max_interactive_queue
+        self.key = key
+        self._local = _LocalBucket(rate, self.burst) if rate > 0 else None
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def queue_depth(self, priority: Optional[Priority] = None) -> int:
+        """待機中のリクエスト数（priority 指定時はその優先度以上のもの）"""
+        return sum(
+            1
+            for w in self._waiters
+            if not w.future.done() and (priority is None or w.priority <= priority)
+        )
+
+    async def acquire(self, priority: Optional[Priority] = None) -> None:
+        """リクエスト 1 件分の送信許可を得るまで待つ
+
+        Args:
+            priority: 優先度（省略時は request_priority で設定された値）
+
+        Raises:
+            GakuenBusyError: INTERACTIVE のリクエストが待ち時間の上限内に送信できない場合
+        """
+        if not self.enabled:
+            return
+        if priority is None:
+            priority = _current_priority.get()
+
+        timeout: Optional[float] = None
+        if priority == Priority.INTERACTIVE:
+            timeout = self.interactive_deadline
+            ahead = self.queue_depth(priority)
+            if ahead >= self.max_interactive_queue or ahead / self.rate > timeout:
+                raise self._busy(ahead)
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(int(priority), next(self._seq), loop.create_future())
+        heapq.heappush(self._waiters, waiter)
+        self._ensure_dispatcher(loop)
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            raise self._busy(self.queue_depth(priority)) from None
+
+    def _busy(self, queued: int) -> GakuenBusyError:
+        logger.warning(f"[RequestGovernor] T-NEXT へのリクエストが混雑しています（待機 {queued} 件）")
+        return GakuenBusyError(
+            "T-NEXT へのリクエストが混雑しています。しばらくしてから再度お試しください",
+            error_code="BUSY",
+            status_code=503,
+        )
+
+    def _ensure_dispatcher(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    def _head(self) -> Optional[_Waiter]:
+        """待機中の先頭（期限切れ・キャンセル済みは取り除く）"""
+        while self._waiters and self._waiters[0].future.done():
+            heapq.heappop(self._waiters)
+        return self._waiters[0] if self._waiters else None
+
+    async def _dispatch(self) -> None:
+        """待ち行列がなくなるまでトークンを取得し、優先度順に送信を許可する"""
+        while self._head() is not None:
+            wait = await self._take_token()
+            if wait > 0:
+                # 待っている間に到着した高優先度のリクエストが次の先頭になる
+                await asyncio.sleep(wait)
+                continue
+            if (head := self._head()) is not None:
+                heapq.heappop(self._waiters)
+                head.future.set_result(None)
+
+    async def _take_token(self) -> float:
+        """トークンを 1 つ取得する。取得できなければ次のトークンまでの秒数を返す"""
+        try:
+            from tutnext.config import redis
+
+            wait = await redis.eval(_TOKEN_BUCKET_SCRIPT, 1, self.key, self.rate, self.burst)
+            return float(wait)
+        except Exception as e:
+            logger.debug(f"[RequestGovernor] Redis を使えないためプロセス内で制御します: {e}")
+            return self._local.take()
+
+
+_governor: Optional[RequestGovernor] = None
+
+
+def get_governor() -> RequestGovernor:
+    """プロセス共通の RequestGovernor を返す（初回呼び出し時に設定から作成）"""
+    global _governor
+    if _governor is None:
+        from tutnext.config import (
+            GAKUEN_INTERACTIVE_DEADLINE,
+            GAKUEN_RATE_BURST,
+            GAKUEN_RATE_LIMIT,
+        )
+
+        _governor = RequestGovernor(
+            rate=GAKUEN_RATE_LIMIT,
+            burst=GAKUEN_RATE_BURST,
+            interactive_deadline=GAKUEN_INTERACTIVE_DEADLINE,
+        )
+    return _governor
@@ -1,13 +1,97 @@
 # tutnext/services/gakuen/http.py
 # Low-level HTTP transport layer used by GakuenAPI.
+import asyncio
 import json
+import time
 import urllib.parse
+from http.cookies import SimpleCookie
 from typing import Literal, Optional, Union
 
 import aiohttp
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from yarl import URL
 
 from tutnext.services.gakuen.errors import GakuenAPIError, GakuenNetworkError
+from tutnext.services.gakuen.fingerprint import PageFingerprint, body_fingerprint
+from tutnext.services.gakuen.governor import RequestGovernor, get_governor
+from tutnext.services.gakuen.metrics import endpoint_name, gakuen_metrics
+from tutnext.services.gakuen.retry import CircuitBreaker, gakuen_breaker
+from tutnext.services.gakuen.session import _SessionState
+
+# lxml は html.parser より数倍速い（依存関係として既に宣言済み）
+DEFAULT_HTML_PARSER = "lxml"
+
+_DNS_CACHE_TTL = 300
+_KEEPALIVE_TIMEOUT = 30
+
+# プロセス共通のコネクタ（イベントループごとに 1 つ）
+_shared_connector: Optional[aiohttp.TCPConnector] = None
+_shared_connector_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_shared_connector() -> Optional[aiohttp.TCPConnector]:
+    """全 GakuenAPI で共有する TCPConnector を返す（初回呼び出し時に作成）
+
+    TCP / TLS 接続を keep-alive で使い回し、DNS 解決結果もキャッシュする。
+    接続数の上限は GAKUEN_MAX_CONNECTIONS。cookie はセッションごとの
+    CookieJar に保持されるため、コネクタを共有してもユーザー間で混ざらない。
+    実行中のイベントループがない場合は None（各セッションが専用コネクタを持つ）。
+    """
+    global _shared_connector, _shared_connector_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    if (
+        _shared_connector is None
+        or _shared_connector.closed
+        or _shared_connector_loop is not loop
+    ):
+        from tutnext.config import GAKUEN_MAX_CONNECTIONS
+
+        _shared_connector = aiohttp.TCPConnector(
+            limit=GAKUEN_MAX_CONNECTIONS,
+            ttl_dns_cache=_DNS_CACHE_TTL,
+            keepalive_timeout=_KEEPALIVE_TIMEOUT,
+        )
+        _shared_connector_loop = loop
+    return _shared_connector
+
+
+async def close_shared_connector() -> None:
+    """共有コネクタを閉じる（アプリ終了時に呼び出す）"""
+    global _shared_connector, _shared_connector_loop
+    if _shared_connector is not None and not _shared_connector.closed:
+        await _shared_connector.close()
+    _shared_connector = None
+    _shared_connector_loop = None
+
+
+class _PageStrainer(SoupStrainer):
+    """指定した (タグ名, class) のサブツリーだけを構築する部分解析フィルタ
+
+    SoupStrainer の name / attrs ルールは AND 条件でしか組み合わせられないため、
+    「div.jugyoInfo または ul.tableData または input」のような OR 条件は
+    allow_tag_creation を直接上書きして判定する。
+    class を None にするとタグ名だけで判定する。
+    """
+
+    def __init__(self, *targets: tuple[str, Optional[str]]) -> None:
+        super().__init__()
+        self.targets = targets
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        classes = (attrs or {}).get("class") or ""
+        if isinstance(classes, str):
+            classes = classes.split()
+        return any(
+            name == tag and (cls is None or cls in classes)
+            for tag, cls in self.targets
+        )
+
+    def allow_string_creation(self, string) -> bool:
+        # 対象サブツリー外のトップレベル文字列は不要
+        return False
 
 
 class _HttpClient:
@@ -18,12 +102,39 @@ class _HttpClient:
         session: Optional[aiohttp.ClientSession],
         timeout: int,
         http_proxy: Optional[str],
+        html_parser: str = DEFAULT_HTML_PARSER,
+        breaker: Optional[CircuitBreaker] = None,
+        governor: Optional[RequestGovernor] = None,
     ) -> None:
         self._owns_session = session is None
-        self.session = session or aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=timeout)
-        )
+        if session is None:
+            connector = get_shared_connector()
+            session = aiohttp.ClientSession(
+                connector=connector,
+                connector_owner=connector is None,
+                cookie_jar=aiohttp.CookieJar(),
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            )
+        self.session = session
         self.http_proxy = http_proxy
+        self.html_parser = html_parser
+        self.breaker = breaker or gakuen_breaker
+        self.governor = governor or get_governor()
+
+    def parse(
+        self,
+        markup: str,
+        features: Optional[str] = None,
+        parse_only: Optional[SoupStrainer] = None,
+    ) -> BeautifulSoup:
+        """設定されたパーサーで BeautifulSoup を構築する
+
+        Args:
+            markup: HTML / XML 文字列
+            features: パーサー名（省略時は html_parser 設定値）
+            parse_only: 部分解析フィルタ（指定したサブツリーのみ構築）
+        """
+        return BeautifulSoup(markup, features or self.html_parser, parse_only=parse_only)
 
     async def fetch(
         self,
@@ -32,56 +143,156 @@ class _HttpClient:
         data: Optional[dict] = None,
         _json: Optional[dict] = None,
         params: Optional[dict] = None,
-        response_type: Literal["json", "soup"] = "soup",
-        features: Optional[str] = "html.parser",
-    ) -> Optional[Union[BeautifulSoup, dict]]:
-        """指定されたURLからデータを取得し、BeautifulSoup と Json オブジェクトを返す"""
+        response_type: Literal["json", "soup", "text"] = "soup",
+        features: Optional[str] = None,
+        parse_only: Optional[SoupStrainer] = None,
+        state: Optional[_SessionState] = None,
+        fingerprint: Optional[PageFingerprint] = None,
+    ) -> Optional[Union[BeautifulSoup, dict, str]]:
+        """指定されたURLからデータを取得し、BeautifulSoup と Json オブジェクトを返す
+
+        features を省略すると html_parser 設定値（既定 lxml）で解析する。
+        parse_only を指定すると該当サブツリーだけを構築する。
+        response_type="text" の場合は解析せずにレスポンス本文をそのまま返す。
+        state を指定すると、解析の前に本文から直接セッショントークンを抽出して
+        反映する（parse_only に <input> を含める必要はない）。
+        fingerprint を指定すると本文の指紋（トークンを伏せたハッシュ）を current に設定し、
+        previous と一致すれば解析せずに None を返す（トークンの反映は行う）。
+
+        5xx・ネットワークエラー・タイムアウトはサーキットブレーカーに失敗として記録し、
+        ブレーカーがオープン中は送信せずに GakuenCircuitOpenError を送出する。
+        ブレーカーを確認した後、送信前に RequestGovernor の許可を待つ（混雑時は GakuenBusyError）。
+
+        リクエスト数・応答時間・本文サイズ・解析時間・待ち時間を
+        論理エンドポイント（URL の画面 ID / webapi リソース）ごとに gakuen_metrics に記録する。
+        """
         _error = False
+        endpoint = endpoint_name(url)
+        queued_at = time.perf_counter()
+        try:
+            # オープン中は流量制御のトークンを待たずに即時失敗させる
+            self.breaker.before_request()
+            try:
+                await self.governor.acquire()
+            except BaseException:
+                self.breaker.release()  # 送信しなかった試験リクエストを解放する
+                raise
+        except GakuenAPIError as e:
+            gakuen_metrics.observe_request(endpoint, method, e.error_code or "ERROR")
+            raise
+        gakuen_metrics.observe_wait("governor", time.perf_counter() - queued_at)
+        recorded = False
+        sent_at = time.perf_counter()
         try:
             async with self.session.request(
                 method, url, data=data, json=_json, params=params, proxy=self.http_proxy
             ) as response:
+                if response.status >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                recorded = True
                 if response.status != 200:
                     if response_type == "json":
                         _error = True
                     else:
+                        gakuen_metrics.observe_request(
+                            endpoint, method, str(response.status), time.perf_counter() - sent_at
+                        )
                         raise GakuenNetworkError(
                             f"HTTPエラー: {response.reason}",
                             error_code="HTTP_ERROR",
                             status_code=response.status,
                         )
                 html = await response.text()
-                if response_type == "json":
-                    if "innerInfo" in html:
-                        soup = BeautifulSoup(html, "html.parser")
-                        if error_msg := soup.find("p", class_="innerInfo"):
-                            raise GakuenAPIError(
-                                f"APIエラー: {error_msg.text}",
-                                error_code="API_ERROR",
+                gakuen_metrics.observe_request(
+                    endpoint,
+                    method,
+                    str(response.status),
+                    time.perf_counter() - sent_at,
+                    response.content_length or len(html),
+                )
+                # 以降（トークン抽出・指紋・解析）は解析時間として記録する
+                with gakuen_metrics.time_parse(endpoint):
+                    if response_type == "json":
+                        if "innerInfo" in html:
+                            soup = self.parse(html, parse_only=_PageStrainer(("p", "innerInfo")))
+                            if error_msg := soup.find("p", class_="innerInfo"):
+                                raise GakuenAPIError(
+                                    f"APIエラー: {error_msg.text}",
+                                    error_code="API_ERROR",
+                                )
+                        try:
+                            out_json = json.loads(
+                                urllib.parse.unquote(html)
+                                .replace("\u3000", " ")
+                                .replace("+", " ")
                             )
-                    try:
-                        out_json = json.loads(
-                            urllib.parse.unquote(html)
-                            .replace("\u3000", " ")
-                            .replace("+", " ")
-                        )
-                        if _error:
+                            if _error:
+                                raise GakuenAPIError(
+                                    f"APIレスポンスが不正です: {''.join(out_json['statusDto']['messageList'])}",
+                                    error_code="INVALID_API_RESPONSE",
+                                )
+                        except json.JSONDecodeError as e:
                             raise GakuenAPIError(
-                                f"APIレスポンスが不正です: {''.join(out_json['statusDto']['messageList'])}",
-                                error_code="INVALID_API_RESPONSE",
+                                f"JSONデコードエラー: {str(e)}",
+                                error_code="JSON_DECODE_ERROR",
                             )
-                    except json.JSONDecodeError as e:
-                        raise GakuenAPIError(
-                            f"JSONデコードエラー: {str(e)}",
-                            error_code="JSON_DECODE_ERROR",
-                        )
-                    return out_json
-                return BeautifulSoup(html, features)
+                        return out_json
+                    if state is not None:
+                        state.update_from_markup(html)
+                    if fingerprint is not None:
+                        fingerprint.current = body_fingerprint(html)
+                        if fingerprint.unchanged:
+                            return None
+                    if response_type == "text":
+                        return html
+                    return self.parse(html, features, parse_only)
         except aiohttp.ClientError as e:
+            if not recorded:
+                self.breaker.record_failure()
+                recorded = True
+                gakuen_metrics.observe_request(endpoint, method, "NETWORK_ERROR")
             raise GakuenNetworkError(
                 f"ネットワークエラー: {str(e)}",
                 error_code="NETWORK_ERROR",
             ) from e
+        except asyncio.TimeoutError as e:
+            if not recorded:
+                self.breaker.record_failure()
+                recorded = True
+                gakuen_metrics.observe_request(
+                    endpoint, method, "TIMEOUT", time.perf_counter() - sent_at
+                )
+            raise GakuenNetworkError(
+                "タイムアウトしました",
+                error_code="TIMEOUT",
+            ) from e
+        finally:
+            if not recorded:
+                self.breaker.release()
+
+    def export_cookies(self) -> list[dict]:
+        """cookie jar の内容を JSON 化できる形で返す"""
+        return [
+            {
+                "name": morsel.key,
+                "value": morsel.value,
+                "domain": morsel["domain"],
+                "path": morsel["path"] or "/",
+            }
+            for morsel in self.session.cookie_jar
+        ]
+
+    def import_cookies(self, cookies: list[dict]) -> None:
+        """export_cookies の内容を cookie jar に戻す（host-only cookie として登録）"""
+        for cookie in cookies:
+            jar_cookie: SimpleCookie = SimpleCookie()
+            jar_cookie[cookie["name"]] = cookie["value"]
+            jar_cookie[cookie["name"]]["path"] = cookie["path"]
+            self.session.cookie_jar.update_cookies(
+                jar_cookie, response_url=URL(f"https://{cookie['domain']}/")
+            )
 
     async def close(self) -> None:
         """セッションを閉じる"""
@@ -1,10 +1,17 @@
 # tutnext/services/gakuen/ids.py
 # Dynamic registry for PrimeFaces component IDs discovered at runtime.
+import hashlib
+import json
 import re
 from typing import Optional
 
 from bs4 import BeautifulSoup, Tag
 
+# ログイン後のモバイル画面から抽出する ID（全ユーザー共通）
+_SHARED_MOBILE_ID_FIELDS = ("calendar_id", "accordion_id", "kadai_tab_link_id")
+_REGISTRY_KEY = "gakuen:ids:mobile"
+_REGISTRY_TTL = 7 * 86400
+
 
 class _MobilePageIds:
     """PrimeFaces コンポーネント ID の動的レジストリ"""
@@ -16,6 +23,57 @@ class _MobilePageIds:
         self.accordion_id: Optional[str] = None           # mobile: pmPage:funcForm:j_idt107
         self.kadai_tab_link_id: Optional[str] = None      # mobile: pmPage:funcForm:j_idt107:j_idt125
         self.menu_button_id: Optional[str] = None         # questionnaire bypass: pmPage:menuForm:j_idt36:0:menuBtnF
+        self._shared = False  # モバイル ID を _IdRegistry から取得したか
+
+    def to_dict(self) -> dict:
+        """抽出済みの ID を dict で返す"""
+        return {name: value for name, value in vars(self).items() if not name.startswith("_")}
+
+    def load_dict(self, data: dict) -> None:
+        """to_dict の内容を復元する（未知のキーは無視する）"""
+        for name, value in data.items():
+            if name in vars(self) and not name.startswith("_"):
+                setattr(self, name, value)
+
+    @property
+    def from_registry(self) -> bool:
+        """モバイル ID が共有レジストリ由来か（古い可能性がある）"""
+        return self._shared
+
+    def reset_mobile_ids(self) -> None:
+        """モバイル画面の ID を未抽出の状態に戻す"""
+        for name in _SHARED_MOBILE_ID_FIELDS:
+            setattr(self, name, None)
+        self.menu_button_id = None
+        self._shared = False
+
+    def mobile_ids(self) -> Optional[dict]:
+        """共有できるモバイル ID。1 つでも抽出できていなければ None"""
+        ids = {name: getattr(self, name) for name in _SHARED_MOBILE_ID_FIELDS}
+        return ids if all(ids.values()) else None
+
+    def apply_mobile_ids(self, ids: dict) -> None:
+        """_IdRegistry から取得したモバイル ID を設定する"""
+        for name in _SHARED_MOBILE_ID_FIELDS:
+            setattr(self, name, ids[name])
+        self._shared = True
+
+    @staticmethod
+    def page_fingerprint(soup: BeautifulSoup) -> Optional[str]:
+        """<head> で読み込む JS / CSS リソースの URL から画面のバージョン指紋を作る
+
+        T-NEXT が再デプロイされ PrimeFaces 等のバージョンが変わると指紋も変わる。
+        <head> がない場合は None。
+        """
+        head = soup.head
+        if not isinstance(head, Tag):
+            return None
+        resources = sorted(
+            str(tag.get("src") or tag.get("href"))
+            for tag in head.find_all(["script", "link"])
+            if isinstance(tag, Tag) and (tag.get("src") or tag.get("href"))
+        )
+        return hashlib.sha1("\n".join(resources).encode("utf-8")).hexdigest()
 
     @property
     def accordion_active_id(self) -> Optional[str]:
@@ -73,3 +131,67 @@ class _MobilePageIds:
                     if isinstance(link_id, str):
                         self.kadai_tab_link_id = link_id
                         break
+
+
+class _IdRegistry:
+    """全セッションで共有するモバイル画面のコンポーネント ID（プロセス内 + Redis）
+
+    モバイル ID は T-NEXT が再デプロイされるまで全学生で同じため、一度抽出したものを
+    画面の指紋（_MobilePageIds.page_fingerprint）と一緒に保存し、以降のログインでは
+    抽出処理を省略する。指紋が変わった場合と、ID が古いためにリクエストが
+    失敗した場合（invalidate）にだけ再抽出する。
+    """
+
+    def __init__(self) -> None:
+        self._fingerprint: Optional[str] = None
+        self._ids: Optional[dict] = None
+
+    async def lookup(self, fingerprint: Optional[str]) -> Optional[dict]:
+        """指紋が一致する登録済み ID を返す（なければ None）"""
+        if fingerprint is None:
+            return None
+        if self._fingerprint == fingerprint and self._ids:
+            return dict(self._ids)
+        try:
+            from tutnext.config import redis
+
+            if raw := await redis.get(_REGISTRY_KEY):
+                entry = json.loads(raw)
+                if entry.get("fingerprint") == fingerprint and all(
+                    entry.get("ids", {}).get(name) for name in _SHARED_MOBILE_ID_FIELDS
+                ):
+                    self._fingerprint, self._ids = fingerprint, entry["ids"]
+                    return dict(self._ids)
+        except Exception:
+            pass  # Redis 障害時は毎回抽出する
+        return None
+
+    async def publish(self, fingerprint: Optional[str], ids: Optional[dict]) -> None:
+        """抽出した ID を登録する"""
+        if fingerprint is None or ids is None:
+            return
+        self._fingerprint, self._ids = fingerprint, dict(ids)
+        try:
+            from tutnext.config import redis
+
+            await redis.set(
+                _REGISTRY_KEY,
+                json.dumps({"fingerprint": fingerprint, "ids": ids}),
+                ex=_REGISTRY_TTL,
+            )
+        except Exception:
+            pass  # Redis 障害時はプロセス内だけで共有する
+
+    async def invalidate(self) -> None:
+        """登録済み ID を破棄する（古い ID でリクエストが失敗した場合）"""
+        self._fingerprint, self._ids = None, None
+        try:
+            from tutnext.config import redis
+
+            await redis.delete(_REGISTRY_KEY)
+        except Exception:
+            pass  # Redis 障害時はプロセス内のみ破棄
+
+
+# プロセス共通のレジストリ
+mobile_id_registry = _IdRegistry()
@@ -0,0 +1,148 @@
+# tutnext/services/gakuen/metrics.py
+# Per-endpoint request / parse metrics for T-NEXT, exposed in Prometheus text format.
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from urllib.parse import urlsplit
+
+# 秒単位のバケット（T-NEXT は通常 0.2〜2 秒、混雑時は 10 秒を超える）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+# 解析は数ミリ秒〜数十ミリ秒
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# レスポンスサイズ（バイト）
+SIZE_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000)
+
+
+def endpoint_name(url: str) -> str:
+    """URL から論理エンドポイント名を返す
+
+    - 画面: ``/uprx/up/bs/bsa501/Bsa50101.xhtml`` → ``Bsa50101``
+    - webapi: ``/uprx/webapi/up/pk/Pky001Resource/login`` → ``Pky001Resource/login``
+    """
+    segments = [s for s in urlsplit(url).path.split("/") if s]
+    if not segments:
+        return "unknown"
+    if "webapi" in segments:
+        return "/".join(segments[-2:])
+    return segments[-1].rsplit(".", 1)[0]
+
+
+class _Histogram:
+    """累積バケットのヒストグラム（Prometheus の histogram と同じ形式）"""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最後は +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class GakuenMetrics:
+    """T-NEXT への通信をエンドポイント単位で集計する（プロセス内）
+
+    - gakuen_requests_total: リクエスト数（endpoint, method, status）。
+      status は HTTP ステータス、送信できなかった場合は error_code（TIMEOUT など）
+    - gakuen_request_seconds: 送信から本文の受信完了までの時間
+    - gakuen_response_bytes: レスポンス本文のサイズ
+    - gakuen_parse_seconds: HTML / JSON / partial-response の解析時間。fetch 内の処理と、
+      text で受け取った呼び出し側の解析をそれぞれ 1 件として記録する
+    - gakuen_wait_seconds: 送信前の待ち時間（stage: governor, session_lock）
+
+    /kadai が遅い原因が T-NEXT（request）、解析（parse）、
+    待ち（wait）のどれかを切り分けるために使う。
+    値はプロセスごとに保持するため、/metrics は応答したプロセスの値を返す。
+    """
+
+    def __init__(self) -> None:
+        self.requests: dict[tuple[str, str, str], int] = {}
+        self.latency: dict[str, _Histogram] = {}
+        self.response_bytes: dict[str, _Histogram] = {}
+        self.parse: dict[str, _Histogram] = {}
+        self.wait: dict[str, _Histogram] = {}
+
+    def observe_request(
+        self,
+        endpoint: str,
+        method: str,
+        status: str,
+        seconds: Optional[float] = None,
+        size: Optional[int] = None,
+    ) -> None:
+        """リクエスト 1 件を記録する（送信できなかった場合は seconds / size を省略）"""
+        key = (endpoint, method, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        if seconds is not None:
+            self._histogram(self.latency, endpoint, LATENCY_BUCKETS).observe(seconds)
+        if size is not None:
+            self._histogram(self.response_bytes, endpoint, SIZE_BUCKETS).observe(size)
+
+    def observe_parse(self, endpoint: str, seconds: float) -> None:
+        self._histogram(self.parse, endpoint, PARSE_BUCKETS).observe(seconds)
+
+    def observe_wait(self, stage: str, seconds: float) -> None:
+        self._histogram(self.wait, stage, LATENCY_BUCKETS).observe(seconds)
+
+    @contextmanager
+    def time_parse(self, endpoint: str) -> Iterator[None]:
+        """ブロックの実行時間を endpoint の解析時間として記録する"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_parse(endpoint, time.perf_counter() - started)
+
+    @staticmethod
+    def _histogram(
+        table: dict[str, _Histogram], key: str, buckets: tuple[float, ...]
+    ) -> _Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = _Histogram(buckets)
+        return histogram
+
+    def reset(self) -> None:
+        for table in (self.requests, self.latency, self.response_bytes, self.parse, self.wait):
+            table.clear()
+
+    def render(self) -> str:
+        """Prometheus のテキスト形式で出力する"""
+        lines = [
+            "# HELP gakuen_requests_total T-NEXT requests by logical endpoint and status.",
+            "# TYPE gakuen_requests_total counter",
+        ]
+        for (endpoint, method, status), count in sorted(self.requests.items()):
+            lines.append(
+                f'gakuen_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
+            )
+        for name, label, table, help_text in (
+            ("gakuen_request_seconds", "endpoint", self.latency, "T-NEXT response time in seconds."),
+            ("gakuen_response_bytes", "endpoint", self.response_bytes, "T-NEXT response body size in bytes."),
+            ("gakuen_parse_seconds", "endpoint", self.parse, "Time spent parsing T-NEXT responses in seconds."),
+            ("gakuen_wait_seconds", "stage", self.wait, "Time spent waiting before a T-NEXT request in seconds."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(table.items()):
+                lines.extend(histogram.render(name, f'{label}="{key}"'))
+        return "\n".join(lines) + "\n"
+
+
+# プロセス共通の集計
+gakuen_metrics = GakuenMetrics()
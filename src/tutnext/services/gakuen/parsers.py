@@ -0,0 +1,331 @@
+# tutnext/services/gakuen/parsers.py
+# Page parsers that turn T-NEXT HTML into plain data (run in the parse executor).
+"""
+T-NEXT ページの解析関数
+
+いずれもモジュールレベルの純粋な関数で、HTML 文字列を受け取り dict / list だけを返す。
+tutnext.core.executor.run_parse でプロセスプールに渡せるよう、BeautifulSoup
+オブジェクトや GakuenAPI の状態には依存しない。
+"""
+import re
+from typing import Any, Optional
+
+from bs4 import BeautifulSoup, Tag
+
+from tutnext.services.gakuen.http import _PageStrainer
+
+# 部分解析: 課題詳細ページで参照するサブツリーだけを構築する
+_KADAI_DETAIL_PAGE = _PageStrainer(("div", "jugyoInfo"), ("ul", "tableData"))
+
+
+def parse_schedule_content(markup: str, features: str) -> dict:
+    """スケジュール画面の mainContent を解析する
+
+    Args:
+        markup: mainContent の HTML
+        features: BeautifulSoup のパーサー名
+
+    Returns:
+        dict: "date_info" / "all_day_events" / "time_table"
+            （形式は GakuenAPI.get_later_user_schedule を参照）
+    """
+    out_data: dict[str, Any] = {
+        "date_info": {},
+        "all_day_events": [],
+        "time_table": [],
+    }
+    content_soup = BeautifulSoup(markup, features)
+
+    # 1. 日期信息
+    date_display = content_soup.find("span", class_="dateDisp")
+    if date_display:
+        raw_date = date_display.text.strip()
+        out_data["date_info"] = {
+            "date": raw_date.split("(")[0],
+            "day_of_week": raw_date.split("(")[1].rstrip(")"),
+        }
+
+    # 2. 終日活動 (全天事件)
+    all_day_panel = content_soup.find("div", class_="syujitsuPanel")
+    if isinstance(all_day_panel, Tag):
+        all_day_events = all_day_panel.find_all("a", recursive=True)
+        for event in all_day_events:
+            if isinstance(event, Tag):
+                out_data["all_day_events"].append(
+                    {
+                        "title": event.text.strip().replace("\u3000", " "),
+                        "id": event.get("id", ""),
+                        "is_important": "重要" in event.text
+                        or "【重要】" in event.text,
+                    }
+                )
+
+    # 3. 課程情報 (時間表)
+    time_panel = None
+    for panel in content_soup.find_all("div", class_="ui-panel-m"):
+        header = panel.find("h3")
+        if header and "時間別" in header.text:
+            time_panel = panel.find("div", class_="ui-datalist")
+            break
+    if not isinstance(time_panel, Tag):  # fallback for layout/id changes
+        time_panel = content_soup.find("div", class_="ui-datalist")
+    if isinstance(time_panel, Tag):
+        class_items = time_panel.select("li")
+        for item in class_items:
+            class_data = {}
+
+            # 時間
+            time_header = item.find("div", class_="jugyoInfoArea")
+            if isinstance(time_header, Tag):
+                # 時間情報中の span[@floatRight] タグを除去
+                if _fr := time_header.find("span", class_="floatRight"):
+                    _fr.extract()
+                class_data["time"] = time_header.text.strip()
+                # 教室変更マークを確認
+                if change_room_tag := time_header.find_all(
+                    "span", class_="signLesson"
+                ):
+                    class_data["special_tags"] = []
+                    for tag in change_room_tag:
+                        class_data["special_tags"].append(tag.text.strip())
+                        class_data["time"] = class_data["time"].replace(
+                            tag.text.strip(), ""
+                        )
+                if "09:00" in class_data["time"]:
+                    class_data["lesson_num"] = 1
+                elif "10:40" in class_data["time"]:
+                    class_data["lesson_num"] = 2
+                elif "13:00" in class_data["time"]:
+                    class_data["lesson_num"] = 3
+                elif "14:40" in class_data["time"]:
+                    class_data["lesson_num"] = 4
+                elif "16:20" in class_data["time"]:
+                    class_data["lesson_num"] = 5
+                elif "18:00" in class_data["time"]:
+                    class_data["lesson_num"] = 6
+                elif "19:40" in class_data["time"]:
+                    class_data["lesson_num"] = 7
+
+            # 課程名称
+            class_name = item.find("span", class_="jugyoName")
+            if class_name:
+                class_data["name"] = class_name.text.strip().replace(
+                    "\u3000", " "
+                )
+
+            # 教師
+            teachers = []
+            teacher_tags = item.find_all("a", class_="tantoKyoin")
+            if teacher_tags:
+                for teacher in teacher_tags:
+                    teachers.append(
+                        teacher.text.strip().replace("\u3000", " ")
+                    )
+                class_data["teachers"] = teachers
+
+            # 教室
+            if isinstance(
+                class_details := item.find("div", class_="jknbtDtl"), Tag
+            ):
+                # 通常教室情報を取得
+                # 教室は教員リンク(a.tantoKyoin)を含むdivの次の兄弟divにある
+                teacher_parent = None
+                for div in class_details.find_all("div", recursive=False):
+                    if isinstance(div, Tag) and div.find("a", class_="tantoKyoin"):
+                        teacher_parent = div
+                        break
+                if teacher_parent:
+                    next_div = teacher_parent.find_next_sibling("div")
+                    if (
+                        isinstance(next_div, Tag)
+                        and not next_div.get("id")
+                        and not next_div.get("class")
+                    ):
+                        room_text = next_div.get_text(strip=True)
+                        if room_text:
+                            class_data["room"] = room_text
+
+                # 変更前教室を取得
+                if isinstance(
+                    change_room_div := class_details.find(
+                        "div",
+                        {"id": lambda x: x is not None and "j_idt248" in x},
+                    ),
+                    Tag,
+                ) and isinstance(
+                    previous_room := change_room_div.find("div"), Tag
+                ):
+                    class_data["previous_room"] = previous_room.text.strip()
+
+            if class_data:
+                out_data["time_table"].append(class_data)
+
+    return out_data
+
+
+def parse_kadai_detail(markup: str, kaidai_id: str, features: str) -> Optional[dict]:
+    """課題詳細ページを解析する（課題インフォがない場合は None）
+
+    url（暗号化パスワードを含む）は呼び出し側で追加する。
+    """
+    soup = BeautifulSoup(markup, features, parse_only=_KADAI_DETAIL_PAGE)
+    # 授業インフォ
+    kadai_data = {}
+    kadai_data["id"] = kaidai_id
+    if isinstance(class_info := soup.find("div", class_="jugyoInfo"), Tag):
+        lesson_title_detail = class_info.find_all(
+            "span", class_="nendoGakkiDisp"
+        )
+        kadai_data["courseSemesterName"] = lesson_title_detail[0].text
+        kadai_data["courseName"] = lesson_title_detail[1].text
+        course_id = re.search(r"\[(.*?)\]", class_info.text)
+        kadai_data["courseId"] = course_id.group(1) if course_id else ""
+    # 課題インフォ
+    kadai_info = soup.find("ul", class_="tableData")
+    if not isinstance(kadai_info, Tag):
+        return None
+    if (
+        isinstance(
+            kadai_group := kadai_info.find(  # type: ignore[call-overload]
+                "label",
+                string=re.compile(r"グループ"),  # type: ignore[arg-type]
+            ),
+            Tag,
+        )
+        and isinstance(
+            kadai_group_parent := kadai_group.parent,
+            Tag,
+        )
+        and isinstance(
+            kadai_group_li := kadai_group_parent.find_next_sibling(
+                "li"
+            ),
+            Tag,
+        )
+    ):
+        kadai_data["group"] = kadai_group_li.text.strip()
+    if (
+        isinstance(
+            kadai_title := kadai_info.find(  # type: ignore[call-overload]
+                "label",
+                string=re.compile(r"^(課題名|テスト名)$"),  # type: ignore[arg-type]
+            ),
+            Tag,
+        )
+        and isinstance(kadai_title_parent := kadai_title.parent, Tag)
+        and isinstance(
+            kadai_title_li := kadai_title_parent.find_next_sibling(
+                "li"
+            ),
+            Tag,
+        )
+    ):
+        kadai_data["title"] = kadai_title_li.text.strip()
+    if (
+        isinstance(
+            kadai_public_period := kadai_info.find(  # type: ignore[call-overload]
+                "label",
+                string=re.compile(r"課題公開期間"),  # type: ignore[arg-type]
+            ),
+            Tag,
+        )
+        and isinstance(
+            kadai_public_period_parent := kadai_public_period.parent,
+            Tag,
+        )
+        and isinstance(
+            kadai_public_period_li := kadai_public_period_parent.find_next_sibling(
+                "li"
+            ),
+            Tag,
+        )
+    ):
+        spans = kadai_public_period_li.find_all("span")
+        if len(spans) >= 3:
+            kadai_data["publishStart"] = spans[0].text.strip()
+            kadai_data["publishEnd"] = spans[2].text.strip()
+    if (
+        isinstance(
+            kadai_submit_period := kadai_info.find(  # type: ignore[call-overload]
+                "label",
+                string=re.compile(r"^(課題提出期間|テスト期間)$"),  # type: ignore[arg-type]
+            ),
+            Tag,
+        )
+        and isinstance(
+            kadai_submit_period_parent := kadai_submit_period.parent,
+            Tag,
+        )
+        and isinstance(
+            kadai_submit_period_li := kadai_submit_period_parent.find_next_sibling(
+                "li"
+            ),
+            Tag,
+        )
+    ):
+        spans = kadai_submit_period_li.find_all("span")
+        if len(spans) >= 3:
+            kadai_data["submitStart"] = spans[0].text.strip()
+            kadai_data["submitEnd"] = spans[2].text.strip()
+            if due_date := re.search(
+                r"(\d{4}/\d{2}/\d{2})", spans[2].text
+            ):
+                kadai_data["dueDate"] = due_date.group(1).replace(
+                    "/", "-"
+                )
+            if due_time := re.search(r"(\d{2}:\d{2})", spans[2].text):
+                kadai_data["dueTime"] = due_time.group(1)
+        elif len(spans) == 2:
+            kadai_data["submitStart"] = spans[0].text.strip()
+            kadai_data["submitEnd"] = spans[1].text.strip()
+            if due_date := re.search(
+                r"(\d{4}/\d{2}/\d{2})", spans[1].text
+            ):
+                kadai_data["dueDate"] = due_date.group(1).replace(
+                    "/", "-"
+                )
+            if due_time := re.search(r"(\d{2}:\d{2})", spans[1].text):
+                kadai_data["dueTime"] = due_time.group(1)
+    if (
+        isinstance(
+            kadai_content := kadai_info.find(  # type: ignore[call-overload]
+                "label",
+                string=re.compile(r"^(課題内容|テスト説明)$"),  # type: ignore[arg-type]
+            ),
+            Tag,
+        )
+        and isinstance(
+            kadai_content_parent := kadai_content.parent,
+            Tag,
+        )
+        and isinstance(
+            kadai_content_li := kadai_content_parent.find_next_sibling(
+                "li"
+            ),
+            Tag,
+        )
+    ):
+        kadai_data["description"] = (
+            kadai_content_li.text.strip().replace("\u3000", "")
+        )
+    if isinstance(
+        kadai_proposed_method := kadai_info.find(  # type: ignore[call-overload]
+            "li",
+            string=re.compile(r"課題提出方法"),  # type: ignore[arg-type]
+        ),
+        Tag,
+    ) and isinstance(
+        kadai_proposed_method_li := kadai_proposed_method.find_next_sibling(
+            "li"
+        ),
+        Tag,
+    ):
+        kadai_data["proposedMethod"] = (
+            kadai_proposed_method_li.text.strip()
+        )
+        if min_length := kadai_proposed_method_li.find_all(
+            "span", class_="smallInput"
+        ):
+            kadai_data["minLength"] = min_length[0].text.strip()
+            kadai_data["maxLength"] = min_length[1].text.strip()
+    return kadai_data
@@ -0,0 +1,71 @@
+# tutnext/services/gakuen/partial.py
+# Streaming reader for PrimeFaces (JSF) partial-response XML.
+import io
+import logging
+from typing import Iterable, Iterator, Optional, Union
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+
+def iter_updates(body: Union[str, bytes]) -> Iterator[tuple[str, str]]:
+    """partial-response の <update> を (update_id, payload) として順に返す
+
+    iterparse でストリーム処理し、読み終えた要素はすぐに破棄するため
+    レスポンス全体の DOM は構築されない。payload は CDATA の生文字列。
+
+    XML として解析できない本文（セッション切れで返る HTML ページなど）は、
+    以前の BeautifulSoup(features="xml") と同じく <update> なしとして扱い、
+    それまでに読めた分だけを返す（例外は送出しない）。
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    try:
+        for _, elem in etree.iterparse(io.BytesIO(body), events=("end",), tag="update"):
+            yield elem.get("id", ""), elem.text or ""
+            elem.clear()
+            # 処理済みの兄弟要素も解放する
+            parent = elem.getparent()
+            while parent is not None and elem.getprevious() is not None:
+                del parent[0]
+    except etree.XMLSyntaxError as e:
+        logger.warning(f"partial-response ではない応答を受け取りました: {str(e)}")
+
+
+def read_updates(
+    body: Union[str, bytes], ids: Optional[Iterable[str]] = None
+) -> dict[str, str]:
+    """partial-response を {update_id: payload} に変換する
+
+    Args:
+        body: レスポンス本文
+        ids: 取得する update ID（省略時はすべて）
+    """
+    wanted = set(ids) if ids is not None else None
+    return {
+        update_id: payload
+        for update_id, payload in iter_updates(body)
+        if wanted is None or update_id in wanted
+    }
+
+
+def read_content_and_tokens(
+    body: Union[str, bytes], content_id: str, token_marker: str = "rx-token"
+) -> tuple[Optional[str], Optional[str]]:
+    """本体 update とセッショントークンを含む update の payload を取り出す
+
+    トークン側は token_marker を含む最初の update（従来の
+    ``soup.find("update", text=re.compile("rx-token"))`` と同じ選び方）。
+
+    Returns:
+        (content_payload, token_payload)。見つからないものは None。
+    """
+    content: Optional[str] = None
+    tokens: Optional[str] = None
+    for update_id, payload in iter_updates(body):
+        if tokens is None and token_marker in payload:
+            tokens = payload
+        if update_id == content_id:
+            content = payload
+    return content, tokens
@@ -0,0 +1,191 @@
+# tutnext/services/gakuen/retry.py
+# Shared retry / backoff policy and circuit breaker for T-NEXT calls.
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from tutnext.services.gakuen.errors import (
+    GakuenAPIError,
+    GakuenCircuitOpenError,
+    GakuenLoginError,
+    GakuenPermissionError,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 再試行しても結果が変わらないエラー（認証情報・入力の問題）
+NON_RETRYABLE_ERROR_CODES = frozenset(
+    {
+        "MISSING_USER_ID_OR_PASSWORD",
+        "MOBILE_LOGIN_AUTH_ERROR",
+        "NOT_LOGGED_IN",
+        "NO_MONTH_DATA",
+        "CIRCUIT_OPEN",
+        "BUSY",
+    }
+)
+# パスワード誤りは API_ERROR などのメッセージでしか判別できない
+_NON_RETRYABLE_MESSAGES = ("パスワードが正しくありません",)
+# 同じアカウントの別セッションと衝突した場合のメッセージ
+CONCURRENT_LOGIN_MESSAGE = "他端末で同時に実行"
+
+
+def is_retryable(error: BaseException) -> bool:
+    """例外が再試行で回復し得るかを error_code / 種類から判定する
+
+    - 認証・権限エラー、サーキットオープン、混雑（BUSY）は再試行しない
+    - HTTP 4xx（408 / 429 を除く）は再試行しない
+    - それ以外の GakuenAPIError（ネットワーク・5xx・セッション切れ・
+      他端末との同時実行など）と、想定外の例外は再試行する
+    """
+    if isinstance(error, (GakuenPermissionError, GakuenLoginError)):
+        return False
+    if any(message in str(error) for message in _NON_RETRYABLE_MESSAGES):
+        return False
+    if isinstance(error, GakuenAPIError):
+        if error.error_code in NON_RETRYABLE_ERROR_CODES:
+            return False
+        status = error.status_code
+        if status is not None and 400 <= status < 500 and status not in (408, 429):
+            return False
+    return isinstance(error, Exception)
+
+
+def is_concurrent_login(error: BaseException) -> bool:
+    """他端末との同時実行による失敗か（セッションを作り直せば回復する）"""
+    return isinstance(error, GakuenAPIError) and CONCURRENT_LOGIN_MESSAGE in str(error)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """指数バックオフ + ジッターの再試行ポリシー
+
+    attempt 回目（1 始まり）の失敗後の待ち時間は
+    min(max_delay, base_delay * multiplier ** (attempt - 1)) を上限に、
+    jitter の割合だけランダムに短くする（同時に失敗した利用者の再試行を分散させる）。
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 10.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+
+    def delay(self, attempt: int) -> float:
+        """attempt 回目の失敗後に待つ秒数"""
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return random.uniform(ceiling * (1 - self.jitter), ceiling)
+
+    async def run(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        on_retry: Optional[Callable[[BaseException, int], Awaitable[None]]] = None,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+    ) -> T:
+        """fn を実行し、再試行可能なエラーならポリシーに従って再試行する
+
+        fn は毎回呼び直されるため、セッションの取得（ロック）も fn の中で行うこと。
+        待機中にロックを保持しない。
+
+        Args:
+            fn: 実行する処理
+            on_retry: 再試行の前に呼ばれるフック（例外, 失敗回数）。セッション破棄など。
+            retryable: 再試行可否の判定（既定は is_retryable）
+
+        Raises:
+            最後に発生した例外（再試行不可の場合は即座に）
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await fn()
+            except Exception as e:
+                if attempt >= self.max_attempts or not retryable(e):
+                    raise
+                if on_retry is not None:
+                    await on_retry(e, attempt)
+                await asyncio.sleep(self.delay(attempt))
+
+
+# 利用箇所ごとのポリシー
+INTERACTIVE_POLICY = RetryPolicy(max_attempts=2, base_delay=2.0, max_delay=2.0)  # API ルート（利用者が待っている）
+BACKGROUND_POLICY = RetryPolicy(max_attempts=5, base_delay=2.0, max_delay=30.0)  # 監視・定時プッシュ
+RELOGIN_POLICY = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=8.0)  # get_user_kadai 内の再ログイン
+
+
+class CircuitBreaker:
+    """T-NEXT 全体の障害を検知して即時失敗させるサーキットブレーカー
+
+    - closed: 通常。5xx / ネットワークエラーが failure_threshold 回連続するとオープン
+    - open: reset_timeout 秒間、すべてのリクエストを GakuenCircuitOpenError で即時失敗
+    - half-open: reset_timeout 経過後、1 リクエストだけを試験的に通す。
+      成功すれば closed に戻り、失敗すれば再び open
+
+    プロセス内の全 GakuenAPI インスタンスで共有する（gakuen_breaker）。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_request(self) -> None:
+        """リクエスト前に呼ぶ。オープン中なら GakuenCircuitOpenError を送出"""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise GakuenCircuitOpenError(
+                    f"T-NEXT が応答しないため一時的にリクエストを停止しています（残り {remaining:.0f} 秒）",
+                    error_code="CIRCUIT_OPEN",
+                )
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self._probe_in_flight:
+            raise GakuenCircuitOpenError(
+                "T-NEXT の復旧を確認中です",
+                error_code="CIRCUIT_OPEN",
+            )
+        self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("[CircuitBreaker] T-NEXT が復旧しました")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """結果を記録せずにリクエストが終わった場合（キャンセルなど）に呼ぶ"""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"[CircuitBreaker] T-NEXT への連続失敗 {self._failures} 回、"
+                    f"{self.reset_timeout:.0f} 秒間リクエストを停止します"
+                )
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+# プロセス共通のブレーカー
+gakuen_breaker = CircuitBreaker()
+
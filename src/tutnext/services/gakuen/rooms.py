@@ -0,0 +1,90 @@
+# tutnext/services/gakuen/rooms.py
+# Course name → classroom cache (in-process LRU in front of Redis).
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+_ROOM_KEY_PREFIX = "room:"
+_ROOM_CACHE_TTL = 604800  # 1 week
+_LOCAL_CACHE_SIZE = 4096
+# 他プロセスでの更新（教室変更）をプロセス内のキャッシュに反映するまでの最大秒数
+_LOCAL_CACHE_TTL = 300
+
+
+class _RoomCache:
+    """授業名 → 教室名のキャッシュ（プロセス内 LRU + Redis）
+
+    スケジュール・時間割（class_list）から得た教室を保存し、class_bulletin の
+    教室欄の補完に使う。書き込みは 1 回のパイプライン、読み込みは 1 回の MGET で
+    まとめて行い、授業数に比例したラウンドトリップを発生させない。
+    """
+
+    def __init__(
+        self, maxsize: int = _LOCAL_CACHE_SIZE, local_ttl: float = _LOCAL_CACHE_TTL
+    ) -> None:
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self._local: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    def _get_local(self, name: str) -> Optional[str]:
+        entry = self._local.get(name)
+        if entry is None:
+            return None
+        room, stored_at = entry
+        if time.monotonic() - stored_at > self.local_ttl:
+            del self._local[name]
+            return None
+        self._local.move_to_end(name)
+        return room
+
+    def _put_local(self, name: str, room: str) -> None:
+        self._local[name] = (room, time.monotonic())
+        self._local.move_to_end(name)
+        while len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+
+    async def store(self, rooms: dict[str, str]) -> None:
+        """教室情報をまとめて保存する（授業名・教室名が空のものは無視）"""
+        rooms = {name: room for name, room in rooms.items() if name and room}
+        if not rooms:
+            return
+        for name, room in rooms.items():
+            self._put_local(name, room)
+        try:
+            from tutnext.config import redis
+
+            async with redis.pipeline(transaction=False) as pipe:
+                for name, room in rooms.items():
+                    pipe.set(f"{_ROOM_KEY_PREFIX}{name}", room, ex=_ROOM_CACHE_TTL)
+                await pipe.execute()
+        except Exception:
+            pass  # Redis 障害時はプロセス内だけに保存する
+
+    async def lookup(self, names: Iterable[str]) -> dict[str, str]:
+        """授業名 → 教室名を返す（キャッシュにない授業は結果に含まれない）"""
+        found: dict[str, str] = {}
+        missing: list[str] = []
+        for name in dict.fromkeys(n for n in names if n):
+            if (room := self._get_local(name)) is not None:
+                found[name] = room
+            else:
+                missing.append(name)
+        if not missing:
+            return found
+        try:
+            from tutnext.config import redis
+
+            values = await redis.mget([f"{_ROOM_KEY_PREFIX}{name}" for name in missing])
+        except Exception:
+            return found  # Redis 障害時はプロセス内のキャッシュのみ
+        for name, raw in zip(missing, values):
+            if raw is None:
+                continue
+            room = raw.decode() if isinstance(raw, bytes) else str(raw)
+            self._put_local(name, room)
+            found[name] = room
+        return found
+
+
+# プロセス共通のキャッシュ
+room_cache = _RoomCache()
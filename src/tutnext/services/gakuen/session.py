@@ -1,9 +1,61 @@
 # tutnext/services/gakuen/session.py
 # Pure-data container that tracks Web/API session state between requests.
-from typing import Optional
+import html
+import re
+from typing import Optional, Union
 
 from bs4 import BeautifulSoup, Tag
 
+_TOKEN_MAPPING = {
+    "rx-token": "token",
+    "rx-loginKey": "loginKey",
+    "rx-deviceKbn": "deviceKbn",
+    "rx-loginType": "loginType",
+}
+_VIEW_STATE_NAME = "javax.faces.ViewState"
+
+# トークンの name 属性を直接検索し、見つかった位置を含む <input> タグだけを調べる。
+# 全 <input> を列挙・属性分解しないため、ページ全体の走査は正規表現 1 回で済む
+_TOKEN_NAME_PATTERN = r"""\bname\s*=\s*["'](rx-token|rx-loginKey|rx-deviceKbn|rx-loginType|javax\.faces\.ViewState)["']"""
+_VALUE_PATTERN = r"""(?<![\w-])value\s*=\s*(?:"([^"]*)"|'([^']*)')"""
+_TOKEN_NAME_RE = re.compile(_TOKEN_NAME_PATTERN)
+_TOKEN_NAME_RE_BYTES = re.compile(_TOKEN_NAME_PATTERN.encode())
+_VALUE_RE = re.compile(_VALUE_PATTERN)
+_VALUE_RE_BYTES = re.compile(_VALUE_PATTERN.encode())
+
+
+def scan_tokens(markup: Union[str, bytes]) -> tuple[dict, Optional[str]]:
+    """レスポンス本文（str / bytes）から DOM を構築せずにセッショントークンを抽出
+
+    Returns:
+        (rx_tokens, view_state)。rx_tokens は見つかった rx-* だけを含み、
+        ViewState が見つからなければ None。同じ name が複数ある場合は最後の値。
+    """
+    if isinstance(markup, bytes):
+        name_re, value_re, lt, gt = _TOKEN_NAME_RE_BYTES, _VALUE_RE_BYTES, b"<", b">"
+    else:
+        name_re, value_re, lt, gt = _TOKEN_NAME_RE, _VALUE_RE, "<", ">"
+    rx_tokens: dict = {}
+    view_state: Optional[str] = None
+    for m in name_re.finditer(markup):
+        start = markup.rfind(lt, 0, m.start())
+        if markup[start + 1 : start + 6].lower() not in ("input", b"input"):
+            continue  # <input> 以外（script 内の文字列など）
+        end = markup.find(gt, m.end())
+        value_match = value_re.search(markup, start, end if end != -1 else len(markup))
+        if value_match is None:
+            continue
+        value = value_match.group(1) if value_match.group(1) is not None else value_match.group(2)
+        name = m.group(1)
+        if isinstance(value, bytes):
+            value, name = value.decode("utf-8"), name.decode("ascii")
+        value = html.unescape(value)
+        if name == _VIEW_STATE_NAME:
+            view_state = value
+        else:
+            rx_tokens[_TOKEN_MAPPING[name]] = value
+    return rx_tokens, view_state
+
 
 class _SessionState:
     """Web セッション状態の純粋データコンテナ"""
@@ -16,20 +68,37 @@ class _SessionState:
         self.api_is_logged_in: bool = False
         self.first_setting: Optional[dict] = None
 
+    def to_dict(self) -> dict:
+        """モバイルセッションの復元に必要なトークンを dict で返す"""
+        return {"rx_tokens": dict(self.rx_tokens), "view_state": self.view_state}
+
+    def load_dict(self, data: dict) -> None:
+        """to_dict の内容を復元する"""
+        self.rx_tokens = dict(data.get("rx_tokens") or {})
+        self.view_state = data.get("view_state")
+
     def update_from_soup(self, soup: BeautifulSoup) -> None:
         """BeautifulSoup オブジェクトからセッショントークンを抽出"""
-        token_mapping = {
-            "rx-token": "token",
-            "rx-loginKey": "loginKey",
-            "rx-deviceKbn": "deviceKbn",
-            "rx-loginType": "loginType",
-        }
         for input_tag in soup.find_all("input"):
             if not isinstance(input_tag, Tag):
                 continue
             name = input_tag.get("name")
             value = input_tag.get("value")
-            if isinstance(name, str) and name in token_mapping:
-                self.rx_tokens[token_mapping[name]] = value
+            if isinstance(name, str) and name in _TOKEN_MAPPING:
+                self.rx_tokens[_TOKEN_MAPPING[name]] = value
             elif name == "javax.faces.ViewState" and isinstance(value, str):
                 self.view_state = value
+
+    def update_from_markup(self, markup: Union[str, bytes]) -> None:
+        """レスポンス本文から DOM を構築せずにセッショントークンを抽出
+
+        scan_tokens で rx-* と ViewState の <input> だけを走査する。
+        soup の構築前・構築なしで呼べる。抽出結果は update_from_soup と同じ。
+        """
+        rx_tokens, view_state = scan_tokens(markup)
+        self.rx_tokens.update(rx_tokens)
+        if view_state is not None:
+            self.view_state = view_state
+
+    # partial-response の payload 用（従来の名前）
+    update_from_html = update_from_markup
@@ -7,6 +7,11 @@ Per-User Session 管理器
    不同用户完全并行，互不阻塞。
 2. **Session 缓存** — 登录后缓存 GakuenAPI 实例（含 aiohttp cookies + rx_tokens），
    后续请求复用已登录的 session，跳过 ~1.2s 的 _mobile_login()。
+3. **Redis session 快照** — 每次使用后把 session（cookies、rx_tokens、ViewState、
+   组件 ID）写入 Redis（TTL = SESSION_TTL），重启后或其他 worker / 调度进程
+   可以直接恢复，不必重新登录。JSF 令牌每次请求都会轮换，同一快照不能被
+   两个进程同时使用，因此使用期间持有 Redis 锁；快照带随机版本号，
+   内存中的实例版本与 Redis 不一致时（已被其他进程使用过）改用快照恢复。
 
 用法::
 
@@ -17,19 +22,32 @@ Per-User Session 管理器
 """
 
 import asyncio
+import hashlib
+import json
 import logging
 import time
+import uuid
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from typing import Optional
 
 from tutnext.services.gakuen.client import GakuenAPI
-from tutnext.config import HTTP_PROXY
+from tutnext.services.gakuen.errors import GakuenBusyError, GakuenCircuitOpenError
+from tutnext.services.gakuen.metrics import gakuen_metrics
+from tutnext.config import GAKUEN_HTML_PARSER, HTTP_PROXY
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://next.tama.ac.jp"
 SESSION_TTL = 300  # 缓存 session 最多 5 分钟
+SNAPSHOT_KEY_PREFIX = "gakuen:session:"
+SNAPSHOT_LOCK_TIMEOUT = 180  # 持锁进程异常退出时，锁最多保留 3 分钟
+SNAPSHOT_LOCK_WAIT = 60  # 等待其他进程释放 session 的最长时间
+
+
+def credential_digest(encrypted_password: str) -> str:
+    """凭据摘要。保存在 Redis 的数据只能由持有相同凭据的请求读取。"""
+    return hashlib.sha256(encrypted_password.encode("utf-8")).hexdigest()
 
 
 @dataclass
@@ -37,6 +55,7 @@ class _UserSession:
     lock: asyncio.Lock = field(default_factory=asyncio.Lock)
     gakuen: Optional[GakuenAPI] = None
     last_used: float = 0.0
+    version: Optional[str] = None  # 与 Redis 快照对应的版本号
 
 
 class SessionManager:
@@ -57,56 +76,81 @@ class SessionManager:
     async def acquire(self, username: str, encrypted_password: str):
         """获取已登录的 GakuenAPI 实例。
 
-        - 如果有缓存且未过期，直接返回（~0ms）
-        - 如果没有缓存，新建并登录（~1.2s）
-        - per-user lock 保证同一用户串行执行
+        - 如果有缓存且未过期（且未被其他进程使用过），直接返回（~0ms）
+        - 如果 Redis 中有该用户的 session 快照，恢复后返回（~0ms）
+        - 都没有时，新建并登录（~1.2s）
+        - per-user lock 保证同一用户串行执行，Redis 锁保证跨进程串行
 
         Yields:
             GakuenAPI: 已登录的实例，调用方应使用 skip_login=True
         """
         us = await self._get_user_session(username)
 
-        async with us.lock:
+        waited = time.monotonic()
+        async with us.lock, self._shared_lock(username) as shared:
+            gakuen_metrics.observe_wait("session_lock", time.monotonic() - waited)
+            snapshot = (
+                await self._load_snapshot(username, encrypted_password)
+                if shared
+                else None
+            )
             now = time.monotonic()
+            reused = False
 
-            # 检查缓存是否可用
             if (
                 us.gakuen is not None
                 and (now - us.last_used) < SESSION_TTL
+                and (snapshot is None or snapshot["version"] == us.version)
             ):
                 # 复用缓存的 session
                 us.gakuen.user_id = username
                 us.gakuen.encrypted_login_password = encrypted_password
-                us.last_used = now
+                reused = True
                 logger.debug(f"[SessionManager] 复用缓存 session: {username}")
+            elif snapshot is not None:
+                # 从 Redis 快照恢复（其他进程登录过的 session）
+                await self._close_session(us)
+                us.gakuen = self._new_client(username, encrypted_password)
+                us.gakuen.restore_session(snapshot["session"])
+                us.version = snapshot["version"]
+                reused = True
+                logger.debug(f"[SessionManager] 从快照恢复 session: {username}")
+            else:
+                # 没有缓存或已过期，关闭旧的并新建
+                await self._close_session(us)
+                gakuen = self._new_client(username, encrypted_password)
                 try:
-                    yield us.gakuen
-                    return
+                    await gakuen._mobile_login()
                 except Exception:
-                    # 操作失败，可能是 session 过期，清除缓存
-                    logger.info(
-                        f"[SessionManager] 缓存 session 操作失败，清除: {username}"
-                    )
-                    await self._close_session(us)
+                    # 登录失败，清理
+                    await gakuen.close()
                     raise
-
-            # 没有缓存或已过期，关闭旧的并新建
-            await self._close_session(us)
-            gakuen = GakuenAPI(
-                username, "", BASE_URL, encrypted_password, http_proxy=HTTP_PROXY
-            )
-            try:
-                await gakuen._mobile_login()
                 us.gakuen = gakuen
-                us.last_used = time.monotonic()
                 logger.debug(f"[SessionManager] 新建 session: {username}")
-                yield gakuen
+            us.last_used = time.monotonic()
+
+            try:
+                yield us.gakuen
+            except (GakuenBusyError, GakuenCircuitOpenError):
+                # 请求在发送前被拒绝（繁忙 / 熔断打开），session 仍然有效；
+                # 之前成功的请求可能已轮换令牌，因此照常保存快照
+                if shared:
+                    await self._save_snapshot(us, username, encrypted_password)
+                raise
             except Exception:
-                # 登录失败或操作失败，清理
-                await gakuen.close()
-                us.gakuen = None
+                if reused:
+                    # 操作失败，可能是 session 过期，清除缓存
+                    logger.info(
+                        f"[SessionManager] 缓存 session 操作失败，清除: {username}"
+                    )
+                await self._close_session(us)
+                if shared:
+                    await self._delete_snapshot(username)
                 raise
 
+            if shared:
+                await self._save_snapshot(us, username, encrypted_password)
+
     @asynccontextmanager
     async def lock_only(self, username: str):
         """仅获取 per-user lock，不做 session 缓存。
@@ -117,6 +161,95 @@ class SessionManager:
         async with us.lock:
             yield
 
+    def _new_client(self, username: str, encrypted_password: str) -> GakuenAPI:
+        return GakuenAPI(
+            username, "", BASE_URL, encrypted_password,
+            http_proxy=HTTP_PROXY, html_parser=GAKUEN_HTML_PARSER,
+        )
+
+    # ------------------------------------------------------------------
+    # Redis session 快照
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def _shared_lock(self, username: str):
+        """跨进程的 per-user 锁。
+
+        Yields:
+            bool: 是否持有锁。Redis 不可用或等待超时时为 False，
+            此时只使用进程内缓存，不读写快照（与引入快照前的行为一致）。
+        """
+        from tutnext.config import redis
+
+        lock = redis.lock(
+            f"{SNAPSHOT_KEY_PREFIX}{username}:lock",
+            timeout=SNAPSHOT_LOCK_TIMEOUT,
+            blocking_timeout=SNAPSHOT_LOCK_WAIT,
+        )
+        try:
+            acquired = bool(await lock.acquire())
+        except Exception as e:
+            logger.warning(f"[SessionManager] 获取 session 锁失败: {username}: {e}")
+            acquired = False
+        if not acquired:
+            logger.warning(f"[SessionManager] 未能获取 session 锁，跳过快照: {username}")
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except Exception:
+                    pass  # 锁已超时释放
+
+    async def _load_snapshot(
+        self, username: str, encrypted_password: str
+    ) -> Optional[dict]:
+        from tutnext.config import redis
+
+        try:
+            raw = await redis.get(f"{SNAPSHOT_KEY_PREFIX}{username}")
+            if not raw:
+                return None
+            snapshot = json.loads(raw)
+        except Exception as e:
+            logger.warning(f"[SessionManager] 读取 session 快照失败: {username}: {e}")
+            return None
+        if snapshot.get("credential") != credential_digest(encrypted_password):
+            return None
+        return snapshot
+
+    async def _save_snapshot(
+        self, us: _UserSession, username: str, encrypted_password: str
+    ) -> None:
+        from tutnext.config import redis
+
+        if us.gakuen is None:
+            return
+        version = uuid.uuid4().hex
+        snapshot = {
+            "version": version,
+            "credential": credential_digest(encrypted_password),
+            "session": us.gakuen.export_session(),
+        }
+        try:
+            await redis.set(
+                f"{SNAPSHOT_KEY_PREFIX}{username}",
+                json.dumps(snapshot),
+                ex=SESSION_TTL,
+            )
+            us.version = version
+        except Exception as e:
+            logger.warning(f"[SessionManager] 保存 session 快照失败: {username}: {e}")
+
+    async def _delete_snapshot(self, username: str) -> None:
+        from tutnext.config import redis
+
+        try:
+            await redis.delete(f"{SNAPSHOT_KEY_PREFIX}{username}")
+        except Exception:
+            pass
+
     async def _close_session(self, us: _UserSession) -> None:
         """安全关闭并清除缓存的 session。"""
         if us.gakuen is not None:
@@ -125,6 +258,7 @@ class SessionManager:
             except Exception:
                 pass
             us.gakuen = None
+            us.version = None
 
     async def cleanup(self, max_idle_seconds: float = SESSION_TTL) -> None:
         """清理超时的 session，释放连接和内存。"""
@@ -145,10 +279,11 @@ class SessionManager:
                 logger.debug(f"[SessionManager] 清理过期 session: {username}")
 
     async def invalidate(self, username: str) -> None:
-        """主动失效指定用户的缓存 session。"""
+        """主动失效指定用户的缓存 session（含 Redis 快照）。"""
         us = self._sessions.get(username)
         if us:
             await self._close_session(us)
+        await self._delete_snapshot(username)
 
 
 # 模块级单例
@@ -6,6 +6,7 @@
 # https://www.googleapis.com/auth/classroom.student-submissions.me.readonly
 
 
+import json
 import logging
 import aiohttp
 import asyncio
@@ -19,6 +20,8 @@ from tutnext.config import settings
 class GoogleClassroomAPI:
     """Google Classroom API 异步管理类"""
 
+    CACHE_KEY_PREFIX = "classroom:assignments:"
+
     def __init__(self):
         self.client_id = settings.client_id
         if not self.client_id:
@@ -328,7 +331,45 @@ class GoogleClassroomAPI:
             return False
     
     async def get_user_assignments(self, username: str) -> List[Dict[str, Any]]:
-        """获取用户的未完成课题"""
+        """获取用户的未完成课题（获取失败时返回空列表）"""
+        return await self._fetch_user_assignments(username) or []
+
+    async def get_cached_user_assignments(
+        self, username: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """获取用户的未完成课题，结果按用户缓存 CLASSROOM_CACHE_TTL 秒
+
+        与 T-NEXT 的会话无关，可在会话锁之外与学校系统的获取并行执行。
+        获取失败时返回 None（不缓存）。
+        """
+        from tutnext.config import CLASSROOM_CACHE_TTL, redis
+
+        cache_key = f"{self.CACHE_KEY_PREFIX}{username}"
+        try:
+            if (raw := await redis.get(cache_key)) is not None:
+                return json.loads(raw)
+        except Exception:
+            pass  # Redis 障害時は Google API から取得
+        assignments = await self._fetch_user_assignments(username)
+        if assignments is not None:
+            try:
+                await redis.set(
+                    cache_key, json.dumps(assignments, ensure_ascii=False), ex=CLASSROOM_CACHE_TTL
+                )
+            except Exception:
+                pass  # Redis 障害時はキャッシュをスキップ
+        return assignments
+
+    async def invalidate_assignments_cache(self, username: str) -> None:
+        """删除课题缓存（授权 / 撤销时）"""
+        from tutnext.config import redis
+
+        await redis.delete(f"{self.CACHE_KEY_PREFIX}{username}")
+
+    async def _fetch_user_assignments(
+        self, username: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """从 Google Classroom 获取用户的未完成课题（令牌无效或请求失败时返回 None）"""
         if self.client_id is None:
             logging.warning("Google Classroom client_id is not configured; skipping assignment fetch.")
             return []
@@ -336,7 +377,7 @@ class GoogleClassroomAPI:
         access_token = await self._get_valid_access_token(username)
         if not access_token:
             logging.error(f"无法获取用户 {username} 的有效访问令牌")
-            return []
+            return None
         
         async with aiohttp.ClientSession() as session:
             try:
@@ -430,7 +471,7 @@ class GoogleClassroomAPI:
                 
             except Exception as e:
                 logging.error(f"获取用户 {username} 课题时出错: {e}")
-                return []
+                return None
 
 
 # 全局Google Classroom API实例
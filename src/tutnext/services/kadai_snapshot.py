@@ -0,0 +1,191 @@
+"""
+课题快照
+========
+每个用户一份最近一次完整获取的课题列表（学校系统 + Google Classroom），保存在 Redis
+（``kadai:snapshot:{username}``），由课题监测（monitor）和 ``POST /kadai``（api）写入，
+空列表同样保存。
+
+快照内容::
+
+    {
+        "version": 3,            # 内容（hash）变化时递增
+        "fetched_at": 1760000000.0,
+        "source": "monitor",     # monitor / api
+        "hash": "…",             # 课题列表的 SHA-1
+        "credential": "…",       # 写入时所用凭据（encryptedPassword）的 SHA-256
+        "data": [...]
+    }
+
+快照只提供给凭据摘要一致的请求（见 ``KadaiSnapshot.matches``），
+不一致时按没有快照处理，走需要登录的获取路径。
+
+``POST /kadai`` 按快照的年龄决定（见 ``KadaiSnapshot.age``）：
+
+- ``KADAI_SNAPSHOT_FRESH_TTL`` 秒以内 — 直接返回
+- ``KADAI_SNAPSHOT_MAX_STALE`` 秒以内 — 先返回快照，同时在后台重新获取
+- 超过或没有快照 — 等待从 T-NEXT 获取
+
+只获取到一部分（例如学校系统失败、只有 Classroom）的结果不写入快照。
+
+monitor 和 api 可能同时写入，version 的比较与递增、touch 的更新都在 Redis 的
+Lua 脚本中原子地完成。
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Literal, Optional
+
+from tutnext.services.gakuen.session_manager import credential_digest
+
+logger = logging.getLogger(__name__)
+
+KADAI_SNAPSHOT_KEY_PREFIX = "kadai:snapshot:"
+KADAI_SNAPSHOT_TTL = 604800  # 1 周；新旧由 fetched_at 判断
+
+SnapshotSource = Literal["monitor", "api"]
+
+# 与已有快照比较 hash，决定 version 后写入。ARGV[2] 是不含 version 的快照 JSON，
+# 在开头插入 version（data 不经 cjson 重新编码，空列表不会变成 {}）
+_STORE_SCRIPT = """
+local version = 1
+local raw = redis.call('GET', KEYS[1])
+if raw then
+    local ok, previous = pcall(cjson.decode, raw)
+    if ok and type(previous) == 'table' and tonumber(previous.version) then
+        version = tonumber(previous.version)
+        if previous.hash ~= ARGV[1] then
+            version = version + 1
+        end
+    end
+end
+version = string.format('%d', version)
+redis.call('SET', KEYS[1], '{"version": ' .. version .. ', ' .. string.sub(ARGV[2], 2), 'EX', ARGV[3])
+return tonumber(version)
+"""
+
+# 快照仍是读取时的内容才写入（compare-and-set），避免覆盖期间写入的新快照
+_TOUCH_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+def _snapshot_key(username: str) -> str:
+    return f"{KADAI_SNAPSHOT_KEY_PREFIX}{username}"
+
+
+def _dumps(snapshot: dict[str, Any]) -> str:
+    return json.dumps(snapshot, ensure_ascii=False, default=str)
+
+
+def kadai_hash(kadai_list: list[dict]) -> str:
+    return hashlib.sha1(
+        json.dumps(kadai_list, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+@dataclass
+class KadaiSnapshot:
+    version: int
+    fetched_at: float
+    source: str
+    hash: str
+    data: list[dict[str, Any]]
+    credential: str = ""
+
+    def matches(self, encrypted_password: str) -> bool:
+        """是否由持有相同凭据的获取写入"""
+        return self.credential == credential_digest(encrypted_password)
+
+    @property
+    def age(self) -> float:
+        """获取后经过的秒数"""
+        return max(0.0, time.time() - self.fetched_at)
+
+
+async def load_kadai_snapshot(username: str) -> Optional[KadaiSnapshot]:
+    """读取快照（没有或 Redis 障害時は None）"""
+    try:
+        from tutnext.config import redis
+
+        raw = await redis.get(_snapshot_key(username))
+        if raw is None:
+            return None
+        return KadaiSnapshot(**json.loads(raw))
+    except Exception as e:
+        logger.warning(f"[kadai] {username}: 快照读取失败: {e}")
+        return None
+
+
+async def store_kadai_snapshot(
+    username: str,
+    kadai_list: list[dict],
+    source: SnapshotSource,
+    encrypted_password: str,
+) -> KadaiSnapshot:
+    """写入完整获取的课题列表（内容与上次相同时 version 不变，只更新 fetched_at）"""
+    snapshot = KadaiSnapshot(
+        version=1,
+        fetched_at=time.time(),
+        source=source,
+        hash=kadai_hash(kadai_list),
+        data=kadai_list,
+        credential=credential_digest(encrypted_password),
+    )
+    body = {k: v for k, v in snapshot.__dict__.items() if k != "version"}
+    try:
+        from tutnext.config import redis
+
+        snapshot.version = int(
+            await redis.eval(
+                _STORE_SCRIPT,
+                1,
+                _snapshot_key(username),
+                snapshot.hash,
+                _dumps(body),
+                KADAI_SNAPSHOT_TTL,
+            )
+        )
+    except Exception as e:
+        logger.warning(f"[kadai] {username}: 快照写入失败: {e}")
+    return snapshot
+
+
+async def touch_kadai_snapshot(
+    username: str, source: SnapshotSource, encrypted_password: str
+) -> None:
+    """确认课题未变化：只更新已有快照的 fetched_at / source（凭据不一致时不更新）"""
+    try:
+        from tutnext.config import redis
+
+        raw = await redis.get(_snapshot_key(username))
+        if raw is None:
+            return
+        previous = KadaiSnapshot(**json.loads(raw))
+        if not previous.matches(encrypted_password):
+            return
+        previous.fetched_at = time.time()
+        previous.source = source
+        await redis.eval(
+            _TOUCH_SCRIPT,
+            1,
+            _snapshot_key(username),
+            raw,
+            _dumps(previous.__dict__),
+            KADAI_SNAPSHOT_TTL,
+        )
+    except Exception:
+        pass  # Redis 障害時は更新をスキップ
+
+
+async def invalidate_kadai_snapshot(username: str) -> None:
+    """删除快照（课题来源变化时，例如 Google Classroom 授权 / 撤销）"""
+    from tutnext.config import redis
+
+    await redis.delete(_snapshot_key(username))
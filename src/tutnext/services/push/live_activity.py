@@ -16,7 +16,8 @@ from uuid import uuid4
 from aioapns import NotificationRequest, PushType
 
 from tutnext.config import JAPAN_TZ, HTTP_PROXY, redis, APNS_CONFIG
-from tutnext.services.gakuen.client import GakuenAPI, GakuenAPIError
+from tutnext.services.gakuen.client import GakuenAPI, GakuenAPIError, load_cached_schedule_days
+from tutnext.services.gakuen.governor import Priority, request_priority
 from tutnext.services.gakuen.session_manager import get_session_manager
 from tutnext.services.push.apns_client import get_apns_client
 
@@ -277,15 +278,21 @@ async def schedule_live_activity_pushes(
     #     logger.info("LA TEST: PERIOD_TIMES[5] = %s", PERIOD_TIMES[5])
     # # ---- 测试用假数据 END ----
     # else:
-    async with get_session_manager().acquire(username, encrypted_password) as gakuen:
-        from datetime import date
-        try:
-            data = await gakuen.get_later_user_schedule(
-                username, encrypted_password, target_date=date.today(), skip_login=True
-            )
-        except GakuenAPIError as e:
-            logger.error("LA schedule fetch failed for %s: %s", username, e)
-            raise
+    from datetime import date
+
+    # 当天的日程已缓存（其他请求或推送任务取得）时不登录 T-NEXT
+    today = date.today()
+    data = (await load_cached_schedule_days(username, [today])).get(today)
+    if data is None:
+        with request_priority(Priority.LIVE_ACTIVITY):
+            async with get_session_manager().acquire(username, encrypted_password) as gakuen:
+                try:
+                    data = await gakuen.get_later_user_schedule(
+                        username, encrypted_password, target_date=today, skip_login=True
+                    )
+                except GakuenAPIError as e:
+                    logger.error("LA schedule fetch failed for %s: %s", username, e)
+                    raise
 
     if not data.get("time_table"):
         logger.info("LA: %s has no classes today", username)
@@ -21,16 +21,30 @@ MonitorService — 限速版用户作业监测服务
 # tutnext/services/push/monitor.py
 
 import asyncio
+import hashlib
 import json
 import logging
 from datetime import datetime
+from typing import Optional
 
 from tutnext.config import settings, redis, HTTP_PROXY, JAPAN_TZ
 from tutnext.core.database import db_manager
 from tutnext.services.gakuen.client import GakuenAPI
-from tutnext.services.gakuen.errors import GakuenLoginError, GakuenPermissionError
+from tutnext.services.gakuen.errors import (
+    GakuenCircuitOpenError,
+    GakuenLoginError,
+    GakuenPermissionError,
+)
+from tutnext.services.gakuen.fingerprint import (
+    PageFingerprint,
+    load_page_fingerprint,
+    store_page_fingerprint,
+)
+from tutnext.services.gakuen.governor import Priority, request_priority
+from tutnext.services.gakuen.retry import BACKGROUND_POLICY
 from tutnext.services.gakuen.session_manager import get_session_manager
 from tutnext.services.google_classroom import classroom_api
+from tutnext.services.kadai_snapshot import store_kadai_snapshot, touch_kadai_snapshot
 from tutnext.services.push.pool import PushPoolManager
 
 logger = logging.getLogger(__name__)
@@ -52,6 +66,9 @@ class MonitorService:
     # 3 次 → 等 20 分钟；4 次及以上 → 等 30 分钟
     BACKOFF_INTERVALS = [300, 600, 1200, 1800]
     BACKOFF_KEY_PREFIX = "monitor:backoff:"
+    SUMMARY_KEY_PREFIX = "kadai_summary:"
+    SUMMARY_TTL = 86400
+    KADAI_LIST_PAGE = "kadai_list"  # 页面指纹的页面名
 
     def __init__(self, push_manager: PushPoolManager):
         self.push_manager = push_manager
@@ -101,6 +118,67 @@ class MonitorService:
         last_check_key = f"monitor:last_check:{username}"
         await redis.set(last_check_key, "1", ex=interval)
 
+    # ------------------------------------------------------------------
+    # Kadai summary fast path
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def summary_digest(summary: list[dict]) -> str:
+        """课题一览摘要的指纹（不含随列表位置变化的 id）。"""
+        rows = sorted(
+            (row["kind"], row["courseId"], row["title"], row["period"])
+            for row in summary
+        )
+        return hashlib.sha1(
+            json.dumps(rows, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    async def fetch_gakuen_kadai(
+        self, gakuen: GakuenAPI, username: str, encrypted_password: str
+    ) -> tuple[Optional[list[dict]], int]:
+        """获取学校系统的课题，仅在课题一览变化时才打开详情页。
+
+        先只请求课题一览页（1 次请求）。页面正文（屏蔽令牌后）与上次相同时
+        不解析直接返回上次的课题数；否则计算摘要指纹，与上次完整获取时记录的
+        指纹一致则同样返回上次的课题数；不一致（或无记录）时再调用
+        get_user_kadai 获取完整详情并更新记录。
+
+        Returns:
+            (完整课题列表或 None（摘要未变化时）, 学校系统课题数)
+        """
+        summary_key = f"{self.SUMMARY_KEY_PREFIX}{username}"
+        raw = await redis.get(summary_key)
+        entry = json.loads(raw) if raw else None
+        # 没有上次的课题数时必须解析，不使用页面指纹
+        fingerprint = (
+            await load_page_fingerprint(username, self.KADAI_LIST_PAGE)
+            if entry
+            else PageFingerprint()
+        )
+        summary = await gakuen.get_user_kadai_summary(
+            username, encrypted_password, skip_login=True, fingerprint=fingerprint
+        )
+        if summary is None:
+            # 一览页与上次相同（仅令牌不同），不解析
+            await store_page_fingerprint(username, self.KADAI_LIST_PAGE, fingerprint)
+            return None, int(entry["count"])
+        digest = self.summary_digest(summary)
+        if entry and entry.get("digest") == digest:
+            await store_page_fingerprint(username, self.KADAI_LIST_PAGE, fingerprint)
+            return None, int(entry["count"])
+
+        kadai_list = await gakuen.get_user_kadai(
+            skip_login=True,
+            detail_concurrency=settings.gakuen_kadai_detail_concurrency,
+        )
+        await redis.set(
+            summary_key,
+            json.dumps({"digest": digest, "count": len(kadai_list)}),
+            ex=self.SUMMARY_TTL,
+        )
+        await store_page_fingerprint(username, self.KADAI_LIST_PAGE, fingerprint)
+        return kadai_list, len(kadai_list)
+
     # ------------------------------------------------------------------
     # Core per-user check (ports monitor_task logic from sender.py)
     # ------------------------------------------------------------------
@@ -110,115 +188,140 @@ class MonitorService:
     ):
         """检查单个用户的作业变化，通过信号量限制并发登录数（Layer 1）。
 
+        信号量只在每次获取尝试期间持有，重试前的退避等待期间释放。
         逻辑与原 monitor_task() 完全一致，额外加入退避状态更新。
+        学校系统课题先比较一览摘要，未变化时不打开详情页（见 fetch_gakuen_kadai）。
+        Google Classroom 的课题在信号量和会话锁之外并行获取，学校系统获取完成后再合并。
         """
-        # Layer 1: 信号量保证同一时刻最多 N 个并发登录
-        async with self.semaphore:
-            async with get_session_manager().acquire(username, encrypted_password) as gakuen:
-                try:
-                    max_retries = 5
-                    retry_count = 0
-                    kadai_list = None
-
-                    while retry_count < max_retries:
-                        try:
-                            kadai_list = await gakuen.get_user_kadai(
-                                username, encrypted_password, skip_login=True
-                            )
-                            if await db_manager.get_user_tokens(username):
-                                classroom_kadai_list = (
-                                    await classroom_api.get_user_assignments(username)
-                                )
-                                if classroom_kadai_list:
-                                    kadai_list.extend(classroom_kadai_list)
-                            break
-                        except GakuenPermissionError as perm_error:
-                            logger.warning(
-                                f"用户 {username} 凭据无效，跳过: {perm_error}"
-                            )
-                            return
-                        except Exception as api_error:
-                            if "パスワードが正しくありません" in str(api_error):
-                                logger.warning(
-                                    f"用户 {username} 密码错误，删除用户: {api_error}"
-                                )
-                                await db_manager.delete_user(username)
-                                return
-                            retry_count += 1
-                            if retry_count >= max_retries:
-                                if "セッション情報の抽出に失敗しました" in str(api_error):
-                                    logger.warning(
-                                        f"用户 {username} 会话信息无效，可能密码错误，删除用户: {api_error}"
-                                    )
-                                    await db_manager.delete_user(username)
-                                    return
-                                logger.error(
-                                    f"用户 {username} 获取作业数据失败，已达最大重试次数: {api_error}"
-                                )
-                                from tutnext.services.push.sender import record_api_error
-                                await record_api_error()
-                                raise api_error
-                            logger.warning(
-                                f"用户 {username} 获取作业数据失败，重试第 {retry_count} 次: {api_error}"
-                            )
-                            await get_session_manager().invalidate(username)
-                            await asyncio.sleep(2)
-
-                    if kadai_list is None:
-                        return
-
-                    # --- 对比作业数量，决定是否推送 ---
-                    changed = False
-                    kadai_count_key = f"kadai_count:{username}"
-
-                    if await redis.exists(kadai_count_key):
-                        old_count = int(await redis.get(kadai_count_key))
-                        if len(kadai_list) == 0:
-                            await redis.delete(kadai_count_key)
-                            changed = True
-                            await self.push_manager.add_background_message_to_pool(
-                                "realtime",
-                                device_token,
-                                {"updateType": "kaidaiNumChange", "num": 0},
-                            )
-                        elif old_count != len(kadai_list):
-                            await redis.set(kadai_count_key, len(kadai_list))
-                            changed = True
-                            await self.push_manager.add_background_message_to_pool(
-                                "realtime",
-                                device_token,
-                                {
-                                    "updateType": "kaidaiNumChange",
-                                    "num": len(kadai_list),
-                                },
-                            )
-                    else:
-                        if len(kadai_list) > 0:
-                            await redis.set(kadai_count_key, len(kadai_list))
-                            changed = True
-                            await self.push_manager.add_background_message_to_pool(
-                                "realtime",
-                                device_token,
-                                {
-                                    "updateType": "kaidaiNumChange",
-                                    "num": len(kadai_list),
-                                },
+        classroom_task: Optional[asyncio.Future] = None
+        try:
+            if await db_manager.get_user_tokens(username):
+                classroom_task = asyncio.ensure_future(
+                    classroom_api.get_cached_user_assignments(username)
+                )
+        except Exception as e:
+            logger.error(f"处理用户 {username} 时出错: {e}")
+            return
+        try:
+            try:
+                async def fetch():
+                    # Layer 1: 信号量保证同一时刻最多 N 个并发登录（只覆盖学校系统的获取）。
+                    # 每次尝试重新 acquire，退避等待期间不占用并发名额，也不持有会话锁
+                    async with self.semaphore:
+                        async with get_session_manager().acquire(
+                            username, encrypted_password
+                        ) as gakuen:
+                            return await self.fetch_gakuen_kadai(
+                                gakuen, username, encrypted_password
                             )
 
-                    # Layer 3: 记录退避结果
-                    await self.record_check_result(username, changed)
+                async def on_retry(api_error: BaseException, attempt: int):
+                    logger.warning(
+                        f"用户 {username} 获取作业数据失败，重试第 {attempt} 次: {api_error}"
+                    )
+                    await get_session_manager().invalidate(username)
 
-                    if not kadai_list:
-                        logger.info(f"用户 {username} 没有作业")
+                try:
+                    kadai_list, kadai_total = await BACKGROUND_POLICY.run(
+                        fetch, on_retry=on_retry
+                    )
+                except GakuenPermissionError as perm_error:
+                    logger.warning(f"用户 {username} 凭据无效，跳过: {perm_error}")
+                    return
+                except GakuenCircuitOpenError as open_error:
+                    # T-NEXT 整体故障，不计入用户错误
+                    logger.warning(f"用户 {username} 跳过本次检查: {open_error}")
+                    return
+                except Exception as api_error:
+                    if "パスワードが正しくありません" in str(api_error):
+                        logger.warning(
+                            f"用户 {username} 密码错误，删除用户: {api_error}"
+                        )
+                        await db_manager.delete_user(username)
                         return
-
-                    await redis.set(
-                        f"{username}:kadai", json.dumps(kadai_list), ex=120
+                    if "セッション情報の抽出に失敗しました" in str(api_error):
+                        logger.warning(
+                            f"用户 {username} 会话信息无效，可能密码错误，删除用户: {api_error}"
+                        )
+                        await db_manager.delete_user(username)
+                        return
+                    logger.error(
+                        f"用户 {username} 获取作业数据失败，已达最大重试次数: {api_error}"
                     )
-                    logger.info(f"用户 {username} 的作业监测任务已完成")
-
-                except Exception as e:
-                    logger.error(f"处理用户 {username} 时出错: {e}")
+                    from tutnext.services.push.sender import record_api_error
+                    await record_api_error()
+                    raise api_error
+
+                classroom_kadai_list: Optional[list[dict]] = []
+                if classroom_task is not None:
+                    classroom_kadai_list = await classroom_task
+                if classroom_kadai_list:
+                    kadai_total += len(classroom_kadai_list)
+                    if kadai_list is not None:
+                        kadai_list.extend(classroom_kadai_list)
+
+                # 更新 /kadai 使用的课题快照（空列表也写入，Classroom 获取失败时不写入）。
+                # 摘要未变化时没有完整列表：学校系统课题未变，只确认快照仍然有效；
+                # 有 Classroom 时快照中的学校系统部分无法单独替换，保留快照的获取时间
+                if kadai_list is not None and classroom_kadai_list is not None:
+                    await store_kadai_snapshot(
+                        username, kadai_list, "monitor", encrypted_password
+                    )
+                elif kadai_list is None and classroom_task is None:
+                    await touch_kadai_snapshot(username, "monitor", encrypted_password)
+
+                # --- 对比作业数量，决定是否推送 ---
+                changed = False
+                kadai_count_key = f"kadai_count:{username}"
+
+                if await redis.exists(kadai_count_key):
+                    old_count = int(await redis.get(kadai_count_key))
+                    if kadai_total == 0:
+                        await redis.delete(kadai_count_key)
+                        changed = True
+                        await self.push_manager.add_background_message_to_pool(
+                            "realtime",
+                            device_token,
+                            {"updateType": "kaidaiNumChange", "num": 0},
+                        )
+                    elif old_count != kadai_total:
+                        await redis.set(kadai_count_key, kadai_total)
+                        changed = True
+                        await self.push_manager.add_background_message_to_pool(
+                            "realtime",
+                            device_token,
+                            {
+                                "updateType": "kaidaiNumChange",
+                                "num": kadai_total,
+                            },
+                        )
+                else:
+                    if kadai_total > 0:
+                        await redis.set(kadai_count_key, kadai_total)
+                        changed = True
+                        await self.push_manager.add_background_message_to_pool(
+                            "realtime",
+                            device_token,
+                            {
+                                "updateType": "kaidaiNumChange",
+                                "num": kadai_total,
+                            },
+                        )
+
+                # Layer 3: 记录退避结果
+                await self.record_check_result(username, changed)
+
+                if not kadai_total:
+                    logger.info(f"用户 {username} 没有作业")
+                    return
+
+                logger.info(f"用户 {username} 的作业监测任务已完成")
+
+            except Exception as e:
+                logger.error(f"处理用户 {username} 时出错: {e}")
+        finally:
+            if classroom_task is not None and not classroom_task.done():
+                classroom_task.cancel()
 
     # ------------------------------------------------------------------
     # Main cycle
@@ -272,11 +375,13 @@ class MonitorService:
             logger.debug(f"静默时段，跳过用户 {user['username']} 的检查")
             return
         try:
-            await self.check_single_user(
-                user["username"],
-                user["encryptedpassword"],
-                user["devicetoken"],
-            )
+            # 作业监测的 T-NEXT 请求优先级最低，让位于 API 请求和推送
+            with request_priority(Priority.MONITOR):
+                await self.check_single_user(
+                    user["username"],
+                    user["encryptedpassword"],
+                    user["devicetoken"],
+                )
         except GakuenLoginError as e:
             if "パスワードが正しくありません" in str(e):
                 logger.warning(
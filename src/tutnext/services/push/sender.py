@@ -1,10 +1,16 @@
 # tutnext/services/push/sender.py
 import asyncio
 import logging
+from datetime import date, timedelta
+
 import aiohttp
 
 from tutnext.services.gakuen.client import GakuenAPI, GakuenAPIError
+from tutnext.services.gakuen.errors import GakuenCircuitOpenError
+from tutnext.services.gakuen.governor import Priority, request_priority
+from tutnext.services.gakuen.retry import BACKGROUND_POLICY, is_retryable
 from tutnext.services.push.pool import PushPoolManager
+from tutnext.services.schedule_ical import invalidate_ical_month
 from tutnext.core.database import db_manager
 from tutnext.config import redis, HTTP_PROXY, NOTIFICATION_API_URL
 from tutnext.services.gakuen.session_manager import get_session_manager
@@ -58,83 +64,94 @@ async def check_tmrw_course_user_push(
 ):
     """处理单个用户的推送任务"""
     try:
-        async with get_session_manager().acquire(username, encryptedPassword) as gakuen:
-            max_retries = 5
-            retry_count = 0
-            while retry_count < max_retries:
-                try:
-                    data = await gakuen.get_later_user_schedule(
-                        username, encryptedPassword, skip_login=True
-                    )
-                    break  # 如果成功获取数据，跳出循环
-                except GakuenAPIError as api_error:
-                    retry_count += 1
-                    if retry_count >= max_retries:
-                        logging.error(
-                            f"用户 {username} 获取课程数据失败，已达最大重试次数: {api_error}"
-                        )
-                        # 只在重试全部失败后才记录API错误
-                        await record_api_error()
-                        raise api_error
-                    logging.warning(
-                        f"用户 {username} 获取课程数据失败，重试第 {retry_count} 次: {api_error}"
+        tomorrow = date.today() + timedelta(days=1)
+
+        async def fetch():
+            # 每次尝试重新 acquire，退避等待期间不持有会话锁
+            async with get_session_manager().acquire(username, encryptedPassword) as gakuen:
+                return await gakuen.get_later_user_schedule(
+                    username,
+                    encryptedPassword,
+                    target_date=tomorrow,
+                    skip_login=True,
+                )
+
+        async def on_retry(api_error: BaseException, attempt: int):
+            logging.warning(
+                f"用户 {username} 获取课程数据失败，重试第 {attempt} 次: {api_error}"
+            )
+            # 重试前让 session manager 失效缓存，下次 acquire 会重新登录
+            await get_session_manager().invalidate(username)
+
+        try:
+            data = await BACKGROUND_POLICY.run(
+                fetch,
+                on_retry=on_retry,
+                retryable=lambda e: isinstance(e, GakuenAPIError) and is_retryable(e),
+            )
+        except GakuenCircuitOpenError:
+            raise  # T-NEXT 整体故障，不计入API错误
+        except GakuenAPIError as api_error:
+            logging.error(
+                f"用户 {username} 获取课程数据失败，已达最大重试次数: {api_error}"
+            )
+            # 只在重试全部失败后才记录API错误
+            await record_api_error()
+            raise api_error
+        # if all_day_events := data["all_day_events"]:
+        #     for event in all_day_events:
+        #         if "SMIS:授業" in event["title"]:
+        #             await push_manager.add_message_to_pool(
+        #                 "night_9pm",
+        #                 deviceToken,
+        #                 "明日の授業のお知らせ",
+        #                 event["title"],
+        #             )
+        #             await push_manager.add_message_to_pool(
+        #                 "morning_7am",
+        #                 deviceToken,
+        #                 "本日の授業のお知らせ",
+        #                 event["title"],
+        #             )
+        #             continue
+        if not data["time_table"]:
+            logging.info(f"用户 {username} 没有课程数据")
+            return
+
+        has_changes = False
+        for t in data["time_table"]:
+            if "special_tags" in t:
+                if "休講" in t["special_tags"]:
+                    # 即時通知のみ（課前アラートは Live Activity が代替）
+                    await push_manager.add_message_to_pool(
+                        "realtime",
+                        deviceToken,
+                        "明日の授業の休講お知らせ",
+                        f"明日の「{t['name']}」授業は休講となります。",
+                        data={"toPage": "timetable"},
                     )
-                    # 重试前让 session manager 失效缓存，下次 acquire 会重新登录
-                    await get_session_manager().invalidate(username)
-                    await asyncio.sleep(2)  # 等待2秒后重试
-            # if all_day_events := data["all_day_events"]:
-            #     for event in all_day_events:
-            #         if "SMIS:授業" in event["title"]:
-            #             await push_manager.add_message_to_pool(
-            #                 "night_9pm",
-            #                 deviceToken,
-            #                 "明日の授業のお知らせ",
-            #                 event["title"],
-            #             )
-            #             await push_manager.add_message_to_pool(
-            #                 "morning_7am",
-            #                 deviceToken,
-            #                 "本日の授業のお知らせ",
-            #                 event["title"],
-            #             )
-            #             continue
-            if not data["time_table"]:
-                logging.info(f"用户 {username} 没有课程数据")
-                return
-
-            has_changes = False
-            for t in data["time_table"]:
-                if "special_tags" in t:
-                    if "休講" in t["special_tags"]:
-                        # 即時通知のみ（課前アラートは Live Activity が代替）
-                        await push_manager.add_message_to_pool(
-                            "realtime",
-                            deviceToken,
-                            "明日の授業の休講お知らせ",
-                            f"明日の「{t['name']}」授業は休講となります。",
-                            data={"toPage": "timetable"},
-                        )
-                        has_changes = True
-                        continue
-                elif "previous_room" not in t:
+                    has_changes = True
                     continue
-                t["room"] = t["room"].replace("教室", "")
-                # 即時 background push（Timetable UI の教室標注用 — 維持）
-                push_data = {
-                    "updateType": "roomChange",
-                    "name": t["name"],
-                    "room": f"({t['room']})",
-                }
-                await push_manager.add_background_message_to_pool(
-                    "realtime", deviceToken, push_data
-                )
-                # 課前アラート push は Live Activity が代替するため削除
-                has_changes = True
-            # 检测到课程变更（休講或教室変更）时，清除该用户的日程缓存，确保下次请求返回最新数据
-            if has_changes:
-                await redis.delete(f"schedule:ical:{username}")
-                logging.info(f"用户 {username} 的日程缓存已清除")
-            logging.info(f"用户 {username} 的推送教室变更消息已添加到推送池")
+            elif "previous_room" not in t:
+                continue
+            t["room"] = t["room"].replace("教室", "")
+            # 即時 background push（Timetable UI の教室標注用 — 維持）
+            push_data = {
+                "updateType": "roomChange",
+                "name": t["name"],
+                "room": f"({t['room']})",
+            }
+            await push_manager.add_background_message_to_pool(
+                "realtime", deviceToken, push_data
+            )
+            # 課前アラート push は Live Activity が代替するため削除
+            has_changes = True
+        # 检测到课程变更（休講或教室変更）时，清除该用户明天所在月份的日程缓存，
+        # 确保下次请求返回最新数据（其他月份的 iCal 块保留）
+        if has_changes:
+            await invalidate_ical_month(username, tomorrow)
+            logging.info(f"用户 {username} 的 {tomorrow:%Y-%m} 日程缓存已清除")
+        logging.info(f"用户 {username} 的推送教室变更消息已添加到推送池")
     except Exception as e:
         logging.error(f"处理用户 {username} 时出错: {e}")
 
@@ -155,12 +172,13 @@ async def send_9pm_push_pool(push_manager):
 
         async def _limited_check(user):
             async with semaphore:
-                await check_tmrw_course_user_push(
-                    push_manager,
-                    user["username"],
-                    user["encryptedpassword"],
-                    user["devicetoken"],
-                )
+                with request_priority(Priority.PUSH):
+                    await check_tmrw_course_user_push(
+                        push_manager,
+                        user["username"],
+                        user["encryptedpassword"],
+                        user["devicetoken"],
+                    )
 
         tasks = [asyncio.create_task(_limited_check(user)) for user in users]
         logging.info(f"正在处理 {len(tasks)} 个用户的推送任务")
@@ -0,0 +1,499 @@
+"""
+iCal 日程订阅的分块生成与缓存
+==============================
+``GET /schedule`` 返回的 iCal 由以下部分拼接而成：
+
+    VCALENDAR 头 + 各月份的 VEVENT 块 + 课题的 VEVENT 块 + END:VCALENDAR
+
+每个块是已序列化的 VEVENT 文本，按 (用户, 月份) 和 (用户, 课题) 分别缓存在
+Redis（``schedule:ical:block:{user}:{yyyy-mm|kadai}``）中，并记录生成时数据的摘要。
+重新生成 iCal 时只有摘要变化的块才按模板重新输出 VEVENT 文本，
+其余块直接复用缓存文本。
+
+教室变更等只影响某一天时，用 ``invalidate_ical_month`` 只作废该月份的块。
+
+拼接后的完整 iCal 按 stale-while-revalidate 缓存：``ICAL_FRESH_TTL`` 内视为最新，
+超过后仍保留 ``ICAL_STALE_TTL``，由路由先返回旧内容、再在后台刷新。
+块未变化时拼接结果逐字节相同，因此内容的哈希可直接作为 ETag。
+完整 iCal 旁边保存生成时所用密码的摘要（``schedule:ical:cred:{user}``），
+缓存内容（包括 304 和后台刷新）只提供给密码摘要一致的请求。
+
+订阅者登记：成功生成过 iCal 的用户，其密码用 Fernet（``SCHEDULE_ICAL_SECRET``）
+加密后保存在 Redis，最近 ``SCHEDULE_ICAL_SUBSCRIBER_DAYS`` 天内请求过的用户由
+``pregenerate_ical_feeds`` 在 T-NEXT 空闲的凌晨逐个重新生成，白天的轮询直接
+返回预先生成的内容。未设置密钥时不登记（不保存可还原的密码）。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Iterator, Optional, Union
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from tutnext.config import (
+    GAKUEN_HTML_PARSER,
+    HTTP_PROXY,
+    SCHEDULE_ICAL_MONTHS,
+    SCHEDULE_ICAL_PREGEN_FRESH_TTL,
+    SCHEDULE_ICAL_PREGEN_INTERVAL,
+    SCHEDULE_ICAL_SECRET,
+    SCHEDULE_ICAL_SUBSCRIBER_DAYS,
+)
+from tutnext.services.gakuen.client import GakuenAPI
+from tutnext.services.gakuen.errors import GakuenCircuitOpenError, GakuenLoginError
+from tutnext.services.gakuen.governor import Priority, request_priority
+from tutnext.services.gakuen.session_manager import credential_digest, get_session_manager
+
+logger = logging.getLogger(__name__)
+
+ICAL_CACHE_KEY_PREFIX = "schedule:ical:"  # 拼接后的完整 iCal
+ICAL_FRESH_KEY_PREFIX = "schedule:ical:fresh:"  # 存在期间完整 iCal 视为最新
+ICAL_CRED_KEY_PREFIX = "schedule:ical:cred:"  # 生成完整 iCal 时所用密码的摘要
+ICAL_BLOCK_KEY_PREFIX = "schedule:ical:block:"
+ICAL_FRESH_TTL = 300
+ICAL_STALE_TTL = 86400  # 超过 FRESH_TTL 后仍可先返回旧内容的时长
+ICAL_REFRESH_LOCK_TIMEOUT = 120
+ICAL_SUBSCRIBERS_KEY = "schedule:ical:subscribers"  # zset：用户名 → 最后请求时间
+ICAL_SUBSCRIBER_KEY_PREFIX = "schedule:ical:subscriber:"  # hash：加密后的密码
+ICAL_BLOCK_TTL = 86400  # 与按月日程缓存（schedule:month:*）相同
+KADAI_BLOCK = "kadai"
+_CALENDAR_END = b"END:VCALENDAR\r\n"
+
+
+def ical_cache_key(username: str) -> str:
+    return f"{ICAL_CACHE_KEY_PREFIX}{username}"
+
+
+def _fresh_key(username: str) -> str:
+    return f"{ICAL_FRESH_KEY_PREFIX}{username}"
+
+
+def _cred_key(username: str) -> str:
+    return f"{ICAL_CRED_KEY_PREFIX}{username}"
+
+
+def _block_key(username: str, block: str) -> str:
+    return f"{ICAL_BLOCK_KEY_PREFIX}{username}:{block}"
+
+
+def month_block_name(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+def _digest(items: list[dict]) -> str:
+    return hashlib.sha1(
+        json.dumps(items, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+_CRLF = "\r\n"
+_FOLD_LIMIT = 75  # RFC 5545: 每行不超过 75 个八位组（不含 CRLF）
+
+
+def _escape_text(text: str) -> str:
+    """TEXT 值的转义（RFC 5545 3.3.11，与 icalendar 相同的顺序）"""
+    return (
+        text.replace(r"\N", "\n")
+        .replace("\\", "\\\\")
+        .replace(";", r"\;")
+        .replace(",", r"\,")
+        .replace("\r\n", r"\n")
+        .replace("\n", r"\n")
+        .replace("\r", r"\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """按八位组折行（与 icalendar 相同：不在转义字符 \\ 之后断行）"""
+    if len(line) * 4 < _FOLD_LIMIT or len(line.encode("utf-8")) < _FOLD_LIMIT:
+        return line
+    folded: list[str] = []
+    current: list[str] = []
+    size = 0
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        if current and size + char_size >= _FOLD_LIMIT:
+            if len(current) > 1 and current[-1] in "\\^":
+                carried = current.pop()
+                folded.append("".join(current))
+                current = [carried]
+                size = len(carried.encode("utf-8"))
+            else:
+                folded.append("".join(current))
+                current = []
+                size = 0
+        current.append(char)
+        size += char_size
+    folded.append("".join(current))
+    return "\r\n ".join(folded)
+
+
+def _text(name: str, value: str) -> str:
+    return _fold(f"{name}:{_escape_text(value)}") + _CRLF
+
+
+def _date_time(name: str, value: Union[date, datetime]) -> str:
+    """DATE / DATE-TIME 属性（本地时间、UTC 或带 TZID 的时间）"""
+    if not isinstance(value, datetime):
+        return f"{name};VALUE=DATE:{value:%Y%m%d}{_CRLF}"
+    stamp = f"{value:%Y%m%dT%H%M%S}"
+    if value.tzinfo is None:
+        return f"{name}:{stamp}{_CRLF}"
+    if value.utcoffset() == timedelta(0) and value.tzname() in ("UTC", "Z", "GMT"):
+        return f"{name}:{stamp}Z{_CRLF}"
+    tzid = getattr(value.tzinfo, "key", None) or getattr(value.tzinfo, "zone", None)
+    tzid = tzid or value.tzname()
+    if any(c in tzid for c in ':;,'):
+        tzid = f'"{tzid}"'
+    return _fold(f"{name};TZID={tzid}:{stamp}") + _CRLF
+
+
+def _alarm(action: str, trigger: str) -> str:
+    return (
+        f"BEGIN:VALARM{_CRLF}ACTION:{action}{_CRLF}"
+        f"TRIGGER:{trigger}{_CRLF}END:VALARM{_CRLF}"
+    )
+
+
+def _utc_stamp() -> str:
+    return f"DTSTAMP:{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}{_CRLF}"
+
+
+_CALENDAR_HEADER = (
+    f"BEGIN:VCALENDAR{_CRLF}"
+    f"VERSION:2.0{_CRLF}"
+    f"PRODID:-//Ukenn//TamaSchedule//{_CRLF}"
+    f"NAME:多摩大スケジュール{_CRLF}"
+    f"X-WR-CALNAME:多摩大スケジュール{_CRLF}"
+    f"X-WR-TIMEZONE:Etc/GMT{_CRLF}"
+).encode("utf-8")
+
+
+def calendar_header() -> bytes:
+    """VCALENDAR 的开头部分（不含 END:VCALENDAR）"""
+    return _CALENDAR_HEADER
+
+
+def iter_course_events(course_list: list[dict]) -> Iterator[str]:
+    """授业日程（month_data 的结果）→ 逐个 VEVENT 文本
+
+    直接按模板输出 RFC 5545 文本，不创建 icalendar 的 Event / Alarm 对象。
+    属性顺序、转义与折行和以前的 icalendar 输出相同
+    （tests/test_ical_golden.py 对比验证）。
+    """
+    dtstamp = _utc_stamp()
+    for course in course_list:
+        if not course["title"]:
+            continue
+        start = course["start"]
+        t = start - timedelta(days=1)
+        parts = [
+            "BEGIN:VEVENT" + _CRLF,
+            _text("SUMMARY", course["title"]),
+            _date_time("DTSTART", start),
+            _date_time("DTEND", course["end"]),
+            dtstamp,
+        ]
+        has_room = not course["allDay"] and "room" in course
+        if has_room:
+            parts.append(_text("DESCRIPTION", course["teacher"]))
+            parts.append(_text("LOCATION", course["room"]))
+        parts.append(_alarm("DISPLAY", f"{t.year:04d}{t.month:02d}{t.day:02d}T120000Z"))
+        if has_room:
+            parts.append(_alarm("AUDIO", "-PT10M"))
+        parts.append("END:VEVENT" + _CRLF)
+        yield "".join(parts)
+
+
+def iter_kadai_events(katai_list: list[dict]) -> Iterator[str]:
+    """课题（kadai_data 的结果）→ 逐个 VEVENT 文本"""
+    dtstamp = _utc_stamp()
+    for katai in katai_list:
+        yield "".join(
+            (
+                "BEGIN:VEVENT" + _CRLF,
+                _text("SUMMARY", "未完成の課題!!!" + katai["title"]),
+                _date_time("DTSTART", katai["deadline"] - timedelta(minutes=30)),
+                _date_time("DTEND", katai["deadline"]),
+                dtstamp,
+                _text("DESCRIPTION", katai["date"] + " からの課題"),
+                _text("LOCATION", katai["from"]),
+                _alarm("AUDIO", "-PT20M"),
+                "END:VEVENT" + _CRLF,
+            )
+        )
+
+
+def build_course_events(course_list: list[dict]) -> bytes:
+    """授业日程 → VEVENT 块"""
+    return "".join(iter_course_events(course_list)).encode("utf-8")
+
+
+def build_kadai_events(katai_list: list[dict]) -> bytes:
+    """课题 → VEVENT 块"""
+    return "".join(iter_kadai_events(katai_list)).encode("utf-8")
+
+
+async def render_blocks(
+    username: str,
+    sources: dict[str, tuple[list[dict], Callable[[list[dict]], bytes]]],
+) -> list[bytes]:
+    """各块的数据与生成函数 → 序列化后的 VEVENT 块（按 sources 的顺序）
+
+    缓存的块与当前数据的摘要一致时直接复用，否则重新生成并写回缓存。
+    Redis 读写各一次往返；Redis 不可用时全部重新生成。
+    """
+    names = list(sources)
+    digests = {name: _digest(items) for name, (items, _) in sources.items()}
+    cached: dict[str, bytes] = {}
+    try:
+        from tutnext.config import redis
+
+        raw_values = await redis.mget([_block_key(username, name) for name in names])
+        for name, raw in zip(names, raw_values):
+            if raw is None:
+                continue
+            entry = json.loads(raw)
+            if entry.get("digest") == digests[name]:
+                cached[name] = entry["ics"].encode("utf-8")
+    except Exception:
+        pass  # Redis 障害時は全ブロックを生成
+
+    rendered: dict[str, bytes] = {}
+    for name in names:
+        if name not in cached:
+            items, build = sources[name]
+            rendered[name] = build(items)
+    if rendered:
+        logger.debug(f"[ical] {username}: 重新生成 {', '.join(rendered)}")
+        try:
+            from tutnext.config import redis
+
+            async with redis.pipeline(transaction=False) as pipe:
+                for name, ics in rendered.items():
+                    pipe.set(
+                        _block_key(username, name),
+                        json.dumps({"digest": digests[name], "ics": ics.decode("utf-8")}),
+                        ex=ICAL_BLOCK_TTL,
+                    )
+                await pipe.execute()
+        except Exception:
+            pass  # Redis 障害時はキャッシュをスキップ
+    return [cached[name] if name in cached else rendered[name] for name in names]
+
+
+def assemble_calendar(blocks: list[bytes]) -> bytes:
+    """VCALENDAR 头 + VEVENT 块 + END:VCALENDAR"""
+    return b"".join([calendar_header(), *blocks, _CALENDAR_END])
+
+
+def ical_etag(content: bytes) -> str:
+    """完整 iCal 的强 ETag（带引号）"""
+    return f'"{hashlib.sha1(content).hexdigest()}"'
+
+
+async def load_ical(username: str, password: str) -> tuple[Optional[bytes], bool]:
+    """读取完整 iCal 缓存 → (内容, 是否仍在 FRESH_TTL 内)
+
+    没有缓存、或缓存不是用相同密码生成时内容为 None。
+    """
+    from tutnext.config import redis
+
+    content, fresh, credential = await redis.mget(
+        [ical_cache_key(username), _fresh_key(username), _cred_key(username)]
+    )
+    if content is None or credential is None:
+        return None, False
+    if credential.decode() != credential_digest(password):
+        return None, False
+    return content, fresh is not None
+
+
+async def store_ical(
+    username: str, password: str, content: bytes, fresh_ttl: int = ICAL_FRESH_TTL
+) -> None:
+    """保存完整 iCal 及密码摘要，并标记为最新（fresh_ttl 秒）"""
+    from tutnext.config import redis
+
+    stale_ttl = max(ICAL_STALE_TTL, fresh_ttl)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.set(ical_cache_key(username), content, ex=stale_ttl)
+        pipe.set(_cred_key(username), credential_digest(password), ex=stale_ttl)
+        pipe.set(_fresh_key(username), 1, ex=fresh_ttl)
+        await pipe.execute()
+
+
+async def generate_ical(
+    username: str, password: str, fresh_ttl: int = ICAL_FRESH_TTL
+) -> bytes:
+    """登录 T-NEXT 重新生成完整 iCal 并写入缓存"""
+    async with get_session_manager().lock_only(username):
+        gakuen = GakuenAPI(
+            username, password, "https://next.tama.ac.jp",
+            http_proxy=HTTP_PROXY, html_parser=GAKUEN_HTML_PARSER,
+        )
+        logger.info(f"login: 学籍番号: {username}")
+        try:
+            await gakuen.login()
+            now = datetime.now()
+            course_by_month = await gakuen.month_range_by_month(
+                now.year, now.month, SCHEDULE_ICAL_MONTHS
+            )
+            katai_list = await gakuen.kadai_data()
+            sources = {
+                month_key: (course_list, build_course_events)
+                for month_key, course_list in course_by_month.items()
+            }
+            sources[KADAI_BLOCK] = (katai_list, build_kadai_events)
+            ical_content = assemble_calendar(await render_blocks(username, sources))
+            await store_ical(username, password, ical_content, fresh_ttl)
+            return ical_content
+        finally:
+            await gakuen.close()
+
+
+async def refresh_ical(
+    username: str, password: str, fresh_ttl: int = ICAL_FRESH_TTL
+) -> bool:
+    """在后台重新生成完整 iCal（跨进程用 Redis 锁保证同一用户只有一个刷新）
+
+    没有用户在等待结果，以最低优先级访问 T-NEXT。
+    其他进程正在刷新时返回 False；生成失败的异常传递给调用方。
+    """
+    from tutnext.config import redis
+
+    lock = redis.lock(
+        f"schedule:ical:refresh:{username}", timeout=ICAL_REFRESH_LOCK_TIMEOUT
+    )
+    if not await lock.acquire(blocking=False):
+        return False
+    try:
+        with request_priority(Priority.MONITOR):
+            await generate_ical(username, password, fresh_ttl)
+        return True
+    finally:
+        try:
+            await lock.release()
+        except Exception:
+            pass  # 锁已超时释放
+
+
+def _subscriber_key(username: str) -> str:
+    return f"{ICAL_SUBSCRIBER_KEY_PREFIX}{username}"
+
+
+def _fernet() -> Optional[Fernet]:
+    return Fernet(SCHEDULE_ICAL_SECRET) if SCHEDULE_ICAL_SECRET else None
+
+
+async def register_subscriber(username: str, password: str) -> None:
+    """登记订阅者（iCal 生成成功后调用，密码以 Fernet 加密保存）"""
+    try:
+        fernet = _fernet()
+        if fernet is None:
+            return
+        from tutnext.config import redis
+
+        ttl = SCHEDULE_ICAL_SUBSCRIBER_DAYS * 86400
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(
+                _subscriber_key(username),
+                "password",
+                fernet.encrypt(password.encode("utf-8")).decode("ascii"),
+            )
+            pipe.expire(_subscriber_key(username), ttl)
+            pipe.zadd(ICAL_SUBSCRIBERS_KEY, {username: time.time()})
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"[ical] {username}: 订阅者登记失败: {e}")
+
+
+async def touch_subscriber(username: str) -> None:
+    """更新已登记订阅者的最后请求时间（未登记的用户不登记）"""
+    if not SCHEDULE_ICAL_SECRET:
+        return
+    try:
+        from tutnext.config import redis
+
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(ICAL_SUBSCRIBERS_KEY, {username: time.time()}, xx=True)
+            pipe.expire(_subscriber_key(username), SCHEDULE_ICAL_SUBSCRIBER_DAYS * 86400)
+            await pipe.execute()
+    except Exception:
+        pass  # Redis 障害時は更新をスキップ
+
+
+async def _remove_subscriber(username: str) -> None:
+    from tutnext.config import redis
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.zrem(ICAL_SUBSCRIBERS_KEY, username)
+        pipe.delete(_subscriber_key(username))
+        await pipe.execute()
+
+
+async def pregenerate_ical_feeds() -> int:
+    """最近请求过的订阅者的 iCal 逐个重新生成（凌晨的定时任务），返回成功数
+
+    每个用户之间间隔 SCHEDULE_ICAL_PREGEN_INTERVAL 秒，T-NEXT 请求还受
+    全局速率限制（最低优先级）。生成的内容在 SCHEDULE_ICAL_PREGEN_FRESH_TTL 秒内
+    视为最新。登录失败（密码已更改）或无法解密（密钥已更换）的订阅者被注销。
+    生成经由 generate_ical → store_ical，同样写入密码摘要，预生成的内容只提供给
+    持有该密码的请求。
+    """
+    fernet = _fernet()
+    if fernet is None:
+        return 0
+    from tutnext.config import redis
+
+    cutoff = time.time() - SCHEDULE_ICAL_SUBSCRIBER_DAYS * 86400
+    await redis.zremrangebyscore(ICAL_SUBSCRIBERS_KEY, "-inf", cutoff)
+    members = await redis.zrange(ICAL_SUBSCRIBERS_KEY, 0, -1)
+    logger.info(f"[ical] 预生成开始: {len(members)} 个订阅者")
+    generated = 0
+    for member in members:
+        username = member.decode() if isinstance(member, bytes) else str(member)
+        encrypted = await redis.hget(_subscriber_key(username), "password")
+        if encrypted is None:
+            await _remove_subscriber(username)
+            continue
+        try:
+            password = fernet.decrypt(encrypted).decode("utf-8")
+        except InvalidToken:
+            logger.warning(f"[ical] {username}: 无法解密，注销订阅者")
+            await _remove_subscriber(username)
+            continue
+        try:
+            if await refresh_ical(username, password, SCHEDULE_ICAL_PREGEN_FRESH_TTL):
+                generated += 1
+        except GakuenCircuitOpenError as e:
+            logger.warning(f"[ical] T-NEXT 故障，中止预生成: {e}")
+            break
+        except GakuenLoginError as e:
+            logger.warning(f"[ical] {username}: 登录失败，注销订阅者: {e}")
+            await _remove_subscriber(username)
+        except Exception as e:
+            logger.error(f"[ical] {username}: 预生成失败: {e}")
+        await asyncio.sleep(SCHEDULE_ICAL_PREGEN_INTERVAL)
+    logger.info(f"[ical] 预生成完成: {generated}/{len(members)}")
+    return generated
+
+
+async def invalidate_ical_month(username: str, day: Union[date, datetime]) -> None:
+    """day 所在月份的日程块、按月日程缓存与完整 iCal 缓存作废（其他月份的块保留）
+
+    完整 iCal 连同旧内容一起删除，下次请求等待重新生成，不返回变更前的日程。
+    """
+    from tutnext.config import redis
+
+    await redis.delete(
+        ical_cache_key(username),
+        _fresh_key(username),
+        _cred_key(username),
+        _block_key(username, month_block_name(day.year, day.month)),
+        f"schedule:month:{username}:{day.year:04d}-{day.month:02d}",
+    )
@@ -12,6 +12,8 @@ os.environ.setdefault("APNS_KEY_FILE", "")
 os.environ.setdefault("APNS_KEY_ID", "")
 os.environ.setdefault("APNS_TEAM_ID", "")
 os.environ.setdefault("APNS_TOPIC", "")
+os.environ.setdefault("GAKUEN_RATE_LIMIT", "0")  # no global rate limit in tests
+os.environ.setdefault("PARSE_EXECUTOR", "inline")  # parse on the event loop, no worker pool
 
 
 # ---------------------------------------------------------------------------
@@ -45,7 +47,6 @@ async def fake_redis():
 async def patched_redis(fake_redis):
     """Replace the module-level redis singleton with fakeredis."""
     with patch("tutnext.config.redis", fake_redis), \
-         patch("tutnext.api.routes.kadai.redis", fake_redis), \
          patch("tutnext.api.routes.bus.redis", fake_redis), \
          patch("tutnext.services.push.pool.redis", fake_redis), \
          patch("tutnext.services.push.monitor.redis", fake_redis):
@@ -0,0 +1,44 @@
+# tests/gakuen/conftest.py
+from typing import Optional
+
+import pytest
+
+from tests.gakuen.replay import BASE_URL, ReplaySession, load_fixture
+
+
+@pytest.fixture
+def gakuen_fixture():
+    """Read a recorded T-NEXT response from tests/fixtures/gakuen."""
+    return load_fixture
+
+
+@pytest.fixture
+async def replay_session():
+    return ReplaySession()
+
+
+@pytest.fixture
+def make_gakuen(patched_redis, replay_session, monkeypatch):
+    """Build GakuenAPI clients that talk to the replay session (Redis is fakeredis).
+
+    Process-wide state (circuit breaker, shared component IDs) starts fresh.
+    """
+    from tutnext.services.gakuen import http
+    from tutnext.services.gakuen.client import GakuenAPI
+    from tutnext.services.gakuen.ids import mobile_id_registry
+    from tutnext.services.gakuen.retry import CircuitBreaker
+
+    monkeypatch.setattr(http, "gakuen_breaker", CircuitBreaker())
+    monkeypatch.setattr(mobile_id_registry, "_fingerprint", None)
+    monkeypatch.setattr(mobile_id_registry, "_ids", None)
+
+    def make(session: Optional[ReplaySession] = None) -> GakuenAPI:
+        return GakuenAPI(
+            "test0001",
+            "password",
+            BASE_URL,
+            encrypted_login_password="ZW5jcnlwdGVk%2BcGFzc3dvcmQ%3D",
+            session=session or replay_session,  # type: ignore[arg-type]
+        )
+
+    return make
@@ -0,0 +1,117 @@
+# tests/gakuen/replay.py
+# Offline replay of recorded T-NEXT responses (tests/fixtures/gakuen) and helpers
+# for editing them in GakuenAPI tests.
+import re
+import urllib.parse
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / "fixtures" / "gakuen"
+BASE_URL = "https://next.tama.ac.jp"
+
+
+def load_fixture(name: str) -> str:
+    return (FIXTURE_DIR / name).read_text(encoding="utf-8")
+
+
+def _route(method: str, url: str, data: Optional[dict]) -> str:
+    """Request -> fixture file (same routing as scripts/bench_gakuen.py)."""
+    page = urllib.parse.urlsplit(url).path.rsplit("/", 1)[-1]
+    form = data or {}
+    partial = "javax.faces.partial.ajax" in form
+    if page == "Pky00101.xhtml":
+        return "web_home.html"
+    if page == "Bsa00101.xhtml":
+        return "month_data.xml" if partial else "web_home.html"
+    if page == "Pky50101.xhtml":
+        return "mobile_login.html" if method == "GET" else "mobile_home.html"
+    if page == "Bsa50101.xhtml":
+        return "schedule_day.xml" if partial else "kadai_list.html"
+    if page == "Bsa50102.xhtml":
+        source = str(form.get("rx.sync.source", ""))
+        index = int(source.split(":")[-2]) if source.count(":") >= 3 else 0
+        return f"kadai_detail_{index}.html"
+    if page == "Jga50503.xhtml":
+        return "kadai_list.html"
+    raise KeyError(f"no fixture for {method} {url}")
+
+
+class _ReplayResponse:
+    def __init__(self, body: str) -> None:
+        self.status = 200
+        self.reason = "OK"
+        self.content_length = None
+        self._body = body
+
+    async def text(self) -> str:
+        return self._body
+
+    async def read(self) -> bytes:
+        return self._body.encode("utf-8")
+
+    async def __aenter__(self) -> "_ReplayResponse":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+
+class ReplaySession:
+    """Minimal aiohttp.ClientSession stand-in serving the recorded fixtures.
+
+    ``requests`` records (method, fixture name) per request; ``overrides``
+    replaces a fixture's body for the rest of the test.
+    """
+
+    def __init__(self) -> None:
+        self.closed = False
+        self.cookie_jar = aiohttp.CookieJar()
+        self.requests: list[tuple[str, str]] = []
+        self.overrides: dict[str, str] = {}
+
+    def request(self, method, url, data=None, json=None, params=None, proxy=None, **kwargs):
+        name = _route(method, url, data)
+        self.requests.append((method, name))
+        body = self.overrides[name] if name in self.overrides else load_fixture(name)
+        return _ReplayResponse(body)
+
+    def pages(self, name: str) -> int:
+        return sum(1 for _, page in self.requests if page == name)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def rotate_tokens(markup: str) -> str:
+    """Give every session token a new value, as T-NEXT does on each response."""
+    markup = re.sub(
+        r'(name="(?:rx-token|rx-loginKey|rx-deviceKbn|rx-loginType|javax\.faces\.ViewState)"'
+        r'[^>]*?value=")[^"]*',
+        r"\g<1>rotated-0000",
+        markup,
+    )
+    return re.sub(
+        r"(javax\.faces\.ViewState[^\"]*\"><!\[CDATA\[)[^\]]*",
+        r"\g<1>-1:2",
+        markup,
+    )
+
+
+def detail_pages(session) -> list[str]:
+    return [name for _, name in session.requests if name.startswith("kadai_detail_")]
+
+
+def list_rows(page: str) -> tuple[str, list[str], str]:
+    start = page.index("<li ")
+    end = page.rindex("</li>") + len("</li>")
+    rows = re.findall(r"<li .*?</li>", page[start:end])
+    return page[:start], rows, page[end:]
+
+
+def renumber_rows(rows: list[str]) -> str:
+    """Give rows the position-based j_idt78:{n} IDs T-NEXT would render."""
+    return "".join(
+        re.sub(r"j_idt78:\d+:", f"j_idt78:{n}:", row) for n, row in enumerate(rows)
+    )
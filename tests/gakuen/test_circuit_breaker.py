@@ -0,0 +1,276 @@
+"""
+Tests for the T-NEXT circuit breaker (tutnext.services.gakuen.retry.CircuitBreaker)
+and how _HttpClient.fetch reports to it.
+"""
+
+import asyncio
+
+import aiohttp
+import pytest
+
+from tests.gakuen.replay import BASE_URL, ReplaySession
+from tutnext.services.gakuen import http, retry
+from tutnext.services.gakuen.errors import (
+    GakuenBusyError,
+    GakuenCircuitOpenError,
+    GakuenNetworkError,
+)
+from tutnext.services.gakuen.http import _HttpClient
+from tutnext.services.gakuen.retry import BACKGROUND_POLICY, CircuitBreaker, is_retryable
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(retry.time, "monotonic", clock)
+    return clock
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.before_request()
+        breaker.record_failure()
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        for _ in range(2):
+            breaker.before_request()
+            breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        breaker.before_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(GakuenCircuitOpenError) as excinfo:
+            breaker.before_request()
+        assert excinfo.value.error_code == "CIRCUIT_OPEN"
+
+    def test_success_resets_failure_count(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        for _ in range(2):
+            breaker.record_failure()
+        breaker.record_success()
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_closed_breaker_lets_concurrent_requests_through(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        for _ in range(5):
+            breaker.before_request()
+
+    def test_half_open_allows_a_single_probe(self, clock):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        _open(breaker)
+
+        clock.now += 59
+        with pytest.raises(GakuenCircuitOpenError):
+            breaker.before_request()
+
+        clock.now += 1
+        breaker.before_request()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(GakuenCircuitOpenError):
+            breaker.before_request()
+
+    def test_successful_probe_closes(self, clock):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        _open(breaker)
+        clock.now += 60
+        breaker.before_request()
+        breaker.record_success()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.before_request()
+        breaker.before_request()
+
+    def test_failed_probe_reopens_for_full_timeout(self, clock):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        _open(breaker)
+        clock.now += 60
+        breaker.before_request()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        clock.now += 59
+        with pytest.raises(GakuenCircuitOpenError):
+            breaker.before_request()
+        clock.now += 1
+        breaker.before_request()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    def test_release_frees_the_probe(self, clock):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        _open(breaker)
+        clock.now += 60
+        breaker.before_request()
+        breaker.release()
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        breaker.before_request()
+
+
+class FailingSession(ReplaySession):
+    """Replay session whose responses can be switched to 5xx or network errors."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.status = 200
+        self.error = None
+
+    def request(self, method, url, data=None, json=None, params=None, proxy=None, **kwargs):
+        if self.error is not None:
+            self.requests.append((method, "error"))
+            raise self.error
+        response = super().request(method, url, data, json, params, proxy)
+        response.status = self.status
+        response.reason = "Service Unavailable" if self.status >= 500 else "OK"
+        return response
+
+
+class RecordingGovernor:
+    def __init__(self, busy: bool = False) -> None:
+        self.busy = busy
+        self.calls = 0
+
+    async def acquire(self, priority=None) -> None:
+        self.calls += 1
+        if self.busy:
+            raise GakuenBusyError("busy", error_code="BUSY", status_code=503)
+
+
+@pytest.fixture
+async def failing_session():
+    return FailingSession()
+
+
+class TestFetch:
+    URL = f"{BASE_URL}/uprx/up/pk/pky501/Pky50101.xhtml"
+
+    def _client(self, session, breaker):
+        return _HttpClient(session, 10, None, breaker=breaker)  # type: ignore[arg-type]
+
+    async def test_5xx_opens_and_stops_sending(self, clock, failing_session):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        client = self._client(failing_session, breaker)
+        failing_session.status = 503
+        for _ in range(2):
+            with pytest.raises(GakuenNetworkError):
+                await client.fetch(self.URL, method="GET", response_type="text")
+
+        with pytest.raises(GakuenCircuitOpenError):
+            await client.fetch(self.URL, method="GET", response_type="text")
+        assert len(failing_session.requests) == 2
+
+    async def test_network_errors_count_as_failures(self, clock, failing_session):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        client = self._client(failing_session, breaker)
+        failing_session.error = aiohttp.ClientConnectionError("refused")
+        for _ in range(2):
+            with pytest.raises(GakuenNetworkError):
+                await client.fetch(self.URL, method="GET", response_type="text")
+        assert breaker.state == CircuitBreaker.OPEN
+
+    async def test_4xx_does_not_count_as_failure(self, clock, failing_session):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        client = self._client(failing_session, breaker)
+        failing_session.status = 404
+        for _ in range(3):
+            with pytest.raises(GakuenNetworkError):
+                await client.fetch(self.URL, method="GET", response_type="text")
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    async def test_recovered_probe_closes(self, clock, failing_session):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        client = self._client(failing_session, breaker)
+        failing_session.status = 503
+        for _ in range(2):
+            with pytest.raises(GakuenNetworkError):
+                await client.fetch(self.URL, method="GET", response_type="text")
+
+        clock.now += 60
+        failing_session.status = 200
+        assert "<" in await client.fetch(self.URL, method="GET", response_type="text")
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    async def test_cancelled_probe_is_released(self, clock, failing_session):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        client = self._client(failing_session, breaker)
+        _open(breaker)
+        clock.now += 60
+
+        failing_session.error = asyncio.CancelledError()
+        with pytest.raises(asyncio.CancelledError):
+            await client.fetch(self.URL, method="GET", response_type="text")
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        failing_session.error = None
+        await client.fetch(self.URL, method="GET", response_type="text")
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    async def test_open_circuit_does_not_wait_for_governor(self, clock, failing_session):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        governor = RecordingGovernor()
+        client = _HttpClient(failing_session, 10, None, breaker=breaker, governor=governor)  # type: ignore[arg-type]
+        _open(breaker)
+
+        with pytest.raises(GakuenCircuitOpenError):
+            await client.fetch(self.URL, method="GET", response_type="text")
+        assert governor.calls == 0
+
+    async def test_busy_governor_releases_probe(self, clock, failing_session):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        governor = RecordingGovernor(busy=True)
+        client = _HttpClient(failing_session, 10, None, breaker=breaker, governor=governor)  # type: ignore[arg-type]
+        _open(breaker)
+        clock.now += 60
+
+        with pytest.raises(GakuenBusyError):
+            await client.fetch(self.URL, method="GET", response_type="text")
+        assert failing_session.requests == []
+
+        governor.busy = False
+        await client.fetch(self.URL, method="GET", response_type="text")
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestOpenCircuitIsNotRetried:
+    @pytest.fixture
+    async def web_api(self, make_gakuen, clock):
+        api = make_gakuen()
+        await api.login()
+        _open(http.gakuen_breaker)
+        return api
+
+    async def test_home_page_navigation_keeps_circuit_open_code(self, web_api, replay_session):
+        replay_session.requests.clear()
+        with pytest.raises(GakuenCircuitOpenError) as excinfo:
+            await web_api.kadai_data()
+        assert excinfo.value.error_code == "CIRCUIT_OPEN"
+        assert not is_retryable(excinfo.value)
+        assert replay_session.requests == []
+
+    async def test_background_policy_does_not_retry(self, web_api, monkeypatch):
+        calls = []
+
+        async def kadai_data():
+            calls.append(1)
+            return await web_api.kadai_data()
+
+        async def no_sleep(delay):
+            raise AssertionError("an open circuit must not be retried")
+
+        monkeypatch.setattr(retry.asyncio, "sleep", no_sleep)
+        with pytest.raises(GakuenCircuitOpenError):
+            await BACKGROUND_POLICY.run(kadai_data)
+        assert calls == [1]
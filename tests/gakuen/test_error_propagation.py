@@ -0,0 +1,60 @@
+"""
+Tests that GakuenAPI passes T-NEXT errors raised before a request is sent
+(busy governor) through its wrappers unchanged, and how routes report them.
+"""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from tutnext.api.routes import schedule as schedule_route
+from tutnext.services.gakuen import http
+from tutnext.services.gakuen.errors import GakuenBusyError
+
+
+class BusyGovernor:
+    async def acquire(self, priority=None) -> None:
+        raise GakuenBusyError("busy", error_code="BUSY", status_code=503)
+
+
+@pytest.fixture
+def busy_api(make_gakuen):
+    api = make_gakuen()
+    api._http.governor = BusyGovernor()
+    api._state.api_is_logged_in = True
+    api._state.rx_tokens = {"token": "t", "loginKey": "k", "deviceKbn": "d", "loginType": "l"}
+    api._state.view_state = "vs"
+    return api
+
+
+@pytest.mark.parametrize(
+    "call",
+    [
+        lambda api: api.class_bulletin(),
+        lambda api: api.class_data_info({}),
+        lambda api: api._to_home_page(),
+        lambda api: api._to_mobile_home_page(),
+        lambda api: api.api_login_out(),
+    ],
+    ids=["class_bulletin", "class_data_info", "home_page", "mobile_home_page", "api_login_out"],
+)
+async def test_busy_error_is_not_rewrapped(busy_api, replay_session, call):
+    with pytest.raises(GakuenBusyError) as excinfo:
+        await call(busy_api)
+    assert excinfo.value.error_code == "BUSY"
+    assert replay_session.requests == []
+
+
+async def test_class_bulletin_route_returns_503(patched_redis, monkeypatch):
+    monkeypatch.setattr(http, "get_governor", lambda: BusyGovernor())
+    app = FastAPI()
+    app.include_router(schedule_route.router, prefix="/schedule")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.post(
+            "/schedule/class_bulletin",
+            json={"loginUserId": "u", "encryptedLoginPassword": "pw"},
+        )
+    assert res.status_code == 503
+    assert res.headers["retry-after"]
+    assert res.json()["responseCode"] == 503
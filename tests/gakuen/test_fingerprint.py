@@ -0,0 +1,64 @@
+"""
+Tests for token-masked page fingerprints (tutnext.services.gakuen.fingerprint).
+"""
+
+from tests.gakuen.replay import rotate_tokens
+from tutnext.services.gakuen.fingerprint import (
+    PageFingerprint,
+    body_fingerprint,
+    load_page_fingerprint,
+    store_page_fingerprint,
+)
+
+
+class TestBodyFingerprint:
+    def test_masks_rx_tokens_and_view_state_inputs(self, gakuen_fixture):
+        page = gakuen_fixture("kadai_list.html")
+        rotated = rotate_tokens(page)
+        assert rotated != page
+        assert body_fingerprint(rotated) == body_fingerprint(page)
+
+    def test_masks_view_state_update_in_partial_response(self, gakuen_fixture):
+        partial = gakuen_fixture("schedule_day.xml")
+        rotated = rotate_tokens(partial)
+        assert "<![CDATA[-1:2]]>" in rotated
+        assert body_fingerprint(rotated) == body_fingerprint(partial)
+
+    def test_attribute_order_and_quotes_do_not_leak_tokens(self):
+        a = "<form><input value='abc' type='hidden' name='rx-token'/></form>"
+        b = "<form><input value='xyz' type='hidden' name='rx-token'/></form>"
+        assert body_fingerprint(a) == body_fingerprint(b)
+
+    def test_content_change_changes_fingerprint(self, gakuen_fixture):
+        page = gakuen_fixture("kadai_list.html")
+        changed = rotate_tokens(page).replace("</form>", "<span>new</span></form>", 1)
+        assert body_fingerprint(changed) != body_fingerprint(page)
+
+    def test_other_hidden_inputs_are_not_masked(self):
+        a = '<input type="hidden" name="pmPage:funcForm:kadaiId" value="1" />'
+        b = '<input type="hidden" name="pmPage:funcForm:kadaiId" value="2" />'
+        assert body_fingerprint(a) != body_fingerprint(b)
+
+    def test_str_and_bytes_agree(self, gakuen_fixture):
+        page = gakuen_fixture("kadai_list.html")
+        assert body_fingerprint(page) == body_fingerprint(page.encode("utf-8"))
+        assert body_fingerprint(rotate_tokens(page).encode("utf-8")) == body_fingerprint(page)
+
+
+class TestPageFingerprint:
+    def test_unchanged_requires_previous(self):
+        assert not PageFingerprint(previous=None, current="a").unchanged
+        assert not PageFingerprint(previous="a", current="b").unchanged
+        assert PageFingerprint(previous="a", current="a").unchanged
+
+    async def test_store_and_load(self, patched_redis):
+        assert await load_page_fingerprint("u", "kadai_list") == PageFingerprint()
+
+        await store_page_fingerprint("u", "kadai_list", PageFingerprint(current="abc"))
+        loaded = await load_page_fingerprint("u", "kadai_list")
+        assert loaded.previous == "abc"
+        assert loaded.current is None
+
+    async def test_nothing_stored_without_current(self, patched_redis):
+        await store_page_fingerprint("u", "kadai_list", PageFingerprint(previous="abc"))
+        assert await patched_redis.keys("gakuen:page_fp:*") == []
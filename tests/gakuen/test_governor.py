@@ -0,0 +1,128 @@
+"""
+Tests for the Redis-coordinated T-NEXT rate governor
+(tutnext.services.gakuen.governor.RequestGovernor).
+"""
+
+import asyncio
+
+import pytest
+
+from tutnext.services.gakuen.errors import GakuenBusyError
+from tutnext.services.gakuen.governor import Priority, RequestGovernor, request_priority
+
+
+def _governor(rate=20.0, burst=1, deadline=5.0, **kwargs) -> RequestGovernor:
+    return RequestGovernor(rate=rate, burst=burst, interactive_deadline=deadline, **kwargs)
+
+
+async def _drain(governor: RequestGovernor) -> None:
+    """Spend the burst so that later requests have to queue."""
+    for _ in range(governor.burst):
+        await governor.acquire(Priority.MONITOR)
+
+
+class TestRequestGovernor:
+    async def test_disabled_governor_never_waits(self, patched_redis):
+        governor = _governor(rate=0)
+        for _ in range(100):
+            await governor.acquire()
+        assert governor.queue_depth() == 0
+
+    async def test_burst_is_granted_immediately(self, patched_redis):
+        governor = _governor(rate=1, burst=3)
+        await asyncio.wait_for(_drain(governor), 0.5)
+        assert await governor._take_token() > 0
+
+    async def test_bucket_is_shared_between_processes(self, patched_redis):
+        first, second = _governor(rate=1, burst=2), _governor(rate=1, burst=2)
+        await _drain(first)
+        assert await second._take_token() > 0
+
+    async def test_higher_priority_is_dispatched_first(self, patched_redis):
+        governor = _governor(rate=20, burst=1)
+        await _drain(governor)
+        order = []
+
+        async def request(name, priority):
+            await governor.acquire(priority)
+            order.append(name)
+
+        await asyncio.gather(
+            request("monitor-1", Priority.MONITOR),
+            request("monitor-2", Priority.MONITOR),
+            request("push", Priority.PUSH),
+            request("interactive", Priority.INTERACTIVE),
+        )
+        assert order == ["interactive", "push", "monitor-1", "monitor-2"]
+
+    async def test_priority_comes_from_context(self, patched_redis):
+        governor = _governor(rate=20, burst=1)
+        await _drain(governor)
+        order = []
+
+        async def request(name, priority):
+            with request_priority(priority):
+                await governor.acquire()
+            order.append(name)
+
+        await asyncio.gather(
+            request("monitor", Priority.MONITOR),
+            request("live-activity", Priority.LIVE_ACTIVITY),
+        )
+        assert order == ["live-activity", "monitor"]
+
+    async def test_interactive_past_deadline_is_busy(self, patched_redis):
+        governor = _governor(rate=1, burst=1, deadline=0.1)
+        await _drain(governor)
+
+        with pytest.raises(GakuenBusyError) as excinfo:
+            await governor.acquire(Priority.INTERACTIVE)
+        assert excinfo.value.error_code == "BUSY"
+        assert excinfo.value.status_code == 503
+        assert governor.queue_depth() == 0
+
+    async def test_interactive_rejected_without_waiting_when_queue_full(self, patched_redis):
+        governor = _governor(rate=1, burst=1, deadline=10, max_interactive_queue=2)
+        await _drain(governor)
+        queued = [
+            asyncio.create_task(governor.acquire(Priority.INTERACTIVE)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        try:
+            with pytest.raises(GakuenBusyError):
+                await asyncio.wait_for(governor.acquire(Priority.INTERACTIVE), 0.05)
+        finally:
+            for task in queued:
+                task.cancel()
+            await asyncio.gather(*queued, return_exceptions=True)
+
+    async def test_background_requests_wait_past_deadline(self, patched_redis):
+        governor = _governor(rate=10, burst=1, deadline=0.01)
+        await _drain(governor)
+        await asyncio.wait_for(governor.acquire(Priority.MONITOR), 1)
+
+    async def test_lower_priority_does_not_count_against_interactive(self, patched_redis):
+        governor = _governor(rate=10, burst=1, deadline=0.5, max_interactive_queue=1)
+        await _drain(governor)
+        background = [
+            asyncio.create_task(governor.acquire(Priority.MONITOR)) for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+
+        try:
+            await governor.acquire(Priority.INTERACTIVE)
+            assert governor.queue_depth(Priority.MONITOR) == 5
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+
+    async def test_falls_back_to_local_bucket_without_redis(self, patched_redis, monkeypatch):
+        async def refused(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(patched_redis, "eval", refused)
+        governor = _governor(rate=1, burst=2)
+        await asyncio.wait_for(_drain(governor), 0.5)
+        assert await governor._take_token() > 0
@@ -0,0 +1,168 @@
+"""
+Tests for the shared PrimeFaces component-ID registry
+(tutnext.services.gakuen.ids) and how mobile login uses it.
+"""
+
+import json
+
+from bs4 import BeautifulSoup
+
+from tests.gakuen.replay import ReplaySession, load_fixture
+from tutnext.services.gakuen import ids
+from tutnext.services.gakuen.ids import _IdRegistry, _MobilePageIds, mobile_id_registry
+
+KADAI_TAB_LINK_ID = "pmPage:funcForm:j_idt107:j_idt125"
+MOBILE_IDS = {
+    "calendar_id": "pmPage:funcForm:j_idt104",
+    "accordion_id": "pmPage:funcForm:j_idt107",
+    "kadai_tab_link_id": KADAI_TAB_LINK_ID,
+}
+
+
+async def _stored_entry(redis) -> dict:
+    return json.loads(await redis.get(ids._REGISTRY_KEY))
+
+
+class TestMobilePageIds:
+    def test_extracts_shared_ids_from_home_page(self, gakuen_fixture):
+        page_ids = _MobilePageIds()
+        page_ids.extract_mobile_ids(BeautifulSoup(gakuen_fixture("mobile_home.html"), "lxml"))
+        assert page_ids.mobile_ids() == MOBILE_IDS
+
+    def test_incomplete_ids_are_not_shared(self):
+        page_ids = _MobilePageIds()
+        page_ids.calendar_id = MOBILE_IDS["calendar_id"]
+        assert page_ids.mobile_ids() is None
+
+    def test_fingerprint_follows_head_resources(self, gakuen_fixture):
+        page = gakuen_fixture("mobile_home.html")
+        original = _MobilePageIds.page_fingerprint(BeautifulSoup(page, "lxml"))
+        redeployed = page.replace("components.css?ln=primefaces-mo", "components.css?v=2&ln=primefaces-mo")
+
+        assert original is not None
+        assert _MobilePageIds.page_fingerprint(BeautifulSoup(page, "lxml")) == original
+        assert _MobilePageIds.page_fingerprint(BeautifulSoup(redeployed, "lxml")) != original
+
+    def test_body_changes_do_not_change_fingerprint(self, gakuen_fixture):
+        page = gakuen_fixture("mobile_home.html")
+        edited = page.replace("期限あり", "期限あり ", 1)
+        assert _MobilePageIds.page_fingerprint(
+            BeautifulSoup(page, "lxml")
+        ) == _MobilePageIds.page_fingerprint(BeautifulSoup(edited, "lxml"))
+
+
+class TestIdRegistry:
+    async def test_lookup_requires_same_fingerprint(self, patched_redis):
+        registry = _IdRegistry()
+        await registry.publish("fp-1", MOBILE_IDS)
+        assert await registry.lookup("fp-1") == MOBILE_IDS
+        assert await registry.lookup("fp-2") is None
+        assert await registry.lookup(None) is None
+
+    async def test_other_process_reads_from_redis(self, patched_redis):
+        await _IdRegistry().publish("fp-1", MOBILE_IDS)
+        assert await _IdRegistry().lookup("fp-1") == MOBILE_IDS
+        assert await patched_redis.ttl(ids._REGISTRY_KEY) > 0
+
+    async def test_incomplete_entry_is_ignored(self, patched_redis):
+        partial = dict(MOBILE_IDS, accordion_id=None)
+        await patched_redis.set(
+            ids._REGISTRY_KEY, json.dumps({"fingerprint": "fp-1", "ids": partial})
+        )
+        assert await _IdRegistry().lookup("fp-1") is None
+
+    async def test_missing_ids_are_not_published(self, patched_redis):
+        await _IdRegistry().publish("fp-1", None)
+        assert await patched_redis.get(ids._REGISTRY_KEY) is None
+
+    async def test_lookup_returns_a_copy(self, patched_redis):
+        registry = _IdRegistry()
+        await registry.publish("fp-1", MOBILE_IDS)
+        (await registry.lookup("fp-1"))["calendar_id"] = "changed"
+        assert await registry.lookup("fp-1") == MOBILE_IDS
+
+    async def test_invalidate_clears_process_and_redis(self, patched_redis):
+        registry, other = _IdRegistry(), _IdRegistry()
+        await registry.publish("fp-1", MOBILE_IDS)
+        await other.lookup("fp-1")
+
+        await registry.invalidate()
+        assert await registry.lookup("fp-1") is None
+        assert await patched_redis.get(ids._REGISTRY_KEY) is None
+
+    async def test_works_in_process_without_redis(self, patched_redis, monkeypatch):
+        async def refused(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        for command in ("get", "set", "delete"):
+            monkeypatch.setattr(patched_redis, command, refused)
+        registry = _IdRegistry()
+        await registry.publish("fp-1", MOBILE_IDS)
+        assert await registry.lookup("fp-1") == MOBILE_IDS
+        await registry.invalidate()
+        assert await registry.lookup("fp-1") is None
+
+
+class StaleIdSession(ReplaySession):
+    """T-NEXT answers a kadai tab request with an unknown link ID with the home page."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.stale_requests = 0
+
+    def request(self, method, url, data=None, json=None, params=None, **kwargs):
+        form = data or {}
+        if (
+            url.endswith("Bsa50101.xhtml")
+            and "javax.faces.partial.ajax" not in form
+            and form.get("rx.sync.source") != KADAI_TAB_LINK_ID
+        ):
+            self.stale_requests += 1
+            self.overrides["kadai_list.html"] = load_fixture("mobile_home.html")
+        else:
+            self.overrides.pop("kadai_list.html", None)
+        return super().request(method, url, data, json, params, **kwargs)
+
+
+class TestMobileLogin:
+    async def test_first_login_publishes_extracted_ids(self, make_gakuen, patched_redis):
+        api = make_gakuen()
+        await api._mobile_login()
+
+        assert not api._ids.from_registry
+        entry = await _stored_entry(patched_redis)
+        assert entry["ids"] == MOBILE_IDS
+        assert entry["fingerprint"]
+
+    async def test_later_login_uses_registry(self, make_gakuen, monkeypatch):
+        await make_gakuen()._mobile_login()
+        # a new process: empty in-process registry, entry in Redis
+        monkeypatch.setattr(mobile_id_registry, "_fingerprint", None)
+        monkeypatch.setattr(mobile_id_registry, "_ids", None)
+
+        def must_not_extract(self, soup):
+            raise AssertionError("IDs should come from the registry")
+
+        monkeypatch.setattr(_MobilePageIds, "extract_mobile_ids", must_not_extract)
+        api = make_gakuen()
+        await api._mobile_login()
+        assert api._ids.from_registry
+        assert api._ids.mobile_ids() == MOBILE_IDS
+
+    async def test_stale_registry_ids_are_rediscovered(self, make_gakuen, patched_redis):
+        session = StaleIdSession()
+        api = make_gakuen(session)
+        # learn the real fingerprint, then poison the registry with an outdated link ID
+        await api._mobile_login()
+        fingerprint = (await _stored_entry(patched_redis))["fingerprint"]
+        stale = dict(MOBILE_IDS, kadai_tab_link_id="pmPage:funcForm:j_idt107:j_idt999")
+        await mobile_id_registry.publish(fingerprint, stale)
+
+        await api._mobile_login()
+        assert api._ids.from_registry
+        kadai = await api.get_user_kadai(skip_login=True, use_detail_cache=False)
+
+        assert session.stale_requests == 1
+        assert len(kadai) == 5
+        assert not api._ids.from_registry
+        assert (await _stored_entry(patched_redis))["ids"] == MOBILE_IDS
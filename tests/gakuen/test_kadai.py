@@ -0,0 +1,100 @@
+"""
+Tests for GakuenAPI kadai fetching against the recorded T-NEXT responses.
+"""
+
+import json
+
+import pytest
+
+from tests.gakuen.replay import detail_pages, list_rows, renumber_rows
+from tutnext.services.gakuen.errors import GakuenDataError
+
+
+class TestGetUserKadai:
+    async def test_parses_recorded_list_and_details(self, make_gakuen, replay_session):
+        api = make_gakuen()
+        await api._mobile_login()
+        kadai = await api.get_user_kadai(skip_login=True, use_detail_cache=False)
+        assert len(kadai) == 5
+        assert all(k["title"] and k["courseName"] for k in kadai)
+        assert replay_session.pages("kadai_list.html") >= 1
+
+    async def test_missing_list_raises_data_error(self, make_gakuen, monkeypatch):
+        api = make_gakuen()
+
+        async def no_list(fingerprint=None):
+            return None
+
+        monkeypatch.setattr(api, "_open_kadai_main_content", no_list)
+        with pytest.raises(GakuenDataError) as excinfo:
+            await api.get_user_kadai(skip_login=True)
+        assert excinfo.value.error_code == "NO_KADAI_LIST"
+
+
+class TestKadaiDetailCache:
+    async def test_unchanged_rows_skipdetail_pages(self, make_gakuen, replay_session):
+        api = make_gakuen()
+        await api._mobile_login()
+        first = await api.get_user_kadai(skip_login=True)
+        assert len(detail_pages(replay_session)) == 5
+
+        replay_session.requests.clear()
+        second = await api.get_user_kadai(skip_login=True)
+        assert detail_pages(replay_session) == []
+        assert second == first
+
+    async def test_changed_row_refetches_only_that_detail(
+        self, make_gakuen, replay_session, gakuen_fixture
+    ):
+        api = make_gakuen()
+        await api._mobile_login()
+        await api.get_user_kadai(skip_login=True)
+
+        head, rows, tail = list_rows(gakuen_fixture("kadai_list.html"))
+        # same course / title / period (same cache key), different row markup
+        rows[2] = rows[2].replace('signKadai">レポート', 'signKadai">提出済', 1)
+        replay_session.overrides["kadai_list.html"] = head + "".join(rows) + tail
+        replay_session.requests.clear()
+
+        await api.get_user_kadai(skip_login=True)
+        assert detail_pages(replay_session) == ["kadai_detail_2.html"]
+
+    async def test_reordered_rows_stay_cached(self, make_gakuen, replay_session, gakuen_fixture):
+        api = make_gakuen()
+        await api._mobile_login()
+        first = await api.get_user_kadai(skip_login=True)
+
+        head, rows, tail = list_rows(gakuen_fixture("kadai_list.html"))
+        rows[0], rows[1] = rows[1], rows[0]
+        replay_session.overrides["kadai_list.html"] = head + renumber_rows(rows) + tail
+        replay_session.requests.clear()
+
+        second = await api.get_user_kadai(skip_login=True)
+        assert detail_pages(replay_session) == []
+        assert [k["title"] for k in second] == [
+            first[1]["title"], first[0]["title"], *(k["title"] for k in first[2:])
+        ]
+        # the position-based element ID follows the row, the detail follows the kadai
+        assert second[0]["id"] == "pmPage:funcForm:j_idt78:0:j_idt81"
+
+    async def test_cache_entries_do_not_store_login_url(self, make_gakuen, patched_redis):
+        api = make_gakuen()
+        await api._mobile_login()
+        kadai = await api.get_user_kadai(skip_login=True)
+        assert all(k["url"] for k in kadai)
+
+        keys = await patched_redis.keys("kadai:detail:test0001:*")
+        assert len(keys) == 5
+        for key in keys:
+            entry = json.loads(await patched_redis.get(key))
+            assert set(entry) == {"rowHash", "detail"}
+            assert "url" not in entry["detail"] and "id" not in entry["detail"]
+            assert api.encrypted_login_password not in json.dumps(entry)
+
+    async def test_cache_can_be_bypassed(self, make_gakuen, replay_session):
+        api = make_gakuen()
+        await api._mobile_login()
+        await api.get_user_kadai(skip_login=True)
+        replay_session.requests.clear()
+        await api.get_user_kadai(skip_login=True, use_detail_cache=False)
+        assert len(detail_pages(replay_session)) == 5
@@ -0,0 +1,112 @@
+"""
+Tests for the count-only kadai summary (GakuenAPI.get_user_kadai_summary) and the
+MonitorService fast path built on it.
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from tests.gakuen.replay import detail_pages, list_rows, renumber_rows, rotate_tokens
+from tutnext.services.push.monitor import MonitorService
+
+
+@pytest.fixture
+async def api(make_gakuen):
+    api = make_gakuen()
+    await api._mobile_login()
+    return api
+
+
+@pytest.fixture
+def monitor(patched_redis):
+    return MonitorService(MagicMock())
+
+
+class TestKadaiSummary:
+    async def test_summary_reads_only_the_list_page(self, api, replay_session):
+        replay_session.requests.clear()
+        summary = await api.get_user_kadai_summary(skip_login=True)
+
+        assert [name for _, name in replay_session.requests] == ["kadai_list.html"]
+        assert len(summary) == 5
+        assert summary[0] == {
+            "id": "pmPage:funcForm:j_idt78:0:j_idt81",
+            "kind": "レポート",
+            "courseId": "10230",
+            "courseName": "情報処理演習Ⅰ",
+            "title": "第3回 演習レポート",
+            "period": "2025/07/08(火) 10:40 ～ 2025/07/22(火) 23:59",
+        }
+
+    def test_digest_ignores_row_order_and_ids(self):
+        rows = [
+            {"id": "a:0", "kind": "レポート", "courseId": "1", "title": "x", "period": "p"},
+            {"id": "a:1", "kind": "テスト", "courseId": "2", "title": "y", "period": "q"},
+        ]
+        swapped = [dict(rows[1], id="a:0"), dict(rows[0], id="a:1")]
+        assert MonitorService.summary_digest(rows) == MonitorService.summary_digest(swapped)
+        changed = [rows[0], dict(rows[1], title="z")]
+        assert MonitorService.summary_digest(rows) != MonitorService.summary_digest(changed)
+
+
+class TestMonitorFastPath:
+    async def test_first_check_fetches_details(self, api, monitor, replay_session, patched_redis):
+        kadai_list, total = await monitor.fetch_gakuen_kadai(api, "test0001", "pw")
+        assert total == 5 and len(kadai_list) == 5
+        assert len(detail_pages(replay_session)) == 5
+        assert await patched_redis.exists("kadai_summary:test0001")
+
+    async def test_unchanged_page_skips_details(self, api, monitor, replay_session):
+        await monitor.fetch_gakuen_kadai(api, "test0001", "pw")
+        replay_session.requests.clear()
+
+        assert await monitor.fetch_gakuen_kadai(api, "test0001", "pw") == (None, 5)
+        assert detail_pages(replay_session) == []
+
+    async def test_rotated_tokens_skip_details(
+        self, api, monitor, replay_session, gakuen_fixture
+    ):
+        await monitor.fetch_gakuen_kadai(api, "test0001", "pw")
+        replay_session.overrides["kadai_list.html"] = rotate_tokens(gakuen_fixture("kadai_list.html"))
+        replay_session.requests.clear()
+
+        assert await monitor.fetch_gakuen_kadai(api, "test0001", "pw") == (None, 5)
+        assert detail_pages(replay_session) == []
+
+    async def test_reordered_list_matches_summary_digest(
+        self, api, monitor, replay_session, gakuen_fixture
+    ):
+        await monitor.fetch_gakuen_kadai(api, "test0001", "pw")
+        head, rows, tail = list_rows(gakuen_fixture("kadai_list.html"))
+        rows.reverse()
+        replay_session.overrides["kadai_list.html"] = head + renumber_rows(rows) + tail
+        replay_session.requests.clear()
+
+        # the page hash changed, but the summary digest did not
+        assert await monitor.fetch_gakuen_kadai(api, "test0001", "pw") == (None, 5)
+        assert detail_pages(replay_session) == []
+
+    async def test_new_kadai_fetches_details(
+        self, api, monitor, replay_session, gakuen_fixture
+    ):
+        await monitor.fetch_gakuen_kadai(api, "test0001", "pw")
+        head, rows, tail = list_rows(gakuen_fixture("kadai_list.html"))
+        rows = rows[:4]
+        replay_session.overrides["kadai_list.html"] = head + renumber_rows(rows) + tail
+        replay_session.requests.clear()
+
+        kadai_list, total = await monitor.fetch_gakuen_kadai(api, "test0001", "pw")
+        assert total == 4 and len(kadai_list) == 4
+        # details of the remaining rows come from the detail cache
+        assert detail_pages(replay_session) == []
+
+    async def test_missing_summary_record_forces_full_fetch(
+        self, api, monitor, replay_session, patched_redis
+    ):
+        await monitor.fetch_gakuen_kadai(api, "test0001", "pw")
+        await patched_redis.delete("kadai_summary:test0001")
+        replay_session.requests.clear()
+
+        kadai_list, total = await monitor.fetch_gakuen_kadai(api, "test0001", "pw")
+        assert total == 5 and kadai_list is not None
@@ -0,0 +1,61 @@
+"""
+Tests for the streaming partial-response reader (tutnext.services.gakuen.partial).
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from tutnext.services.gakuen.errors import GakuenDataError
+from tutnext.services.gakuen.partial import read_content_and_tokens, read_updates
+from tutnext.services.gakuen.retry import is_retryable
+
+MAIN_CONTENT = "pmPage:funcForm:mainContent"
+# plain (not XHTML) error page, as served by the proxy in front of T-NEXT
+EXPIRED_PAGE = (
+    "<!DOCTYPE html><html><head><meta charset=utf-8><title>セッションタイムアウト</title></head>"
+    "<body><p>セッションがタイムアウトしました<br>再度ログインしてください</body></html>"
+)
+
+
+class TestReadUpdates:
+    def test_reads_recorded_partial_response(self, gakuen_fixture):
+        content, tokens = read_content_and_tokens(gakuen_fixture("schedule_day.xml"), MAIN_CONTENT)
+        assert content is not None and "lesson" in content.lower()
+        assert tokens is not None and "rx-token" in tokens
+
+    def test_selects_requested_ids(self, gakuen_fixture):
+        body = gakuen_fixture("schedule_day.xml")
+        updates = read_updates(body, [MAIN_CONTENT])
+        assert list(updates) == [MAIN_CONTENT]
+        assert read_updates(body.encode("utf-8"), [MAIN_CONTENT]) == updates
+
+    @pytest.mark.parametrize("name", ["mobile_login.html", None])
+    def test_html_body_has_no_updates(self, gakuen_fixture, name):
+        # an expired session gets an HTML page instead of a partial-response
+        page = gakuen_fixture(name) if name else EXPIRED_PAGE
+        assert read_updates(page) == {}
+        assert read_content_and_tokens(page, MAIN_CONTENT) == (None, None)
+
+    def test_truncated_body_keeps_updates_read_so_far(self, gakuen_fixture):
+        body = gakuen_fixture("schedule_day.xml")
+        cut = body.index("</update>") + len("</update>") + 20
+        assert len(read_updates(body[:cut])) == 1
+
+
+class TestSessionExpiredPage:
+    async def test_day_schedule_is_empty(self, make_gakuen, replay_session):
+        replay_session.overrides["schedule_day.xml"] = EXPIRED_PAGE
+        api = make_gakuen()
+        day = await api.get_later_user_schedule(target_date=date.today() + timedelta(days=1))
+        assert day["time_table"] == [] and day["all_day_events"] == []
+
+    async def test_month_data_is_not_retryable(self, make_gakuen, replay_session):
+        api = make_gakuen()
+        await api.login()
+        replay_session.overrides["month_data.xml"] = EXPIRED_PAGE
+        today = date.today()
+        with pytest.raises(GakuenDataError) as excinfo:
+            await api.month_data(today.year, today.month)
+        assert excinfo.value.error_code == "NO_MONTH_DATA"
+        assert not is_retryable(excinfo.value)
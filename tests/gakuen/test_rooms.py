@@ -0,0 +1,104 @@
+"""
+Tests for the course name -> classroom cache (tutnext.services.gakuen.rooms).
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from tutnext.services.gakuen import rooms
+from tutnext.services.gakuen.rooms import _RoomCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rooms.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def mget_calls(patched_redis, monkeypatch):
+    calls = []
+    mget = patched_redis.mget
+
+    async def counting_mget(keys, *args):
+        calls.append(list(keys))
+        return await mget(keys, *args)
+
+    monkeypatch.setattr(patched_redis, "mget", counting_mget)
+    return calls
+
+
+class TestRoomCache:
+    async def test_store_writes_redis_with_ttl(self, patched_redis):
+        await _RoomCache().store({"統計学入門": "2203教室", "": "x", "空": ""})
+        assert await patched_redis.get("room:統計学入門") == "2203教室".encode()
+        assert 0 < await patched_redis.ttl("room:統計学入門") <= 604800
+        assert await patched_redis.keys("room:*") == ["room:統計学入門".encode()]
+
+    async def test_other_process_reads_with_one_mget(self, patched_redis, mget_calls):
+        await _RoomCache().store({"a": "101", "b": "102", "c": "103"})
+
+        other = _RoomCache()
+        assert await other.lookup(["a", "b", "missing", "a", ""]) == {"a": "101", "b": "102"}
+        assert mget_calls == [["room:a", "room:b", "room:missing"]]
+
+    async def test_local_hits_skip_redis(self, patched_redis, mget_calls):
+        cache = _RoomCache()
+        await cache.store({"a": "101"})
+        assert await cache.lookup(["a"]) == {"a": "101"}
+        assert mget_calls == []
+
+        # values read from Redis are kept locally too
+        await patched_redis.set("room:b", "102")
+        await cache.lookup(["b"])
+        await cache.lookup(["a", "b"])
+        assert mget_calls == [["room:b"]]
+
+    async def test_local_entries_expire(self, patched_redis, clock):
+        cache, other = _RoomCache(local_ttl=300), _RoomCache()
+        await cache.store({"a": "101"})
+        await other.store({"a": "205"})  # room changed by another process
+
+        clock.now += 300
+        assert await cache.lookup(["a"]) == {"a": "101"}
+        clock.now += 1
+        assert await cache.lookup(["a"]) == {"a": "205"}
+
+    async def test_local_cache_is_lru_bounded(self, patched_redis, mget_calls):
+        cache = _RoomCache(maxsize=2)
+        await cache.store({"a": "101", "b": "102"})
+        await cache.lookup(["a"])  # a is now the most recently used
+        await cache.store({"c": "103"})
+
+        assert list(cache._local) == ["a", "c"]
+        assert await cache.lookup(["b"]) == {"b": "102"}
+        assert mget_calls == [["room:b"]]
+
+    async def test_works_in_process_without_redis(self, patched_redis, monkeypatch):
+        async def refused(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        def no_pipeline(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(patched_redis, "mget", refused)
+        monkeypatch.setattr(patched_redis, "pipeline", no_pipeline)
+        cache = _RoomCache()
+        await cache.store({"a": "101"})
+        assert await cache.lookup(["a", "b"]) == {"a": "101"}
+
+
+async def test_schedule_fetch_caches_rooms(make_gakuen, patched_redis):
+    api = make_gakuen()
+    await api.get_user_schedule_range(date.today() + timedelta(days=1), 1)
+    assert await _RoomCache().lookup(["統計学入門"]) == {"統計学入門": "2203教室"}
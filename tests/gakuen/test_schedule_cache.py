@@ -0,0 +1,222 @@
+"""
+Tests for the per-month schedule cache (GakuenAPI.month_range_by_month) and the
+per-day schedule cache (get_user_schedule_range / get_later_user_schedule).
+"""
+
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from tutnext.services.gakuen import client
+from tutnext.services.gakuen.client import load_cached_schedule_days
+from tutnext.services.gakuen.errors import GakuenAPIError
+from tutnext.services.schedule_ical import invalidate_ical_month
+
+
+def _next_month(year: int, month: int, offset: int) -> tuple[int, int]:
+    y, m = divmod(year * 12 + month - 1 + offset, 12)
+    return y, m + 1
+
+
+@pytest.fixture
+async def api(make_gakuen):
+    api = make_gakuen()
+    await api.login()
+    return api
+
+
+class TestMonthCache:
+    async def test_only_current_month_is_refetched(self, api, replay_session):
+        today = date.today()
+        first = await api.month_range_by_month(today.year, today.month, 3)
+        assert replay_session.pages("month_data.xml") == 3
+        assert list(first) == [
+            "%04d-%02d" % _next_month(today.year, today.month, i) for i in range(3)
+        ]
+
+        replay_session.requests.clear()
+        second = await api.month_range_by_month(today.year, today.month, 3)
+        assert replay_session.pages("month_data.xml") == 1
+        assert second == first
+
+    async def test_cached_events_keep_datetime_types(self, api):
+        today = date.today()
+        await api.month_range_by_month(today.year, today.month, 2)
+        cached = await api.month_range_by_month(today.year, today.month, 2)
+        events = [e for month in list(cached.values())[1:] for e in month]
+        assert events
+        for event in events:
+            assert isinstance(event["start"], (date, datetime))
+            assert event["allDay"] or isinstance(event["start"], datetime)
+
+    async def test_future_months_only_when_current_month_not_included(
+        self, api, replay_session
+    ):
+        today = date.today()
+        y, m = _next_month(today.year, today.month, 1)
+        await api.month_range_by_month(y, m, 2)
+        replay_session.requests.clear()
+        await api.month_range_by_month(y, m, 2)
+        assert replay_session.pages("month_data.xml") == 0
+
+    async def test_use_cache_false_refetches_every_month(self, api, replay_session):
+        today = date.today()
+        await api.month_range_by_month(today.year, today.month, 3)
+        replay_session.requests.clear()
+        await api.month_range_by_month(today.year, today.month, 3, use_cache=False)
+        assert replay_session.pages("month_data.xml") == 3
+
+    async def test_invalidated_month_is_refetched(self, api, replay_session, patched_redis):
+        today = date.today()
+        y, m = _next_month(today.year, today.month, 1)
+        await api.month_range_by_month(today.year, today.month, 3)
+        assert await patched_redis.exists(f"schedule:month:test0001:{y:04d}-{m:02d}")
+
+        await invalidate_ical_month("test0001", date(y, m, 15))
+        replay_session.requests.clear()
+        await api.month_range_by_month(today.year, today.month, 3)
+        # the current month plus the invalidated one
+        assert replay_session.pages("month_data.xml") == 2
+
+    async def test_month_range_flattens_in_month_order(self, api):
+        today = date.today()
+        by_month = await api.month_range_by_month(today.year, today.month, 2)
+        flat = await api.month_range(today.year, today.month, 2)
+        assert flat == [e for events in by_month.values() for e in events]
+
+
+@pytest.fixture
+def day_api(make_gakuen):
+    """A client that has not logged in yet (day lookups log in only when needed)."""
+    return make_gakuen()
+
+
+def _days(count: int, offset: int = 1) -> list[date]:
+    start = date.today() + timedelta(days=offset)
+    return [start + timedelta(days=i) for i in range(count)]
+
+
+def _plain_day() -> dict:
+    return {
+        "date_info": {"date": "2025/07/16", "day_of_week": "水"},
+        "all_day_events": [],
+        "time_table": [{"time": "09:00-10:30", "lesson_num": 1, "name": "a", "room": "r"}],
+    }
+
+
+class TestDayCache:
+    async def test_range_is_served_from_cache_without_login(self, day_api, replay_session):
+        days = _days(3)
+        first = await day_api.get_user_schedule_range(days[0], 3)
+        assert list(first) == days
+        assert replay_session.pages("schedule_day.xml") == 3
+
+        replay_session.requests.clear()
+        second = await day_api.get_user_schedule_range(days[0], 3)
+        assert second == first
+        assert replay_session.requests == []
+
+    async def test_only_missing_days_are_fetched(self, day_api, replay_session):
+        days = _days(3)
+        await day_api.get_user_schedule_range(days[1], 1)
+        replay_session.requests.clear()
+
+        result = await day_api.get_user_schedule_range(days[0], 3)
+        assert list(result) == days
+        assert replay_session.pages("schedule_day.xml") == 2
+
+    async def test_use_cache_false_fetches_every_day(self, day_api, replay_session):
+        days = _days(2)
+        await day_api.get_user_schedule_range(days[0], 2)
+        replay_session.requests.clear()
+        await day_api.get_user_schedule_range(days[0], 2, use_cache=False)
+        assert replay_session.pages("schedule_day.xml") == 2
+
+    async def test_single_day_shares_the_range_cache(self, day_api, replay_session):
+        tomorrow = _days(1)[0]
+        ranged = await day_api.get_user_schedule_range(tomorrow, 1)
+        replay_session.requests.clear()
+
+        cached = await day_api.get_later_user_schedule(target_date=tomorrow, use_cache=True)
+        assert cached == ranged[tomorrow]
+        assert replay_session.requests == []
+
+    async def test_single_day_fetch_updates_cache(self, day_api, replay_session):
+        tomorrow = _days(1)[0]
+        fetched = await day_api.get_later_user_schedule(target_date=tomorrow)
+        assert replay_session.pages("schedule_day.xml") == 1
+        assert await load_cached_schedule_days("test0001", [tomorrow]) == {tomorrow: fetched}
+
+        # use_cache defaults to False: the push sender always sees T-NEXT's current data
+        replay_session.requests.clear()
+        await day_api.get_later_user_schedule(target_date=tomorrow)
+        assert replay_session.pages("schedule_day.xml") == 1
+
+    async def test_failed_range_caches_nothing(self, day_api, patched_redis, monkeypatch):
+        fetch_day = day_api._fetch_schedule_day
+        calls = []
+
+        async def second_day_fails(target_date_str):
+            calls.append(target_date_str)
+            if len(calls) == 2:
+                return None, None
+            return await fetch_day(target_date_str)
+
+        monkeypatch.setattr(day_api, "_fetch_schedule_day", second_day_fails)
+        with pytest.raises(GakuenAPIError) as excinfo:
+            await day_api.get_user_schedule_range(_days(1)[0], 3)
+        assert excinfo.value.error_code == "USER_SCHEDULE_FETCH_ERROR"
+        assert len(calls) == 2
+        assert await patched_redis.keys("schedule:day:*") == []
+
+    async def test_load_skips_missing_days_and_tolerates_redis_errors(
+        self, day_api, patched_redis, monkeypatch
+    ):
+        days = _days(2)
+        await day_api.get_user_schedule_range(days[0], 1)
+        assert list(await load_cached_schedule_days("test0001", days)) == [days[0]]
+        assert await load_cached_schedule_days("other", days) == {}
+
+        async def refused(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(patched_redis, "mget", refused)
+        assert await load_cached_schedule_days("test0001", days) == {}
+
+
+class TestDayCacheTtl:
+    def test_tiers(self):
+        today = date.today()
+        plain = _plain_day()
+        assert client._schedule_day_ttl(today - timedelta(days=1), plain, False) == 86400
+        assert client._schedule_day_ttl(today, plain, False) == 1800
+        assert client._schedule_day_ttl(today + timedelta(days=1), plain, False) == 1800
+        assert client._schedule_day_ttl(today + timedelta(days=2), plain, False) == 21600
+
+    def test_changes_and_notices_shorten_ttl(self):
+        far = date.today() + timedelta(days=5)
+        plain = _plain_day()
+        cancelled = _plain_day()
+        cancelled["time_table"][0]["special_tags"] = ["休講"]
+        moved = _plain_day()
+        moved["time_table"][0]["previous_room"] = "old"
+
+        assert client._schedule_day_ttl(far, plain, True) == 900
+        assert client._schedule_day_ttl(far, cancelled, False) == 900
+        assert client._schedule_day_ttl(far, moved, False) == 900
+
+    async def test_store_shortens_ttl_when_day_changed(self, day_api, patched_redis):
+        far = date.today() + timedelta(days=5)
+        key = f"schedule:day:test0001:{far.isoformat()}"
+        await day_api._store_schedule_days({far: _plain_day()})
+        assert 900 < await patched_redis.ttl(key) <= 21600
+
+        await day_api._store_schedule_days({far: _plain_day()})
+        assert await patched_redis.ttl(key) > 900
+
+        changed = _plain_day()
+        changed["time_table"][0]["room"] = "other"
+        await day_api._store_schedule_days({far: changed})
+        assert await patched_redis.ttl(key) <= 900
+        assert json.loads(await patched_redis.get(key)) == changed
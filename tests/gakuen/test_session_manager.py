@@ -0,0 +1,183 @@
+"""
+Tests for Redis-persisted Gakuen session snapshots (tutnext.services.gakuen.session_manager).
+
+Each SessionManager instance stands in for one worker process; they share fakeredis.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from tutnext.services.gakuen.errors import GakuenBusyError, GakuenCircuitOpenError
+from tutnext.services.gakuen.session_manager import (
+    SNAPSHOT_KEY_PREFIX,
+    SessionManager,
+    credential_digest,
+)
+
+
+def _logins(session) -> int:
+    return sum(1 for method, name in session.requests if (method, name) == ("GET", "mobile_login.html"))
+
+
+@pytest.fixture
+def make_manager(make_gakuen):
+    def make() -> SessionManager:
+        manager = SessionManager()
+
+        def new_client(username, encrypted_password):
+            api = make_gakuen()
+            api.user_id = username
+            api.encrypted_login_password = encrypted_password
+            return api
+
+        manager._new_client = new_client  # type: ignore[method-assign]
+        return manager
+
+    return make
+
+
+async def _snapshot(redis, username="u"):
+    raw = await redis.get(f"{SNAPSHOT_KEY_PREFIX}{username}")
+    return json.loads(raw) if raw else None
+
+
+class TestSessionSnapshot:
+    async def test_login_saves_snapshot_with_credential_digest(
+        self, make_manager, replay_session, patched_redis
+    ):
+        async with make_manager().acquire("u", "pw") as gakuen:
+            tokens = dict(gakuen._state.rx_tokens)
+        assert _logins(replay_session) == 1
+
+        snapshot = await _snapshot(patched_redis)
+        assert snapshot["credential"] == credential_digest("pw")
+        assert snapshot["session"]["state"]["rx_tokens"] == tokens
+        assert "pw" not in json.dumps(snapshot["session"])
+        assert await patched_redis.ttl(f"{SNAPSHOT_KEY_PREFIX}u") > 0
+
+    async def test_other_process_restores_without_login(self, make_manager, replay_session):
+        async with make_manager().acquire("u", "pw"):
+            pass
+        replay_session.requests.clear()
+
+        async with make_manager().acquire("u", "pw") as gakuen:
+            await gakuen.get_user_kadai_summary(skip_login=True)
+        assert _logins(replay_session) == 0
+
+    async def test_different_credential_logs_in_again(
+        self, make_manager, replay_session, patched_redis
+    ):
+        async with make_manager().acquire("u", "pw"):
+            pass
+        replay_session.requests.clear()
+
+        async with make_manager().acquire("u", "other"):
+            pass
+        assert _logins(replay_session) == 1
+        assert (await _snapshot(patched_redis))["credential"] == credential_digest("other")
+
+    async def test_stale_in_memory_session_is_replaced_by_snapshot(
+        self, make_manager, patched_redis
+    ):
+        a, b = make_manager(), make_manager()
+        async with a.acquire("u", "pw") as first:
+            pass
+        async with b.acquire("u", "pw"):
+            pass  # rotates the tokens and writes a new snapshot version
+        newer = await _snapshot(patched_redis)
+
+        async with a.acquire("u", "pw") as restored:
+            assert restored is not first
+            assert restored._state.to_dict() == newer["session"]["state"]
+
+    async def test_same_process_reuses_session(self, make_manager, replay_session):
+        manager = make_manager()
+        async with manager.acquire("u", "pw") as first:
+            pass
+        async with manager.acquire("u", "pw") as second:
+            assert second is first
+        assert _logins(replay_session) == 1
+
+    async def test_failure_drops_snapshot(self, make_manager, patched_redis):
+        manager = make_manager()
+        async with manager.acquire("u", "pw"):
+            pass
+        with pytest.raises(RuntimeError):
+            async with manager.acquire("u", "pw"):
+                raise RuntimeError("session expired")
+        assert await _snapshot(patched_redis) is None
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            GakuenBusyError("busy", error_code="BUSY", status_code=503),
+            GakuenCircuitOpenError("open", error_code="CIRCUIT_OPEN"),
+        ],
+        ids=["busy", "circuit_open"],
+    )
+    async def test_rejected_before_sending_keeps_session(
+        self, make_manager, replay_session, patched_redis, error
+    ):
+        manager, other = make_manager(), make_manager()
+        async with manager.acquire("u", "pw"):
+            pass
+        with pytest.raises(type(error)):
+            async with manager.acquire("u", "pw"):
+                raise error
+        assert await _snapshot(patched_redis) is not None
+
+        async with manager.acquire("u", "pw"):
+            pass
+        async with other.acquire("u", "pw"):
+            pass
+        assert _logins(replay_session) == 1
+
+    async def test_invalidate_drops_snapshot(self, make_manager, replay_session, patched_redis):
+        manager = make_manager()
+        async with manager.acquire("u", "pw"):
+            pass
+        await manager.invalidate("u")
+        assert await _snapshot(patched_redis) is None
+        async with manager.acquire("u", "pw"):
+            pass
+        assert _logins(replay_session) == 2
+
+
+class TestSharedLock:
+    async def test_processes_use_a_session_one_at_a_time(self, make_manager):
+        a, b = make_manager(), make_manager()
+        events: list[str] = []
+        a_inside = asyncio.Event()
+        release_a = asyncio.Event()
+
+        async def use_a():
+            async with a.acquire("u", "pw"):
+                events.append("a enter")
+                a_inside.set()
+                await release_a.wait()
+                events.append("a exit")
+
+        async def use_b():
+            await a_inside.wait()
+            async with b.acquire("u", "pw"):
+                events.append("b enter")
+
+        task_a, task_b = asyncio.create_task(use_a()), asyncio.create_task(use_b())
+        await a_inside.wait()
+        await asyncio.sleep(0.3)  # b is waiting on the Redis lock
+        assert events == ["a enter"]
+        release_a.set()
+        await asyncio.gather(task_a, task_b)
+        assert events == ["a enter", "a exit", "b enter"]
+
+    async def test_different_users_do_not_wait(self, make_manager):
+        a, b = make_manager(), make_manager()
+        async with a.acquire("u1", "pw"):
+            await asyncio.wait_for(self._enter(b, "u2"), timeout=2)
+
+    @staticmethod
+    async def _enter(manager, username):
+        async with manager.acquire(username, "pw"):
+            pass
@@ -0,0 +1,95 @@
+"""
+Tests for DOM-free session token extraction (tutnext.services.gakuen.session.scan_tokens),
+checked against the BeautifulSoup extraction it replaced.
+"""
+
+import pytest
+from bs4 import BeautifulSoup
+
+from tutnext.services.gakuen.partial import read_content_and_tokens
+from tutnext.services.gakuen.session import _SessionState, scan_tokens
+
+HTML_FIXTURES = (
+    "mobile_login.html",
+    "mobile_home.html",
+    "kadai_list.html",
+    "kadai_detail_0.html",
+    "kadai_detail_4.html",
+    "web_home.html",
+)
+PARTIAL_FIXTURES = ("schedule_day.xml", "month_data.xml")
+
+
+def _from_soup(markup: str, parser: str = "lxml") -> tuple[dict, object]:
+    state = _SessionState()
+    state.update_from_soup(BeautifulSoup(markup, parser))
+    return state.rx_tokens, state.view_state
+
+
+def _from_markup(markup) -> tuple[dict, object]:
+    state = _SessionState()
+    state.update_from_markup(markup)
+    return state.rx_tokens, state.view_state
+
+
+class TestScanTokens:
+    @pytest.mark.parametrize("name", HTML_FIXTURES)
+    @pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+    def test_matches_soup_on_recorded_pages(self, gakuen_fixture, name, parser):
+        page = gakuen_fixture(name)
+        assert _from_markup(page) == _from_soup(page, parser)
+
+    @pytest.mark.parametrize("name", HTML_FIXTURES)
+    def test_bytes_and_str_agree(self, gakuen_fixture, name):
+        page = gakuen_fixture(name)
+        assert scan_tokens(page.encode("utf-8")) == scan_tokens(page)
+
+    @pytest.mark.parametrize("name", PARTIAL_FIXTURES)
+    def test_matches_soup_on_partial_token_payload(self, gakuen_fixture, name):
+        _, payload = read_content_and_tokens(gakuen_fixture(name), "")
+        assert payload is not None
+        tokens = _from_markup(payload)
+        assert len(tokens[0]) == 4
+        assert tokens == _from_soup(payload)
+
+    def test_logged_in_pages_carry_all_tokens(self, gakuen_fixture):
+        rx_tokens, view_state = scan_tokens(gakuen_fixture("kadai_list.html"))
+        assert set(rx_tokens) == {"token", "loginKey", "deviceKbn", "loginType"}
+        assert view_state
+
+    def test_attribute_order_quotes_and_entities(self):
+        markup = (
+            "<input value='a&amp;b' type='hidden' name='rx-token'>"
+            '<input type="hidden" value="-1:2" id="j_id1:javax.faces.ViewState:0"'
+            ' name = "javax.faces.ViewState" />'
+        )
+        assert scan_tokens(markup) == ({"token": "a&b"}, "-1:2")
+        assert _from_markup(markup) == _from_soup(markup)
+
+    def test_ignores_names_outside_input_tags(self):
+        markup = (
+            "<script>var f = '<x name=\"rx-token\" value=\"fake\">';</script>"
+            '<meta name="rx-loginKey" value="fake">'
+            '<input name="rx-token" value="real">'
+        )
+        assert scan_tokens(markup) == ({"token": "real"}, None)
+
+    def test_data_value_attribute_is_not_the_value(self):
+        markup = '<input data-value="wrong" name="rx-token" value="right">'
+        assert scan_tokens(markup) == ({"token": "right"}, None)
+
+    def test_last_occurrence_wins(self):
+        markup = '<input name="rx-token" value="first"><input name="rx-token" value="second">'
+        assert scan_tokens(markup)[0] == {"token": "second"}
+        assert _from_markup(markup) == _from_soup(markup)
+
+
+class TestUpdateFromMarkup:
+    def test_keeps_tokens_missing_from_response(self):
+        state = _SessionState()
+        state.load_dict(
+            {"rx_tokens": {"token": "t0", "loginKey": "k0"}, "view_state": "vs0"}
+        )
+        state.update_from_markup('<input name="rx-token" value="t1">')
+        assert state.rx_tokens == {"token": "t1", "loginKey": "k0"}
+        assert state.view_state == "vs0"
@@ -0,0 +1,63 @@
+"""
+Tests for the parse executor (tutnext.core.executor) in its default process-pool mode.
+
+The rest of the suite parses inline (PARSE_EXECUTOR=inline in conftest.py).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from tests.gakuen.replay import load_fixture
+from tutnext import config
+from tutnext.core import executor
+from tutnext.services.gakuen.parsers import parse_schedule_content
+from tutnext.services.gakuen.partial import read_content_and_tokens
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setattr(config, "PARSE_EXECUTOR", "process")
+    monkeypatch.setattr(config, "PARSE_WORKERS", 1)
+    monkeypatch.setattr(executor, "_executor", None)
+    yield
+    executor.shutdown_parse_executor()
+
+
+def _schedule_markup() -> str:
+    content, _ = read_content_and_tokens(
+        load_fixture("schedule_day.xml"), "pmPage:funcForm:mainContent"
+    )
+    assert content is not None
+    return content
+
+
+async def test_parses_in_a_worker_process(process_pool):
+    assert await executor.run_parse(os.getpid) != os.getpid()
+    assert isinstance(executor.get_parse_executor(), ProcessPoolExecutor)
+
+
+async def test_process_result_matches_inline(process_pool):
+    markup = _schedule_markup()
+    result = await executor.run_parse(parse_schedule_content, markup, "lxml")
+    assert result == parse_schedule_content(markup, "lxml")
+    assert result["time_table"]
+
+
+async def test_broken_pool_is_rebuilt(process_pool):
+    pool = executor.get_parse_executor()
+    assert pool is not None
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result(timeout=30)
+
+    # this call falls back to parsing inline and drops the broken pool
+    markup = _schedule_markup()
+    assert await executor.run_parse(parse_schedule_content, markup, "lxml") == (
+        parse_schedule_content(markup, "lxml")
+    )
+    assert executor._executor is None
+
+    assert await executor.run_parse(os.getpid) != os.getpid()
+    assert executor.get_parse_executor() is not pool
@@ -0,0 +1,80 @@
+"""
+Tests for the per-user Google Classroom assignment cache
+(GoogleClassroomAPI.get_cached_user_assignments).
+"""
+
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from tutnext import config
+from tutnext.services.google_classroom import GoogleClassroomAPI
+
+ASSIGNMENTS = [{"title": "Essay", "from": "English", "deadline": "2026-10-20T23:59:00"}]
+
+
+@pytest.fixture
+def classroom(patched_redis, monkeypatch):
+    """A client whose Google fetch returns ``fetch.result`` and counts calls."""
+    api = GoogleClassroomAPI()
+    fetch = AsyncMock(return_value=ASSIGNMENTS)
+    monkeypatch.setattr(api, "_fetch_user_assignments", fetch)
+    api.fetch = fetch  # type: ignore[attr-defined]
+    return api
+
+
+def _key(username: str) -> str:
+    return f"{GoogleClassroomAPI.CACHE_KEY_PREFIX}{username}"
+
+
+class TestCachedAssignments:
+    async def test_second_call_is_served_from_cache(self, classroom, patched_redis):
+        assert await classroom.get_cached_user_assignments("u") == ASSIGNMENTS
+        assert await classroom.get_cached_user_assignments("u") == ASSIGNMENTS
+        assert classroom.fetch.await_count == 1
+        assert 0 < await patched_redis.ttl(_key("u")) <= config.CLASSROOM_CACHE_TTL
+
+    async def test_cache_is_per_user(self, classroom, patched_redis):
+        await classroom.get_cached_user_assignments("u")
+        classroom.fetch.return_value = []
+        assert await classroom.get_cached_user_assignments("other") == []
+        assert classroom.fetch.await_count == 2
+        assert json.loads(await patched_redis.get(_key("u"))) == ASSIGNMENTS
+
+    async def test_empty_list_is_cached(self, classroom):
+        classroom.fetch.return_value = []
+        assert await classroom.get_cached_user_assignments("u") == []
+        assert await classroom.get_cached_user_assignments("u") == []
+        assert classroom.fetch.await_count == 1
+
+    async def test_failure_returns_none_and_is_not_cached(self, classroom, patched_redis):
+        classroom.fetch.return_value = None
+        assert await classroom.get_cached_user_assignments("u") is None
+        assert not await patched_redis.exists(_key("u"))
+
+        classroom.fetch.return_value = ASSIGNMENTS
+        assert await classroom.get_cached_user_assignments("u") == ASSIGNMENTS
+        assert classroom.fetch.await_count == 2
+
+    async def test_invalidate_forces_refetch(self, classroom):
+        await classroom.get_cached_user_assignments("u")
+        await classroom.invalidate_assignments_cache("u")
+        await classroom.get_cached_user_assignments("u")
+        assert classroom.fetch.await_count == 2
+
+    async def test_fetches_without_redis(self, classroom, patched_redis, monkeypatch):
+        async def refused(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(patched_redis, "get", refused)
+        monkeypatch.setattr(patched_redis, "set", refused)
+        assert await classroom.get_cached_user_assignments("u") == ASSIGNMENTS
+
+
+async def test_missing_token_is_a_failure(patched_redis, monkeypatch):
+    api = GoogleClassroomAPI()
+    api.client_id = "client-id"
+    monkeypatch.setattr(api, "_get_valid_access_token", AsyncMock(return_value=None))
+    assert await api.get_cached_user_assignments("u") is None
+    assert not await patched_redis.exists(_key("u"))
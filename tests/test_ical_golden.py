@@ -0,0 +1,207 @@
+"""
+Golden-output tests for the iCal template writer (tutnext.services.schedule_ical).
+
+The template output must stay byte-for-byte identical (apart from DTSTAMP) to
+what the previous icalendar-object implementation produced, including
+escaping, 75-octet folding across multi-byte characters and escapes, TZID
+handling and all-day events.
+"""
+
+import random
+import re
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from icalendar import Alarm, Calendar, Event
+
+from tutnext.services.schedule_ical import (
+    assemble_calendar,
+    build_course_events,
+    build_kadai_events,
+    iter_course_events,
+    iter_kadai_events,
+)
+
+JST = timezone(timedelta(hours=9))  # month_data の %z と同じ固定オフセット
+_DTSTAMP_RE = re.compile(rb"DTSTAMP:[^\r]*\r\n")
+
+
+# ── 以前の実装（icalendar オブジェクト） ──────────────────────────────────────────
+def reference_ical(course_list: list[dict], katai_list: list[dict]) -> bytes:
+    cal = Calendar()
+    cal.add("prodid", "-//Ukenn//TamaSchedule//")
+    cal.add("version", "2.0")
+    cal.add("name", "多摩大スケジュール")
+    cal.add("x-wr-calname", "多摩大スケジュール")
+    cal.add("x-wr-timezone", "Etc/GMT")
+    for course in course_list:
+        event = Event()
+        if not course["title"]:
+            continue
+        event.add("summary", course["title"])
+        event.add("dtstart", course["start"])
+        event.add("dtend", course["end"])
+        event.add("dtstamp", datetime.now())
+        alarm1 = Alarm()
+        alarm1.add("action", "DISPLAY")
+        t = course["start"] - timedelta(days=1)
+        alarm1.add(
+            "trigger",
+            datetime(t.year, t.month, t.day, 12, 0, 0, tzinfo=timezone.utc),
+        )
+        event.add_component(alarm1)
+        if not course["allDay"] and "room" in course:
+            event.add("location", course["room"])
+            event.add("description", course["teacher"])
+            alarm2 = Alarm()
+            alarm2.add("action", "AUDIO")
+            alarm2.add("trigger", timedelta(minutes=-10))
+            event.add_component(alarm2)
+        cal.add_component(event)
+    for katai in katai_list:
+        event = Event()
+        event.add("summary", "未完成の課題!!!" + katai["title"])
+        event.add("dtstart", katai["deadline"] - timedelta(minutes=30))
+        event.add("dtend", katai["deadline"])
+        event.add("dtstamp", datetime.now())
+        event.add("location", katai["from"])
+        event.add("description", katai["date"] + " からの課題")
+        alarm = Alarm()
+        alarm.add("action", "AUDIO")
+        alarm.add("trigger", timedelta(minutes=-20))
+        event.add_component(alarm)
+        cal.add_component(event)
+    return cal.to_ical()
+
+
+def template_ical(course_list: list[dict], katai_list: list[dict]) -> bytes:
+    return assemble_calendar([build_course_events(course_list), build_kadai_events(katai_list)])
+
+
+# ── テストデータ ────────────────────────────────────────────────────────────────
+_PERIOD_STARTS = ((9, 0), (10, 40), (13, 0), (14, 40), (16, 20))
+_TITLES = (
+    "データサイエンス入門",
+    "経営情報論Ⅱ",
+    "English Communication Ⅰ",
+    "ゼミナール（3年）",
+    "情報処理演習A,B;C",
+)
+
+
+def make_courses(year: int, month: int, rng: random.Random) -> list[dict]:
+    """month_data と同じ形の授業データ（平日 3〜5 コマ + 終日イベント）"""
+    courses: list[dict] = []
+    day = date(year, month, 1)
+    while day.month == month:
+        if day.weekday() < 5:
+            for hour, minute in rng.sample(_PERIOD_STARTS, rng.randint(3, 5)):
+                start = datetime(day.year, day.month, day.day, hour, minute, tzinfo=JST)
+                title = rng.choice(_TITLES)
+                course = {"title": title, "start": start, "end": start + timedelta(minutes=90), "allDay": False}
+                if rng.random() < 0.9:
+                    course["room"] = f"{rng.choice('ABCT')}{rng.randint(101, 420)}"
+                    course["teacher"] = rng.choice(("山田 太郎", "Smith John", "佐藤 花子, 鈴木 一郎"))
+                courses.append(course)
+        if day.day in (10, 20):
+            courses.append({"title": "休講日", "start": day, "end": day + timedelta(days=1), "allDay": True})
+        day += timedelta(days=1)
+    return courses
+
+
+def make_kadai(rng: random.Random, count: int = 8) -> list[dict]:
+    today = date.today()
+    return [
+        {
+            "task": "課題",
+            "date": f"{today:%Y/%m/%d}",
+            "title": rng.choice(("第3回レポート", "小テスト（第5回）", "Final report: 2,000 words; APA")),
+            "from": rng.choice(_TITLES),
+            "deadline": datetime(today.year, today.month, today.day, 23, 59) + timedelta(days=i),
+        }
+        for i in range(count)
+    ]
+
+
+def edge_cases() -> tuple[list[dict], list[dict]]:
+    """エスケープ・折り返し（マルチバイト / 境界の \\）・TZID の境界ケース"""
+    start = datetime(2026, 10, 5, 9, 0, tzinfo=JST)
+    titles = [
+        "a" * 64,
+        "a" * 65,
+        "a" * 66,
+        "b" * 63 + ",",
+        "c" * 64 + "\\",
+        "改行\nあり\r\nCR\rのみ",
+        "\\N と \\ と ;,",
+        "長い日本語の授業名" * 12,
+        "x" * 200 + "あ" * 40,
+        "末尾がエスケープ" + "y" * 51 + ";z",
+    ]
+    # 折り返し位置にエスケープ・マルチバイト文字が来る組み合わせを網羅的に試す
+    rng = random.Random(2)
+    titles += ["".join(rng.choices("ab\\;,^\nあ𠮷 ", k=rng.randint(60, 160))) for _ in range(300)]
+    courses = [
+        {
+            "title": title,
+            "start": start + timedelta(days=i),
+            "end": start + timedelta(days=i, minutes=90),
+            "allDay": False,
+            "room": "教室" * (i + 1),
+            "teacher": title[::-1],
+        }
+        for i, title in enumerate(titles)
+    ]
+    courses += [
+        {"title": "UTC の授業", "start": datetime(2026, 10, 1, 0, tzinfo=timezone.utc),
+         "end": datetime(2026, 10, 1, 1, tzinfo=timezone.utc), "allDay": False},
+        {"title": "", "start": date(2026, 10, 2), "end": date(2026, 10, 3), "allDay": True},
+        {"title": "月初の終日", "start": date(2026, 11, 1), "end": date(2026, 11, 1), "allDay": True},
+    ]
+    katai = [
+        {"task": "課題", "date": "2026/10/01", "title": title, "from": title[:20], "deadline": datetime(2026, 10, 30, 23, 59)}
+        for title in titles
+    ]
+    return courses, katai
+
+
+def _months(months: int) -> tuple[list[dict], list[dict]]:
+    rng = random.Random(0)
+    today = date.today()
+    courses: list[dict] = []
+    for offset in range(months):
+        y, m = divmod(today.year * 12 + today.month - 1 + offset, 12)
+        courses += make_courses(y, m + 1, rng)
+    return courses, make_kadai(rng)
+
+
+DATASETS = {
+    "edge cases": edge_cases,
+    "empty": lambda: ([], []),
+    "2 months": lambda: _months(2),
+    "6 months": lambda: _months(6),
+}
+
+
+@pytest.mark.parametrize("name", DATASETS)
+def test_template_matches_icalendar(name):
+    course_list, katai_list = DATASETS[name]()
+    expected = _DTSTAMP_RE.sub(b"", reference_ical(course_list, katai_list))
+    actual = _DTSTAMP_RE.sub(b"", template_ical(course_list, katai_list))
+    # 行単位で比較すると不一致箇所が読みやすい
+    assert actual.split(b"\r\n") == expected.split(b"\r\n")
+
+
+def test_every_event_has_dtstamp():
+    course_list, katai_list = edge_cases()
+    content = template_ical(course_list, katai_list)
+    assert len(_DTSTAMP_RE.findall(content)) == content.count(b"BEGIN:VEVENT\r\n")
+
+
+def test_iter_events_match_blocks():
+    course_list, katai_list = edge_cases()
+    for events, block in (
+        (iter_course_events(course_list), build_course_events(course_list)),
+        (iter_kadai_events(katai_list), build_kadai_events(katai_list)),
+    ):
+        assert _DTSTAMP_RE.sub(b"", "".join(events).encode()) == _DTSTAMP_RE.sub(b"", block)
@@ -0,0 +1,250 @@
+"""
+Tests for the /kadai snapshot (tutnext.services.kadai_snapshot) and how
+POST /kadai serves it.
+"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from tutnext.api.routes import kadai as kadai_route
+from tutnext.services import kadai_snapshot as ks
+
+
+@pytest.fixture
+def fetch_calls(monkeypatch):
+    """Replace the authenticated T-NEXT fetch; records (username, password)."""
+    calls = []
+
+    async def fake_fetch(username, encrypted_password):
+        calls.append((username, encrypted_password))
+        data = [{"title": f"fetched {len(calls)}"}]
+        await ks.store_kadai_snapshot(username, data, "api", encrypted_password)
+        return data
+
+    monkeypatch.setattr(kadai_route, "_fetch_kadai", fake_fetch)
+    return calls
+
+
+@pytest.fixture
+async def client(patched_redis):
+    app = FastAPI()
+    app.include_router(kadai_route.router, prefix="/kadai")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def _age_snapshot(redis, username, seconds):
+    raw = json.loads(await redis.get(f"kadai:snapshot:{username}"))
+    raw["fetched_at"] -= seconds
+    await redis.set(f"kadai:snapshot:{username}", json.dumps(raw))
+
+
+class TestKadaiSnapshot:
+    async def test_version_bumps_only_on_change(self, patched_redis):
+        s1 = await ks.store_kadai_snapshot("u", [{"title": "a"}], "monitor", "pw")
+        s2 = await ks.store_kadai_snapshot("u", [{"title": "a"}], "api", "pw")
+        s3 = await ks.store_kadai_snapshot("u", [{"title": "b"}], "monitor", "pw")
+        assert (s1.version, s2.version, s3.version) == (1, 1, 2)
+        loaded = await ks.load_kadai_snapshot("u")
+        assert loaded.version == 2
+        assert loaded.data == [{"title": "b"}]
+
+    async def test_concurrent_stores_bump_version_once_per_change(self, patched_redis):
+        await ks.store_kadai_snapshot("u", [{"title": "a"}], "monitor", "pw")
+        results = await asyncio.gather(
+            ks.store_kadai_snapshot("u", [{"title": "b"}], "monitor", "pw"),
+            ks.store_kadai_snapshot("u", [{"title": "b"}], "api", "pw"),
+        )
+        assert sorted(s.version for s in results) == [2, 2]
+        assert (await ks.load_kadai_snapshot("u")).version == 2
+
+    async def test_empty_list_round_trips(self, patched_redis):
+        await ks.store_kadai_snapshot("u", [], "monitor", "pw")
+        raw = json.loads(await patched_redis.get("kadai:snapshot:u"))
+        assert raw["data"] == []
+        assert raw["version"] == 1
+
+    async def test_touch_does_not_overwrite_concurrent_store(self, patched_redis, monkeypatch):
+        await ks.store_kadai_snapshot("u", [{"title": "old"}], "api", "pw")
+        original_get = patched_redis.get
+
+        async def get_then_store(key):
+            raw = await original_get(key)
+            # the API writes new kadai right after the monitor read the snapshot
+            monkeypatch.setattr(patched_redis, "get", original_get)
+            await ks.store_kadai_snapshot("u", [{"title": "new"}], "api", "pw")
+            return raw
+
+        monkeypatch.setattr(patched_redis, "get", get_then_store)
+        await ks.touch_kadai_snapshot("u", "monitor", "pw")
+
+        snapshot = await ks.load_kadai_snapshot("u")
+        assert snapshot.data == [{"title": "new"}]
+        assert snapshot.version == 2
+        assert snapshot.source == "api"
+
+    async def test_credential_digest_not_plaintext(self, patched_redis):
+        await ks.store_kadai_snapshot("u", [], "monitor", "secret-password")
+        raw = await patched_redis.get("kadai:snapshot:u")
+        assert b"secret-password" not in raw
+        snapshot = await ks.load_kadai_snapshot("u")
+        assert snapshot.matches("secret-password")
+        assert not snapshot.matches("other")
+
+    async def test_touch_requires_matching_credential(self, patched_redis):
+        await ks.store_kadai_snapshot("u", [], "api", "pw")
+        await _age_snapshot(patched_redis, "u", 600)
+
+        await ks.touch_kadai_snapshot("u", "monitor", "other")
+        assert (await ks.load_kadai_snapshot("u")).age >= 600
+
+        await ks.touch_kadai_snapshot("u", "monitor", "pw")
+        snapshot = await ks.load_kadai_snapshot("u")
+        assert snapshot.age < 5
+        assert snapshot.source == "monitor"
+
+    async def test_legacy_snapshot_without_credential_never_matches(self, patched_redis):
+        await patched_redis.set(
+            "kadai:snapshot:u",
+            json.dumps({"version": 1, "fetched_at": 0.0, "source": "api", "hash": "", "data": []}),
+        )
+        snapshot = await ks.load_kadai_snapshot("u")
+        assert snapshot is not None
+        assert not snapshot.matches("")
+
+
+class TestGetKadai:
+    async def test_fresh_snapshot_served_without_fetch(self, client, fetch_calls):
+        await ks.store_kadai_snapshot("u", [{"title": "cached"}], "monitor", "pw")
+        res = await client.post("/kadai", json={"username": "u", "encryptedPassword": "pw"})
+        assert res.json() == {"status": True, "data": [{"title": "cached"}]}
+        assert fetch_calls == []
+
+    async def test_wrong_password_is_not_served_snapshot(self, client, fetch_calls):
+        await ks.store_kadai_snapshot("u", [{"title": "cached"}], "monitor", "pw")
+        res = await client.post("/kadai", json={"username": "u", "encryptedPassword": "wrong"})
+        assert res.json() == {"status": True, "data": [{"title": "fetched 1"}]}
+        assert fetch_calls == [("u", "wrong")]
+
+    async def test_stale_snapshot_served_and_refreshed(self, client, fetch_calls, patched_redis):
+        await ks.store_kadai_snapshot("u", [{"title": "cached"}], "monitor", "pw")
+        await _age_snapshot(patched_redis, "u", 600)
+
+        res = await client.post("/kadai", json={"username": "u", "encryptedPassword": "pw"})
+        assert res.json()["data"] == [{"title": "cached"}]
+        await asyncio.gather(*kadai_route._kadai_refresh_tasks.values())
+        assert fetch_calls == [("u", "pw")]
+        assert (await ks.load_kadai_snapshot("u")).data == [{"title": "fetched 1"}]
+
+    async def test_stale_snapshot_wrong_password_no_background_refresh(
+        self, client, fetch_calls, patched_redis
+    ):
+        await ks.store_kadai_snapshot("u", [{"title": "cached"}], "monitor", "pw")
+        await _age_snapshot(patched_redis, "u", 600)
+
+        res = await client.post("/kadai", json={"username": "u", "encryptedPassword": "wrong"})
+        assert res.json()["data"] == [{"title": "fetched 1"}]
+        assert kadai_route._kadai_refresh_tasks == {}
+        assert fetch_calls == [("u", "wrong")]
+
+    async def test_expired_snapshot_fetches(self, client, fetch_calls, patched_redis):
+        await ks.store_kadai_snapshot("u", [{"title": "cached"}], "monitor", "pw")
+        await _age_snapshot(patched_redis, "u", 99999)
+
+        res = await client.post("/kadai", json={"username": "u", "encryptedPassword": "pw"})
+        assert res.json()["data"] == [{"title": "fetched 1"}]
+        assert fetch_calls == [("u", "pw")]
+
+
+class FakeGakuen:
+    def __init__(self, result):
+        self.result = result
+
+    async def get_user_kadai(self, **kwargs):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeSessionManager:
+    def __init__(self, gakuen):
+        self.gakuen = gakuen
+
+    @asynccontextmanager
+    async def acquire(self, username, encrypted_password):
+        yield self.gakuen
+
+    async def invalidate(self, username):
+        pass
+
+
+class TestFetchKadaiWithClassroom:
+    """POST /kadai merging T-NEXT and Google Classroom (the real _fetch_kadai)."""
+
+    @pytest.fixture
+    def sources(self, monkeypatch):
+        gakuen = FakeGakuen([{"title": "school"}])
+        classroom = AsyncMock(return_value=[{"title": "classroom"}])
+        monkeypatch.setattr(kadai_route, "get_session_manager", lambda: FakeSessionManager(gakuen))
+        monkeypatch.setattr(kadai_route.db_manager, "get_user_tokens", AsyncMock(return_value={"a": 1}))
+        monkeypatch.setattr(kadai_route.classroom_api, "get_cached_user_assignments", classroom)
+        return gakuen, classroom
+
+    async def _post(self, client, password="pw"):
+        res = await client.post("/kadai", json={"username": "u", "encryptedPassword": password})
+        return res.json()["data"]
+
+    async def test_merged_list_is_snapshotted(self, client, sources):
+        assert await self._post(client) == [{"title": "school"}, {"title": "classroom"}]
+        snapshot = await ks.load_kadai_snapshot("u")
+        assert snapshot.data == [{"title": "school"}, {"title": "classroom"}]
+        assert snapshot.matches("pw")
+
+    async def test_classroom_failure_is_not_snapshotted(self, client, sources):
+        _, classroom = sources
+        classroom.return_value = None
+        assert await self._post(client) == [{"title": "school"}]
+        assert await ks.load_kadai_snapshot("u") is None
+
+    async def test_school_failure_is_not_snapshotted(self, client, sources):
+        gakuen, _ = sources
+        gakuen.result = RuntimeError("t-next down")
+        assert await self._post(client) == [{"title": "classroom"}]
+        assert await ks.load_kadai_snapshot("u") is None
+
+    async def test_classroom_failure_keeps_previous_snapshot(
+        self, client, sources, patched_redis
+    ):
+        await ks.store_kadai_snapshot("u", [{"title": "old"}], "monitor", "pw")
+        await _age_snapshot(patched_redis, "u", 99999)
+        _, classroom = sources
+        classroom.return_value = None
+
+        assert await self._post(client) == [{"title": "school"}]
+        assert (await ks.load_kadai_snapshot("u")).data == [{"title": "old"}]
+
+    async def test_classroom_runs_alongside_the_session(self, client, sources, monkeypatch):
+        gakuen, _ = sources
+        school_started = asyncio.Event()
+        classroom_started = asyncio.Event()
+
+        async def get_user_kadai(**kwargs):
+            school_started.set()
+            await asyncio.wait_for(classroom_started.wait(), 1)
+            return [{"title": "school"}]
+
+        async def classroom_fetch(username):
+            classroom_started.set()
+            await asyncio.wait_for(school_started.wait(), 1)
+            return []
+
+        monkeypatch.setattr(gakuen, "get_user_kadai", get_user_kadai)
+        monkeypatch.setattr(kadai_route.classroom_api, "get_cached_user_assignments", classroom_fetch)
+        assert await self._post(client) == [{"title": "school"}]
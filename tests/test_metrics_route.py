@@ -0,0 +1,45 @@
+"""
+Tests for GET /metrics access control (tutnext.api.routes.metrics).
+"""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from tutnext.api.routes import metrics as metrics_route
+
+
+@pytest.fixture
+async def client():
+    app = FastAPI()
+    app.include_router(metrics_route.router, prefix="/metrics")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def test_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", None)
+    res = await client.get("/metrics", headers={"Authorization": "Bearer anything"})
+    assert res.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "authorization",
+    [None, "Bearer wrong", "Basic c2VjcmV0", "secret", "Bearer", "Bearer s\xe9cret".encode("latin-1")],
+)
+async def test_rejects_missing_or_wrong_token(client, monkeypatch, authorization):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "secret")
+    headers = {"Authorization": authorization} if authorization else {}
+    res = await client.get("/metrics", headers=headers)
+    assert res.status_code == 401
+    assert res.headers["www-authenticate"] == "Bearer"
+    assert "gakuen_" not in res.text
+
+
+async def test_serves_metrics_with_token(client, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "secret")
+    res = await client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert res.text == metrics_route.gakuen_metrics.render()
@@ -0,0 +1,153 @@
+"""
+Tests for MonitorService.check_single_user (tutnext.services.push.monitor):
+concurrency slots, retries and the /kadai snapshot it writes.
+"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+import pytest
+
+from tutnext.services import kadai_snapshot as ks
+from tutnext.services.gakuen.errors import GakuenNetworkError
+from tutnext.services.gakuen.retry import RetryPolicy
+from tutnext.services.push import monitor as monitor_module
+from tutnext.services.push.monitor import MonitorService
+
+
+class FakeSessionManager:
+    def __init__(self) -> None:
+        self.invalidated: list[str] = []
+
+    @asynccontextmanager
+    async def acquire(self, username, encrypted_password):
+        yield object()
+
+    async def invalidate(self, username):
+        self.invalidated.append(username)
+
+
+@pytest.fixture
+def monitor(patched_redis, monkeypatch):
+    monkeypatch.setattr(monitor_module, "get_session_manager", lambda: FakeSessionManager())
+    monkeypatch.setattr(monitor_module.db_manager, "get_user_tokens", AsyncMock(return_value=None))
+    monkeypatch.setattr(
+        monitor_module,
+        "BACKGROUND_POLICY",
+        RetryPolicy(max_attempts=2, base_delay=0.2, max_delay=0.2, jitter=0),
+    )
+    return MonitorService(AsyncMock())
+
+
+class TestConcurrencySlots:
+    async def test_backoff_does_not_hold_a_slot(self, monitor, monkeypatch):
+        monitor.semaphore = asyncio.Semaphore(1)
+        events: list[str] = []
+        attempts = {"a": 0, "b": 0}
+
+        async def fetch_gakuen_kadai(gakuen, username, encrypted_password):
+            attempts[username] += 1
+            events.append(f"{username}{attempts[username]}")
+            if username == "a" and attempts["a"] == 1:
+                raise GakuenNetworkError("timeout", error_code="TIMEOUT")
+            return [], 0
+
+        monkeypatch.setattr(monitor, "fetch_gakuen_kadai", fetch_gakuen_kadai)
+
+        async def second_user():
+            await asyncio.sleep(0.05)  # while "a" is waiting to retry
+            await monitor.check_single_user("b", "pw", "token-b")
+
+        await asyncio.gather(monitor.check_single_user("a", "pw", "token-a"), second_user())
+        assert events == ["a1", "b1", "a2"]
+
+    async def test_slots_still_bound_concurrent_fetches(self, monitor, monkeypatch):
+        monitor.semaphore = asyncio.Semaphore(2)
+        running = peak = 0
+
+        async def fetch_gakuen_kadai(gakuen, username, encrypted_password):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            return [], 0
+
+        monkeypatch.setattr(monitor, "fetch_gakuen_kadai", fetch_gakuen_kadai)
+        await asyncio.gather(
+            *(monitor.check_single_user(f"u{i}", "pw", "t") for i in range(5))
+        )
+        assert peak == 2
+
+
+class TestClassroomSnapshot:
+    @pytest.fixture
+    def classroom(self, monitor, monkeypatch):
+        monkeypatch.setattr(
+            monitor_module.db_manager, "get_user_tokens", AsyncMock(return_value={"a": 1})
+        )
+        fetch = AsyncMock(return_value=[{"title": "classroom"}])
+        monkeypatch.setattr(monitor_module.classroom_api, "get_cached_user_assignments", fetch)
+        return fetch
+
+    @pytest.fixture
+    def school(self, monitor, monkeypatch):
+        result = {"value": ([{"title": "school"}], 1)}
+
+        async def fetch_gakuen_kadai(gakuen, username, encrypted_password):
+            return result["value"]
+
+        monkeypatch.setattr(monitor, "fetch_gakuen_kadai", fetch_gakuen_kadai)
+        return result
+
+    async def test_merged_list_is_snapshotted(self, monitor, classroom, school, patched_redis):
+        await monitor.check_single_user("u", "pw", "token")
+        snapshot = await ks.load_kadai_snapshot("u")
+        assert snapshot.data == [{"title": "school"}, {"title": "classroom"}]
+        assert snapshot.source == "monitor"
+        assert await patched_redis.get("kadai_count:u") in ("2", b"2")
+
+    async def test_classroom_failure_is_not_snapshotted(
+        self, monitor, classroom, school, patched_redis
+    ):
+        classroom.return_value = None
+        await monitor.check_single_user("u", "pw", "token")
+        assert await ks.load_kadai_snapshot("u") is None
+        # the count still follows the school system alone
+        assert await patched_redis.get("kadai_count:u") in ("1", b"1")
+
+    async def test_classroom_failure_keeps_previous_snapshot(self, monitor, classroom, school):
+        await ks.store_kadai_snapshot("u", [{"title": "old"}], "api", "pw")
+        classroom.return_value = None
+        await monitor.check_single_user("u", "pw", "token")
+        snapshot = await ks.load_kadai_snapshot("u")
+        assert (snapshot.data, snapshot.source) == ([{"title": "old"}], "api")
+
+    async def test_unchanged_school_list_with_classroom_is_not_touched(
+        self, monitor, classroom, school
+    ):
+        await ks.store_kadai_snapshot("u", [{"title": "old"}], "api", "pw")
+        before = await ks.load_kadai_snapshot("u")
+        school["value"] = (None, 1)  # summary unchanged: no full list
+        await monitor.check_single_user("u", "pw", "token")
+        after = await ks.load_kadai_snapshot("u")
+        assert (after.data, after.source, after.fetched_at) == (
+            before.data,
+            before.source,
+            before.fetched_at,
+        )
+
+    async def test_unchanged_school_list_without_classroom_is_touched(
+        self, monitor, school, patched_redis
+    ):
+        await ks.store_kadai_snapshot("u", [{"title": "old"}], "api", "pw")
+        raw = json.loads(await patched_redis.get("kadai:snapshot:u"))
+        raw["fetched_at"] -= 600
+        await patched_redis.set("kadai:snapshot:u", json.dumps(raw))
+        school["value"] = (None, 1)
+        await monitor.check_single_user("u", "pw", "token")
+        snapshot = await ks.load_kadai_snapshot("u")
+        assert snapshot.data == [{"title": "old"}]
+        assert snapshot.age < 60
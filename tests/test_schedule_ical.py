@@ -0,0 +1,205 @@
+"""
+Tests for the cached GET /schedule iCal feed (tutnext.services.schedule_ical).
+"""
+
+import asyncio
+import random
+from datetime import date
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from tests.test_ical_golden import make_kadai
+from tutnext.api.routes import schedule as schedule_route
+from tutnext.services import schedule_ical as si
+
+
+@pytest.fixture
+def generate_calls(monkeypatch):
+    """Replace the T-NEXT login + fetch; records (username, password, fresh_ttl)."""
+    calls = []
+
+    async def fake_generate(username, password, fresh_ttl=si.ICAL_FRESH_TTL):
+        calls.append((username, password, fresh_ttl))
+        content = b"BEGIN:VCALENDAR\r\nX-GEN:%d\r\nEND:VCALENDAR\r\n" % len(calls)
+        await si.store_ical(username, password, content, fresh_ttl)
+        return content
+
+    monkeypatch.setattr(si, "generate_ical", fake_generate)
+    monkeypatch.setattr(schedule_route, "generate_ical", fake_generate)
+    return calls
+
+
+@pytest.fixture
+async def client(patched_redis):
+    app = FastAPI()
+    app.include_router(schedule_route.router, prefix="/schedule")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def _get(client, password, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return await client.get(
+        "/schedule", params={"username": "u", "password": password}, headers=headers
+    )
+
+
+async def _wait_refresh():
+    await asyncio.gather(*schedule_route._ical_refresh_tasks.values())
+
+
+class TestIcalCache:
+    async def test_load_requires_same_password(self, patched_redis):
+        await si.store_ical("u", "pw", b"BODY")
+        assert await si.load_ical("u", "pw") == (b"BODY", True)
+        assert await si.load_ical("u", "other") == (None, False)
+
+    async def test_password_not_stored_in_plaintext(self, patched_redis):
+        await si.store_ical("u", "secret-password", b"BODY")
+        for key in await patched_redis.keys("schedule:ical:*"):
+            assert b"secret-password" not in await patched_redis.get(key)
+
+    async def test_feed_without_credential_is_not_served(self, patched_redis):
+        await patched_redis.set(si.ical_cache_key("u"), b"BODY")
+        await patched_redis.set("schedule:ical:fresh:u", 1)
+        assert await si.load_ical("u", "pw") == (None, False)
+
+    async def test_invalidate_month_drops_feed(self, patched_redis):
+        await si.store_ical("u", "pw", b"BODY")
+        await si.invalidate_ical_month("u", date(2026, 10, 1))
+        assert await patched_redis.keys("schedule:ical:*") == []
+
+
+class TestRenderBlocks:
+    @staticmethod
+    def _sources(courses, kadai):
+        return {
+            si.month_block_name(2026, 10): (courses, si.build_course_events),
+            "kadai": (kadai, si.build_kadai_events),
+        }
+
+    async def test_empty_blocks_render_twice(self, patched_redis):
+        first = await si.render_blocks("u", self._sources([], []))
+        second = await si.render_blocks("u", self._sources([], []))
+        assert first == second == [b"", b""]
+
+    async def test_unchanged_blocks_are_reused(self, patched_redis, monkeypatch):
+        kadai = make_kadai(random.Random(1), 2)
+        first = await si.render_blocks("u", self._sources([], kadai))
+
+        def must_not_build(items):
+            raise AssertionError("cached block should be reused")
+
+        monkeypatch.setattr(si, "build_kadai_events", must_not_build)
+        monkeypatch.setattr(si, "build_course_events", must_not_build)
+        assert await si.render_blocks("u", self._sources([], kadai)) == first
+
+    async def test_changed_block_is_rebuilt(self, patched_redis):
+        await si.render_blocks("u", self._sources([], []))
+        kadai = make_kadai(random.Random(1), 2)
+        _, block = await si.render_blocks("u", self._sources([], kadai))
+        assert block.count(b"BEGIN:VEVENT") == 2
+
+
+class TestSendSchedule:
+    async def test_fresh_cache_served_and_revalidated(self, client, generate_calls):
+        first = await _get(client, "pw")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        second = await _get(client, "pw")
+        assert second.content == first.content
+        not_modified = await _get(client, "pw", etag)
+        assert not_modified.status_code == 304
+        assert generate_calls == [("u", "pw", si.ICAL_FRESH_TTL)]
+
+    async def test_wrong_password_does_not_get_cached_feed(self, client, generate_calls):
+        await si.store_ical("u", "pw", b"BEGIN:VCALENDAR\r\nX-CACHED:1\r\nEND:VCALENDAR\r\n")
+
+        res = await _get(client, "wrong")
+        assert b"X-CACHED" not in res.content
+        assert generate_calls == [("u", "wrong", si.ICAL_FRESH_TTL)]
+
+    async def test_wrong_password_does_not_get_304(self, client, generate_calls):
+        cached = b"BEGIN:VCALENDAR\r\nX-CACHED:1\r\nEND:VCALENDAR\r\n"
+        await si.store_ical("u", "pw", cached)
+
+        res = await _get(client, "wrong", si.ical_etag(cached))
+        assert res.status_code == 200
+        assert len(generate_calls) == 1
+
+    async def test_stale_cache_served_and_refreshed(self, client, generate_calls, patched_redis):
+        cached = b"BEGIN:VCALENDAR\r\nX-CACHED:1\r\nEND:VCALENDAR\r\n"
+        await si.store_ical("u", "pw", cached)
+        await patched_redis.delete("schedule:ical:fresh:u")
+
+        res = await _get(client, "pw")
+        assert res.content == cached
+        await _wait_refresh()
+        assert generate_calls == [("u", "pw", si.ICAL_FRESH_TTL)]
+        assert (await si.load_ical("u", "pw"))[1] is True
+
+    async def test_stale_cache_wrong_password_no_background_refresh(
+        self, client, generate_calls, patched_redis
+    ):
+        await si.store_ical("u", "pw", b"BEGIN:VCALENDAR\r\nX-CACHED:1\r\nEND:VCALENDAR\r\n")
+        await patched_redis.delete("schedule:ical:fresh:u")
+
+        res = await _get(client, "wrong")
+        assert b"X-CACHED" not in res.content
+        assert schedule_route._ical_refresh_tasks == {}
+        assert generate_calls == [("u", "wrong", si.ICAL_FRESH_TTL)]
+        # the feed is now bound to the password that generated it
+        assert (await si.load_ical("u", "pw"))[0] is None
+
+
+class TestPregenerate:
+    @pytest.fixture(autouse=True)
+    def subscriber_secret(self, monkeypatch):
+        from cryptography.fernet import Fernet
+
+        monkeypatch.setattr(si, "SCHEDULE_ICAL_SECRET", Fernet.generate_key().decode())
+        monkeypatch.setattr(si, "SCHEDULE_ICAL_PREGEN_INTERVAL", 0)
+
+    async def test_pregenerated_feed_bound_to_subscriber_password(
+        self, client, generate_calls, patched_redis
+    ):
+        await _get(client, "pw")
+        await patched_redis.delete("schedule:ical:fresh:u")
+
+        assert await si.pregenerate_ical_feeds() == 1
+        assert generate_calls[-1] == ("u", "pw", si.SCHEDULE_ICAL_PREGEN_FRESH_TTL)
+        assert await patched_redis.ttl("schedule:ical:cred:u") >= si.SCHEDULE_ICAL_PREGEN_FRESH_TTL
+
+        content, fresh = await si.load_ical("u", "pw")
+        assert fresh and b"X-GEN:2" in content
+        assert await si.load_ical("u", "wrong") == (None, False)
+
+        res = await _get(client, "wrong", si.ical_etag(content))
+        assert res.status_code == 200
+        assert generate_calls[-1] == ("u", "wrong", si.ICAL_FRESH_TTL)
+
+    async def test_subscriber_removed_on_login_failure(
+        self, client, generate_calls, patched_redis, monkeypatch
+    ):
+        await _get(client, "pw")
+
+        async def login_fails(username, password, fresh_ttl=si.ICAL_FRESH_TTL):
+            raise si.GakuenLoginError("bad password")
+
+        monkeypatch.setattr(si, "generate_ical", login_fails)
+        assert await si.pregenerate_ical_feeds() == 0
+        assert await patched_redis.zcard(si.ICAL_SUBSCRIBERS_KEY) == 0
+        assert not await patched_redis.exists("schedule:ical:subscriber:u")
+
+    async def test_wrong_password_is_not_registered(self, client, monkeypatch):
+        async def login_fails(username, password, fresh_ttl=si.ICAL_FRESH_TTL):
+            raise si.GakuenLoginError("bad password")
+
+        monkeypatch.setattr(schedule_route, "generate_ical", login_fails)
+        res = await _get(client, "wrong")
+        assert res.status_code == 500
+        assert await si.pregenerate_ical_feeds() == 0
@@ -0,0 +1,130 @@
+"""
+Tests for single-flight result sharing (tutnext.core.single_flight).
+
+Separate SingleFlight instances sharing fakeredis stand in for separate processes.
+"""
+
+import asyncio
+
+import pytest
+
+from tutnext.core.single_flight import SingleFlight
+
+
+def _flight() -> SingleFlight:
+    return SingleFlight(poll_interval=0.01, wait_timeout=5)
+
+
+class Counter:
+    def __init__(self, result=None, delay=0.05, error=None):
+        self.calls = 0
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.started = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result if self.result is not None else {"call": self.calls}
+
+
+class TestInProcess:
+    async def test_concurrent_calls_share_one_execution(self, patched_redis):
+        flight, fn = _flight(), Counter()
+        results = await asyncio.gather(*(flight.do("k", fn) for _ in range(5)))
+        assert fn.calls == 1
+        assert results == [{"call": 1}] * 5
+
+    async def test_sequential_calls_execute_again(self, patched_redis):
+        flight, fn = _flight(), Counter(delay=0)
+        await flight.do("k", fn)
+        await flight.do("k", fn)
+        assert fn.calls == 2
+
+    async def test_different_keys_do_not_share(self, patched_redis):
+        flight, fn = _flight(), Counter()
+        await asyncio.gather(flight.do("a", fn), flight.do("b", fn))
+        assert fn.calls == 2
+
+    async def test_error_reaches_every_waiter(self, patched_redis):
+        flight, fn = _flight(), Counter(error=ValueError("boom"))
+        results = await asyncio.gather(
+            *(flight.do("k", fn) for _ in range(3)), return_exceptions=True
+        )
+        assert fn.calls == 1
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight._inflight == {}
+
+    async def test_cancelled_waiter_does_not_cancel_the_call(self, patched_redis):
+        flight, fn = _flight(), Counter(delay=0.1)
+        first = asyncio.create_task(flight.do("k", fn))
+        second = asyncio.create_task(flight.do("k", fn))
+        await fn.started.wait()
+        first.cancel()
+        assert await second == {"call": 1}
+        assert first.cancelled()
+
+    async def test_runs_without_redis(self, patched_redis, monkeypatch):
+        async def refused(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(patched_redis, "set", refused)
+        flight, fn = _flight(), Counter()
+        results = await asyncio.gather(flight.do("k", fn), flight.do("k", fn))
+        assert fn.calls == 1
+        assert results == [{"call": 1}] * 2
+
+
+class TestAcrossProcesses:
+    async def test_follower_uses_leader_result(self, patched_redis):
+        leader, follower = _flight(), _flight()
+        lead_fn, follow_fn = Counter(result={"from": "leader"}), Counter()
+
+        lead = asyncio.create_task(leader.do("k", lead_fn))
+        await lead_fn.started.wait()
+        assert await follower.do("k", follow_fn) == {"from": "leader"}
+        assert await lead == {"from": "leader"}
+        assert follow_fn.calls == 0
+
+    async def test_follower_runs_itself_when_leader_fails(self, patched_redis):
+        leader, follower = _flight(), _flight()
+        lead_fn = Counter(error=RuntimeError("t-next down"))
+        follow_fn = Counter(result={"from": "follower"})
+
+        lead = asyncio.create_task(leader.do("k", lead_fn))
+        await lead_fn.started.wait()
+        assert await follower.do("k", follow_fn) == {"from": "follower"}
+        with pytest.raises(RuntimeError):
+            await lead
+        assert follow_fn.calls == 1
+
+    async def test_unserialisable_result_is_not_shared(self, patched_redis):
+        leader, follower = _flight(), _flight()
+        lead_fn = Counter(result={"value": object()})
+        follow_fn = Counter(result={"from": "follower"})
+
+        lead = asyncio.create_task(leader.do("k", lead_fn))
+        await lead_fn.started.wait()
+        assert await follower.do("k", follow_fn) == {"from": "follower"}
+        await lead
+
+    async def test_old_result_is_not_reused(self, patched_redis):
+        flight, other = _flight(), _flight()
+        await flight.do("k", Counter(result={"n": 1}, delay=0))
+        # a later call with no leader in flight executes instead of reading the
+        # previous leader's result key
+        fn = Counter(result={"n": 2}, delay=0)
+        assert await other.do("k", fn) == {"n": 2}
+        assert fn.calls == 1
+
+
+def test_make_key_hides_arguments():
+    key = SingleFlight.make_key("kadai", "u", "encrypted-password")
+    assert key.startswith("kadai:u:")
+    assert "encrypted-password" not in key
+    assert key != SingleFlight.make_key("kadai", "u", "other")
+    assert key == SingleFlight.make_key("kadai", "u", "encrypted-password")